@@ -1,4 +1,5 @@
 from typing import List, Optional, Dict, Any
+from datetime import datetime
 from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -6,7 +7,7 @@ from sqlmodel import select
 
 from helpers.uuid import generate_uuid
 from schemas.application import ApplicationCreate, AgentRegister
-from cnc.database.models import Application, Agent, HTTPMessageDB, AuthSession
+from cnc.database.models import Application, Agent, HTTPMessageDB, AuthSession, EnrichmentRecord
 
 from httplib import HTTPMessage
 
@@ -154,4 +155,41 @@ async def get_session_by_id(
             AuthSession.session_id == session_id
         )
     )
-    return result.scalars().first()
\ No newline at end of file
+    return result.scalars().first()
+
+
+async def upsert_enrichment_records(
+    db: AsyncSession, app_id: UUID, entries: Dict[str, Dict[str, Any]]
+) -> List[EnrichmentRecord]:
+    """Insert or replace the enrichment cache entries ({template: entry}) of an application."""
+    result = await db.execute(
+        select(EnrichmentRecord).where(
+            EnrichmentRecord.application_id == app_id,
+            EnrichmentRecord.template.in_(list(entries)),
+        )
+    )
+    existing = {r.template: r for r in result.scalars().all()}
+
+    records = []
+    for template, entry in entries.items():
+        record = existing.get(template)
+        if record is None:
+            record = EnrichmentRecord(id=generate_uuid(), application_id=app_id, template=template, positions=[])
+        record.positions = entry["positions"]
+        record.hits = entry.get("hits", 0)
+        record.updated_at = datetime.utcnow()
+        db.add(record)
+        records.append(record)
+
+    await db.commit()
+    return records
+
+
+async def get_enrichment_records(
+    db: AsyncSession, app_id: Optional[UUID] = None
+) -> List[EnrichmentRecord]:
+    query = select(EnrichmentRecord)
+    if app_id is not None:
+        query = query.where(EnrichmentRecord.application_id == app_id)
+    result = await db.execute(query)
+    return list(result.scalars().all())
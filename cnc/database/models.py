@@ -1,6 +1,6 @@
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-from sqlmodel import Field, SQLModel, JSON, Column, Relationship
+from sqlmodel import Field, SQLModel, JSON, Column, Relationship, UniqueConstraint
 from uuid import UUID
 import json
 
@@ -68,4 +68,16 @@ class HTTPMessageDB(SQLModel, table=True):
     response_body_b64: Optional[str] = None
     response_body_error: Optional[str] = None
     
-    agent: "Agent" = Relationship(back_populates="http_messages")
\ No newline at end of file
+    agent: "Agent" = Relationship(back_populates="http_messages")
+
+
+class EnrichmentRecord(SQLModel, table=True):
+    """Resource locator positions extracted for a request template of an application."""
+    __table_args__ = (UniqueConstraint("application_id", "template"),)
+
+    id: UUID = Field(primary_key=True)
+    application_id: UUID = Field(foreign_key="application.id", index=True)
+    template: str
+    positions: List[Dict[str, Any]] = Field(sa_column=Column(JSON))
+    hits: int = 0
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,37 @@
+import re
+from typing import Optional
+
+UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+OBJECTID_RE = re.compile(r"^[0-9a-fA-F]{24}$")
+NUMERIC_RE = re.compile(r"^\d+$")
+HEX_RE = re.compile(r"^[0-9a-fA-F]{12,}$")
+HASHID_RE = re.compile(r"^[A-Za-z0-9_-]{6,64}$")
+EMAIL_RE = re.compile(r"^[^@\s/]+@[^@\s/]+\.[A-Za-z]{2,}$")
+
+
+def id_shape(value: str) -> Optional[str]:
+    """
+    Classify a string by the shape of identifier it looks like, or None.
+    Shapes: uuid, objectid, numeric, hex, email, hashid.
+    """
+    if not value:
+        return None
+    if NUMERIC_RE.match(value):
+        return "numeric"
+    if UUID_RE.match(value):
+        return "uuid"
+    if OBJECTID_RE.match(value):
+        return "objectid"
+    if HEX_RE.match(value) and any(c.isdigit() for c in value):
+        return "hex"
+    if EMAIL_RE.match(value):
+        return "email"
+    if HASHID_RE.match(value):
+        digits = sum(c.isdigit() for c in value)
+        if digits >= 2 and any(c.isalpha() for c in value):
+            return "hashid"
+    return None
+
+
+def is_id_like(value: str) -> bool:
+    return id_shape(value) is not None
@@ -9,6 +9,10 @@ from routers.application import make_application_router
 from routers.agent import make_agent_router
 from database.session import create_db_and_tables
 from cnc.services.queue import BroadcastChannel
+from cnc.services.dedup import RequestDeduplicator
+from cnc.services.enrichment_cache import EnrichmentCache
+from cnc.services.route_inference import RouteInferer
+from common.frontier import FrontierSet
 import asyncio
 from workers_launcher import start_workers
 
@@ -42,6 +46,10 @@ def create_app() -> FastAPI:
     # Store channels in app state for access by workers and dependencies
     app.state.raw_channel = raw_channel
     app.state.enriched_channel = enriched_channel
+    app.state.route_inferer = RouteInferer()
+    app.state.dedup = RequestDeduplicator(routes=app.state.route_inferer)
+    app.state.enrichment_cache = EnrichmentCache()
+    app.state.frontiers = FrontierSet()
     
     # Add exception handler for validation errors (422)
     @app.exception_handler(RequestValidationError)
@@ -50,8 +58,8 @@ def create_app() -> FastAPI:
 
     
     # Create routers with injected dependencies
-    application_router = make_application_router()
-    agent_router = make_agent_router(raw_channel)
+    application_router = make_application_router(app.state.enrichment_cache, app.state.frontiers)
+    agent_router = make_agent_router(raw_channel, app.state.dedup)
     
     # Include routers
     app.include_router(application_router)
@@ -0,0 +1,319 @@
+"""
+Offline AuthZ replay: run the AuthzTester permutation engine over traffic
+that was already captured, without browser agents or LLM enrichment.
+
+Sources are the hub database (HTTPMessageDB rows of one application, with
+user/role taken from the pushing agent) or Burp XML exports, one file per
+user:role. Requests are enriched from the persisted enrichment cache and
+the local heuristic extractor, attacks run on the async executor, and the
+full user x action x resource matrix is written as JSON, with the cells no
+attack was sent for marked untested.
+
+    python -m cnc.replay --app-id <uuid> -o report.json
+    python -m cnc.replay --burp alice:user=alice.xml --burp bob:admin=bob.xml -o report.json
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+# the hub's modules import each other relative to the cnc directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlmodel import select
+
+from httplib import (
+    HTTPMessage,
+    HTTPRequest,
+    HTTPRequestData,
+    HTTPResponse,
+    HTTPResponseData,
+    ResourceLocator,
+    parse_burp_xml,
+)
+from cnc.database import crud
+from cnc.database.models import Agent, HTTPMessageDB
+from cnc.services.enrichment_cache import EnrichmentCache
+from cnc.services.ratelimit import HostScheduler
+from cnc.services.resource_heuristics import HeuristicExtractor
+from cnc.workers.attackers.authnz.intruder import AsyncHTTPClient, AuthzTester
+from cnc.workers.attackers.authnz.models import AuthNZAttack
+
+log = logging.getLogger(__name__)
+
+DB_PAGE_SIZE = 500
+
+Captured = Tuple[str, str, HTTPMessage]  # username, role, message
+
+
+# ── sources ───────────────────────────────────────────────────────────────
+def _from_db_row(row: HTTPMessageDB) -> HTTPMessage:
+    request = HTTPRequest(data=HTTPRequestData(
+        method=row.method,
+        url=row.url,
+        headers=row.headers or {},
+        post_data=row.post_data,
+        redirected_from_url=row.redirected_from_url,
+        redirected_to_url=row.redirected_to_url,
+        is_iframe=row.is_iframe_request,
+    ))
+    response = None
+    if row.response_status is not None:
+        response = HTTPResponse(data=HTTPResponseData(
+            url=row.url,
+            status=row.response_status,
+            headers=row.response_headers or {},
+            is_iframe=bool(row.response_is_iframe),
+            body=base64.b64decode(row.response_body_b64) if row.response_body_b64 else None,
+        ))
+    return HTTPMessage(request=request, response=response)
+
+
+async def iter_db_messages(db: AsyncSession, app_id: UUID) -> AsyncIterator[Captured]:
+    """Stream an application's stored messages in capture order, one page at a time."""
+    offset = 0
+    while True:
+        result = await db.execute(
+            select(HTTPMessageDB, Agent)
+            .join(Agent, Agent.id == HTTPMessageDB.agent_id)
+            .where(HTTPMessageDB.application_id == app_id)
+            .order_by(HTTPMessageDB.created_at)
+            .offset(offset)
+            .limit(DB_PAGE_SIZE)
+        )
+        rows = result.all()
+        if not rows:
+            return
+        for row, agent in rows:
+            yield agent.user_name, agent.role, _from_db_row(row)
+        offset += len(rows)
+
+
+def parse_burp_spec(spec: str) -> Tuple[str, str, str]:
+    """'alice:admin=export.xml' -> ('alice', 'admin', 'export.xml')"""
+    principal, sep, path = spec.partition("=")
+    username, _, role = principal.partition(":")
+    if not sep or not username or not path:
+        raise argparse.ArgumentTypeError(f"expected user:role=path, got {spec!r}")
+    return username, role, path
+
+
+def iter_burp_messages(specs: Iterable[Tuple[str, str, str]]) -> Iterable[Captured]:
+    for username, role, path in specs:
+        for msg in parse_burp_xml(path):
+            yield username, role, msg
+
+
+# ── enrichment ────────────────────────────────────────────────────────────
+class OfflineEnricher:
+    """Cached locators when the template is known, heuristic ones otherwise."""
+
+    def __init__(self, cache: EnrichmentCache, app_id: Optional[UUID] = None):
+        self.cache = cache
+        self.app_id = app_id
+        self.heuristics = HeuristicExtractor()
+        self.sources: Counter = Counter()
+
+    def locators(self, msg: HTTPMessage) -> List[ResourceLocator]:
+        cached = self.cache.lookup(msg.request, self.app_id)
+        if cached is not None:
+            self.sources["cache"] += 1
+            return cached
+        result = self.heuristics.extract(msg.request)
+        self.sources["heuristic" if result.is_confident() else "heuristic_unconfident"] += 1
+        return [
+            ResourceLocator(id=c.resource.id, request_part=c.resource.request_part, type_name=c.resource.type.name)
+            for c in result.candidates
+            if c.resource.id and c.resource.type
+        ]
+
+
+# ── report ────────────────────────────────────────────────────────────────
+def _cell(attack: AuthNZAttack) -> Dict:
+    info = attack.attack_info
+    result = attack.result
+    return {
+        "user": info.user,
+        "action": info.action,
+        "resource": f"{info.type_name}:{info.resource_id}" if info.type_name else "-",
+        "variant": type(attack).__name__,
+        "outcome": "unknown" if result is None else ("vulnerable" if result.success else "denied"),
+        "confidence": result.confidence if result else 0.0,
+        "status": result.result if result else None,
+    }
+
+
+def _untested(user: str, action: str, resource: str) -> Dict:
+    return {
+        "user": user,
+        "action": action,
+        "resource": resource,
+        "variant": None,
+        "outcome": "untested",
+        "confidence": 0.0,
+        "status": None,
+    }
+
+
+def build_matrix(
+    findings: Iterable[AuthNZAttack],
+    users: Iterable[str] = (),
+    coverage: Optional[Dict[str, List[str]]] = None,
+) -> Dict:
+    """
+    One cell per attack sent, plus an untested cell for every point of the
+    `users` x `coverage` (action -> resources) grid no attack was sent for.
+    """
+    cells = [_cell(a) for a in findings if isinstance(a, AuthNZAttack)]
+    attacked = {(c["user"], c["action"], c["resource"]) for c in cells}
+    for user in users:
+        for action, resources in (coverage or {}).items():
+            cells.extend(
+                _untested(user, action, resource)
+                for resource in resources
+                if (user, action, resource) not in attacked
+            )
+    cells.sort(key=lambda c: (c["user"], c["action"], c["resource"]))
+    return {
+        "summary": {
+            "cells": len(cells),
+            "users": len({c["user"] for c in cells}),
+            "actions": len({c["action"] for c in cells}),
+            **Counter(c["outcome"] for c in cells),
+        },
+        "cells": cells,
+    }
+
+
+# ── driver ────────────────────────────────────────────────────────────────
+class Progress:
+    def __init__(self, tester: AuthzTester, interval: float = 5.0):
+        self.tester = tester
+        self.interval = interval
+        self.ingested = 0
+        self._start = time.monotonic()
+        self._last = 0.0
+
+    def report(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self._start
+        stats = self.tester.stats()
+        log.info(
+            "[REPLAY] ingested=%d attacks done=%d in_flight=%d failed=%d  %.1f msg/s  %.1f attacks/s",
+            self.ingested,
+            stats["completed"],
+            stats["in_flight"],
+            stats["failed"],
+            self.ingested / elapsed if elapsed else 0.0,
+            stats["attacks_per_second"],
+        )
+
+
+async def replay(
+    messages: AsyncIterator[Captured],
+    enricher: OfflineEnricher,
+    *,
+    concurrency: int = 32,
+    http2: bool = False,
+    budget: int = 0,
+    http_client: Optional[AsyncHTTPClient] = None,
+) -> Dict:
+    client = http_client or AsyncHTTPClient(
+        timeout=10,
+        scheduler=HostScheduler(),
+        max_connections=concurrency,
+        max_keepalive_connections=concurrency,
+        http2=http2,
+    )
+    # no agent pushes fresh sessions offline: expired users are dropped at once
+    tester = AuthzTester(http_client=client, concurrency=concurrency, budget=budget, session_wait_timeout=0)
+    progress = Progress(tester)
+
+    async for username, role, msg in messages:
+        tester.ingest(
+            username=username,
+            role=role,
+            request=msg.request.data,
+            resource_locators=enricher.locators(msg),
+            session=msg.request.auth_session,
+            response=msg.response,
+        )
+        progress.ingested += 1
+        progress.report()
+        # let scheduled attacks make progress while we keep reading
+        await asyncio.sleep(0)
+
+    while tester.in_flight:
+        progress.report()
+        await asyncio.sleep(0.5)
+    await tester.aclose()
+    progress.report(force=True)
+
+    report = build_matrix(tester.get_findings(), tester.users(), tester.coverage())
+    stats = tester.stats()
+    report["summary"]["enrichment"] = dict(enricher.sources)
+    report["summary"]["attacks_per_second"] = stats["attacks_per_second"]
+    report["summary"]["scheduler"] = stats["schedulers"].get("default", {})
+    return report
+
+
+async def _aiter(items: Iterable[Captured]) -> AsyncIterator[Captured]:
+    for item in items:
+        yield item
+
+
+async def main(args: argparse.Namespace) -> None:
+    cache = EnrichmentCache(path=None)
+    if args.app_id:
+        from cnc.database.session import engine
+
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            for r in await crud.get_enrichment_records(db, args.app_id):
+                cache.merge({r.template: {"positions": r.positions, "hits": r.hits}}, args.app_id)
+            report = await replay(
+                iter_db_messages(db, args.app_id),
+                OfflineEnricher(cache, args.app_id),
+                concurrency=args.concurrency,
+                http2=args.http2,
+                budget=args.budget,
+            )
+    else:
+        report = await replay(
+            _aiter(iter_burp_messages(args.burp)),
+            OfflineEnricher(cache),
+            concurrency=args.concurrency,
+            http2=args.http2,
+            budget=args.budget,
+        )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report["summary"], indent=2))
+    print(f"Matrix written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay captured traffic through the AuthZ permutation engine")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--app-id", type=UUID, help="Replay messages stored in the hub database for this application")
+    source.add_argument("--burp", type=parse_burp_spec, action="append", help="user:role=burp_export.xml (repeatable)")
+    parser.add_argument("-o", "--output", default="authz_matrix.json")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("--http2", action="store_true")
+    parser.add_argument("--budget", type=int, default=0, help="Stop after this many attack requests (0: unlimited)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    logging.getLogger("cnc.workers.attackers.authnz.intruder").setLevel(logging.WARNING)
+    asyncio.run(main(args))
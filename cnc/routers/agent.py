@@ -9,19 +9,25 @@ from cnc.database.models import Agent
 
 from services import agent as agent_service
 from cnc.services.queue import BroadcastChannel
+from cnc.services.dedup import RequestDeduplicator, DedupVerdict
 from schemas.http import EnrichAuthNZMessage
 
-def make_agent_router(raw_channel: BroadcastChannel[EnrichAuthNZMessage]) -> APIRouter:
+def make_agent_router(
+    raw_channel: BroadcastChannel[EnrichAuthNZMessage],
+    dedup: Optional[RequestDeduplicator] = None,
+) -> APIRouter:
     """
     Create the agent router with injected dependencies.
     
     Args:
         raw_channel: Channel for publishing raw HTTP messages
+        dedup: Duplicate filter applied before messages reach raw_channel
         
     Returns:
         Configured APIRouter instance
     """
     router = APIRouter()
+    dedup = dedup if dedup is not None else RequestDeduplicator()
     print("Initializing agent router with raw channel: ", raw_channel.id)
     
     # TODO: test this format of request and see how well cascades
@@ -75,22 +81,28 @@ def make_agent_router(raw_channel: BroadcastChannel[EnrichAuthNZMessage]) -> API
                 raise HTTPException(status_code=404, detail="Agent not found")
             
             # Fan-out to channel for processing
+            duplicates = 0
             for msg in payload.http_msgs:
+                verdict = dedup.check(app_id, msg.request, agent.user_name, agent.role)
+                if verdict == DedupVerdict.DUPLICATE:
+                    duplicates += 1
+                    continue
                 print(f"[Route] received {msg.request.url}")
 
-                # Publish directly to the injected channel
-                # await raw_channel.publish(
-                #     EnrichAuthNZMessage(
-                #         http_msg=msg, 
-                #         username=agent.user_name, 
-                #         role=agent.role
-                #     )
-                # )
+                await raw_channel.publish(
+                    EnrichAuthNZMessage(
+                        http_msg=msg, 
+                        username=agent.user_name, 
+                        role=agent.role,
+                        near_duplicate=verdict == DedupVerdict.NEAR_DUPLICATE,
+                        app_id=app_id,
+                    )
+                )
             
             # for action in payload.browser_actions:
             #     print(f"Received action: {action}")
 
-            return {"accepted": len(payload.http_msgs)}
+            return {"accepted": len(payload.http_msgs) - duplicates, "duplicates": duplicates}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
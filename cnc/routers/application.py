@@ -1,19 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 from uuid import UUID
 
-from schemas.application import ApplicationCreate, ApplicationOut, AddFindingRequest
+from schemas.application import (
+    ApplicationCreate, ApplicationOut, AddFindingRequest, EnrichmentExport,
+    FrontierAgent, FrontierPages, FrontierLease, FrontierVisit, FrontierClaim,
+)
 from database.session import get_session
 from services import application as app_service
 from cnc.services.queue import BroadcastChannel
+from cnc.services.enrichment_cache import EnrichmentCache
 from httplib import HTTPMessage
+from common.frontier import FrontierSet
 
 
-def make_application_router() -> APIRouter:
+def make_application_router(
+    enrichment_cache: Optional[EnrichmentCache] = None,
+    frontiers: Optional[FrontierSet] = None,
+) -> APIRouter:
     """
     Create the application router with injected dependencies.
     
+    Args:
+        enrichment_cache: Live enrichment cache that imported results are merged into
+        frontiers: Exploration frontiers shared by the agents of each application
+    
     Returns:
         Configured APIRouter instance
     """
@@ -51,6 +63,71 @@ def make_application_router() -> APIRouter:
             raise HTTPException(status_code=404, detail=str(e))
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
+    
+    @router.get("/{app_id}/enrichment", response_model=EnrichmentExport)
+    async def export_enrichment(app_id: UUID, db: AsyncSession = Depends(get_session)):
+        """Export persisted enrichment results for reuse in another environment."""
+        try:
+            return await app_service.export_enrichment(db, app_id)
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @router.post("/{app_id}/enrichment")
+    async def import_enrichment(app_id: UUID, payload: EnrichmentExport, db: AsyncSession = Depends(get_session)):
+        """Import enrichment results exported from another environment."""
+        try:
+            imported = await app_service.import_enrichment(db, app_id, payload, enrichment_cache)
+            return {"imported": imported}
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    frontiers = frontiers if frontiers is not None else FrontierSet()
+
+    @router.post("/{app_id}/frontier/pages")
+    async def add_frontier_pages(app_id: UUID, payload: FrontierPages):
+        """Queue pages an agent discovered for exploration."""
+        return {"added": frontiers.get(app_id).add(payload.agent_id, payload.urls)}
+
+    @router.post("/{app_id}/frontier/claim", response_model=FrontierClaim)
+    async def claim_frontier_page(app_id: UUID, payload: FrontierAgent):
+        """Lease the next unexplored page to an agent."""
+        frontier = frontiers.get(app_id)
+        url = frontier.claim(payload.agent_id)
+        return FrontierClaim(url=url, exhausted=url is None and frontier.exhausted())
+
+    @router.post("/{app_id}/frontier/renew")
+    async def renew_frontier_lease(app_id: UUID, payload: FrontierLease):
+        return {"ok": frontiers.get(app_id).renew(payload.agent_id, payload.url)}
+
+    @router.post("/{app_id}/frontier/visit")
+    async def visit_frontier_page(app_id: UUID, payload: FrontierVisit):
+        """Register the structure of a leased page; `ok` is false if it was explored already."""
+        return {"ok": frontiers.get(app_id).visit(payload.agent_id, payload.url, payload.fingerprint)}
+
+    @router.post("/{app_id}/frontier/complete")
+    async def complete_frontier_page(app_id: UUID, payload: FrontierLease):
+        frontiers.get(app_id).complete(payload.agent_id, payload.url)
+        return {"ok": True}
+
+    @router.post("/{app_id}/frontier/release")
+    async def release_frontier_page(app_id: UUID, payload: FrontierLease):
+        frontiers.get(app_id).release(payload.agent_id, payload.url)
+        return {"ok": True}
+
+    @router.post("/{app_id}/frontier/reset")
+    async def reset_frontier(app_id: UUID):
+        """Start a new exploration run: drop the explored pages, leases and agent-hours."""
+        frontiers.reset(app_id)
+        return {"ok": True}
+
+    @router.get("/{app_id}/frontier/stats")
+    async def get_frontier_stats(app_id: UUID):
+        """Exploration coverage of the application, overall and per agent-hour."""
+        return frontiers.get(app_id).stats()
             
     return router
 
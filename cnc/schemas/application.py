@@ -51,4 +51,24 @@ class Finding(BaseModel):
     additional_info: Optional[Dict[str, Any]] = None
 
 class AddFindingRequest(BaseModel):
-    finding: Finding
\ No newline at end of file
+    finding: Finding
+
+class EnrichmentExport(BaseModel):
+    """Enrichment cache entries of an application, keyed by request template."""
+    templates: Dict[str, Dict[str, Any]]
+
+class FrontierAgent(BaseModel):
+    agent_id: str
+
+class FrontierPages(FrontierAgent):
+    urls: List[str]
+
+class FrontierLease(FrontierAgent):
+    url: str
+
+class FrontierVisit(FrontierLease):
+    fingerprint: str
+
+class FrontierClaim(BaseModel):
+    url: Optional[str]
+    exhausted: bool
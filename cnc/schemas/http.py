@@ -1,15 +1,20 @@
 from typing import Optional, List
+from uuid import UUID
 from pydantic import BaseModel
-from httplib import HTTPRequest, HTTPMessage, ResourceLocator, AuthSession
+from httplib import HTTPRequest, HTTPResponse, HTTPMessage, ResourceLocator, AuthSession
 
 class EnrichAuthNZMessage(BaseModel):
     http_msg: HTTPMessage
     username: str
     role: Optional[str] = ""
+    near_duplicate: bool = False
+    app_id: Optional[UUID] = None
 
 class EnrichedRequest(BaseModel):
     request: HTTPRequest
     username: str
     role: str
     session: Optional[AuthSession] = None
-    resource_locators: Optional[List[ResourceLocator]] = None
\ No newline at end of file
+    resource_locators: Optional[List[ResourceLocator]] = None
+    response: Optional[HTTPResponse] = None
+    app_id: Optional[UUID] = None
\ No newline at end of file
@@ -1,10 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 
 from database import crud
-from schemas.application import ApplicationCreate, ApplicationOut, Finding
+from schemas.application import ApplicationCreate, ApplicationOut, Finding, EnrichmentExport
 from cnc.database.models import Application
+from cnc.services.enrichment_cache import EnrichmentCache, CacheEntry
 
 
 async def create_app(db: AsyncSession, app_data: ApplicationCreate) -> Application:
@@ -38,4 +39,28 @@ async def add_finding(db: AsyncSession, app_id: UUID, finding: Finding) -> Appli
     
     # Update the application
     updated_app = await crud.update_application(db, app)
-    return updated_app
\ No newline at end of file
+    return updated_app
+
+
+async def export_enrichment(db: AsyncSession, app_id: UUID) -> EnrichmentExport:
+    """Export the persisted enrichment results of an application."""
+    await get_app(db, app_id)
+    records = await crud.get_enrichment_records(db, app_id)
+    return EnrichmentExport(
+        templates={r.template: {"positions": r.positions, "hits": r.hits} for r in records}
+    )
+
+
+async def import_enrichment(
+    db: AsyncSession,
+    app_id: UUID,
+    payload: EnrichmentExport,
+    cache: Optional[EnrichmentCache] = None,
+) -> int:
+    """Persist imported enrichment results and make them live in the running cache."""
+    await get_app(db, app_id)
+    entries = {t: CacheEntry.model_validate(e).model_dump(mode="json") for t, e in payload.templates.items()}
+    await crud.upsert_enrichment_records(db, app_id, entries)
+    if cache is not None:
+        cache.merge(entries, app_id)
+    return len(entries)
@@ -18,6 +18,7 @@ class AttackResult(BaseModel):
     success: bool
     result: Optional[str]
     description: Optional[str]
+    confidence: float = 0.0
 
 # TODO: check during ingestion later that result is set
 class Attack(BaseModel):
@@ -0,0 +1,184 @@
+import hashlib
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, Optional, Union
+
+from httplib import HTTPRequest, HTTPRequestData
+from cnc.services.enrichment_cache import route_template
+from cnc.services.route_inference import RouteInferer
+
+DEDUP_TTL = float(os.environ.get("DEDUP_TTL", "600"))
+DEDUP_CAPACITY = int(os.environ.get("DEDUP_CAPACITY", "100000"))
+DEDUP_ERROR_RATE = float(os.environ.get("DEDUP_ERROR_RATE", "0.001"))
+DEDUP_MAX_APPS = int(os.environ.get("DEDUP_MAX_APPS", "16"))
+
+# Headers that change between otherwise identical requests
+VOLATILE_HEADERS = {
+    "date", "if-none-match", "if-modified-since", "x-request-id", "x-correlation-id",
+    "traceparent", "tracestate", "sentry-trace", "baggage", "content-length",
+    "user-agent", "accept-encoding", "accept-language", "referer", "origin",
+    "sec-ch-ua", "sec-ch-ua-mobile", "sec-ch-ua-platform", "sec-fetch-dest",
+    "sec-fetch-mode", "sec-fetch-site", "connection", "cache-control", "pragma",
+}
+
+AnyRequest = Union[HTTPRequest, HTTPRequestData]
+
+
+class DedupVerdict(str, Enum):
+    NEW = "new"
+    NEAR_DUPLICATE = "near_duplicate"   # same route template + principal, different values
+    DUPLICATE = "duplicate"             # byte-identical modulo volatile headers
+
+
+def request_fingerprint(request: AnyRequest, username: str, role: Optional[str]) -> bytes:
+    headers = sorted(
+        (k.lower(), v) for k, v in (request.headers or {}).items() if k.lower() not in VOLATILE_HEADERS
+    )
+    body = json.dumps(request.post_data, sort_keys=True, default=str) if request.post_data else ""
+    raw = "\x00".join([username, role or "", request.method.upper(), request.url, repr(headers), body])
+    return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+
+def near_fingerprint(
+    request: AnyRequest, username: str, role: Optional[str], route: Optional[str] = None
+) -> bytes:
+    raw = "\x00".join([username, role or "", route or route_template(request)])
+    return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: bytes):
+        # Kirsch-Mitzenmacher double hashing over a 128-bit digest
+        h1 = int.from_bytes(key[:8], "little")
+        h2 = int.from_bytes(key[8:16], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: bytes) -> None:
+        for p in self._positions(key):
+            self._bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class DecayingBloomFilter:
+    """
+    Two-generation Bloom filter. Keys live in the active generation and are
+    still visible in the previous one; generations rotate every `ttl / 2`
+    seconds or when the active one reaches capacity, so entries are forgotten
+    after at most `ttl` seconds and memory is fixed at two filters.
+    """
+
+    def __init__(self, capacity: int = DEDUP_CAPACITY, error_rate: float = DEDUP_ERROR_RATE, ttl: float = DEDUP_TTL):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ttl = ttl
+        self._active = BloomFilter(capacity, error_rate)
+        self._previous: Optional[BloomFilter] = None
+        self._rotated_at = time.monotonic()
+
+    def _maybe_rotate(self) -> None:
+        if time.monotonic() - self._rotated_at >= self.ttl / 2 or self._active.count >= self.capacity:
+            self._previous = self._active
+            self._active = BloomFilter(self.capacity, self.error_rate)
+            self._rotated_at = time.monotonic()
+
+    def check_and_add(self, key: bytes) -> bool:
+        """Returns True if `key` was (probably) seen within the ttl."""
+        self._maybe_rotate()
+        seen = key in self._active or (self._previous is not None and key in self._previous)
+        if key not in self._active:
+            self._active.add(key)
+        return seen
+
+    @property
+    def nbytes(self) -> int:
+        return self._active.nbytes * 2
+
+
+class _AppFilters:
+    __slots__ = ("exact", "near")
+
+    def __init__(self, capacity: int, error_rate: float, ttl: float):
+        self.exact = DecayingBloomFilter(capacity, error_rate, ttl)
+        self.near = DecayingBloomFilter(capacity, error_rate, ttl)
+
+
+class RequestDeduplicator:
+    """
+    Per-application duplicate suppression in front of the raw channel. Exact
+    repeats of a request by the same user/role within the ttl are dropped;
+    requests that only differ in values on an already seen route template
+    are let through but tagged as near-duplicates. With a RouteInferer the
+    near-duplicate key is the inferred route instead of the stateless route
+    template. The least recently used application's filters are evicted past
+    `max_apps`.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int = DEDUP_CAPACITY,
+        error_rate: float = DEDUP_ERROR_RATE,
+        ttl: float = DEDUP_TTL,
+        max_apps: int = DEDUP_MAX_APPS,
+        routes: Optional[RouteInferer] = None,
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.ttl = ttl
+        self.max_apps = max_apps
+        self.routes = routes
+        self._apps: "OrderedDict[str, _AppFilters]" = OrderedDict()
+        self.counts: Dict[DedupVerdict, int] = {v: 0 for v in DedupVerdict}
+
+    def _filters(self, app_id: str) -> _AppFilters:
+        filters = self._apps.get(app_id)
+        if filters is None:
+            filters = _AppFilters(self.capacity, self.error_rate, self.ttl)
+            self._apps[app_id] = filters
+            while len(self._apps) > self.max_apps:
+                self._apps.popitem(last=False)
+        else:
+            self._apps.move_to_end(app_id)
+        return filters
+
+    def check(self, app_id, request: AnyRequest, username: str, role: Optional[str]) -> DedupVerdict:
+        filters = self._filters(str(app_id))
+        if filters.exact.check_and_add(request_fingerprint(request, username, role)):
+            verdict = DedupVerdict.DUPLICATE
+        elif filters.near.check_and_add(
+            near_fingerprint(request, username, role, self.routes.route(request) if self.routes else None)
+        ):
+            verdict = DedupVerdict.NEAR_DUPLICATE
+        else:
+            verdict = DedupVerdict.NEW
+        self.counts[verdict] += 1
+        return verdict
+
+    @property
+    def nbytes(self) -> int:
+        return sum(f.exact.nbytes + f.near.nbytes for f in self._apps.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "apps": len(self._apps),
+            "bytes": self.nbytes,
+            **{v.value: n for v, n in self.counts.items()},
+        }
@@ -1,15 +1,27 @@
 from abc import ABC, abstractmethod
 import asyncio
+import time
 from contextlib import suppress
 from typing import Optional, Dict, Any
+from uuid import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from cnc.schemas.http import EnrichedRequest, EnrichAuthNZMessage
 from cnc.services.queue import BroadcastChannel
+from cnc.services.enrichment_cache import EnrichmentCache, route_template
+from cnc.database import crud
+from cnc.services.resource_heuristics import HeuristicExtractor
+from cnc.services.enrichment_batch import EnrichmentBatcher
+from cnc.services.enrichment_queue import EnrichmentQueue, ENRICHMENT_CONCURRENCY
 
 from httplib import HTTPMessage, ResourceLocator
 from johnllm import LMP, LLMModel
-from src.llm import RequestResources, EXTRACT_REQUESTS_PROMPT
+from src.llm import (
+    RequestResources,
+    BatchRequestResources,
+    EXTRACT_REQUESTS_PROMPT,
+    EXTRACT_REQUESTS_BATCH_PROMPT,
+)
 
 from logger import init_file_logger
 
@@ -19,6 +31,10 @@ class ExtractResources(LMP):
     prompt = EXTRACT_REQUESTS_PROMPT
     response_format = RequestResources
 
+class BatchExtractResources(LMP):
+    prompt = EXTRACT_REQUESTS_BATCH_PROMPT
+    response_format = BatchRequestResources
+
 class BaseRequestEnrichmentWorker(ABC):
     """Base class for request enrichment workers"""
     
@@ -42,7 +58,10 @@ class RequestEnrichmentWorker(BaseRequestEnrichmentWorker):
         *,
         inbound: BroadcastChannel[EnrichAuthNZMessage],
         outbound: BroadcastChannel[EnrichedRequest],
-        db_session: Optional[AsyncSession] = None
+        db_session: Optional[AsyncSession] = None,
+        cache: Optional[EnrichmentCache] = None,
+        batcher: Optional[EnrichmentBatcher] = None,
+        concurrency: int = ENRICHMENT_CONCURRENCY
     ):
         print("Initlaiizing enrichment inbound broadcast: ", inbound.id)
 
@@ -50,26 +69,89 @@ class RequestEnrichmentWorker(BaseRequestEnrichmentWorker):
         self._outbound = outbound
         self.db = db_session
         self.llm = LLMModel()
+        self.cache = cache if cache is not None else EnrichmentCache()
+        self.heuristics = HeuristicExtractor()
+        self.heuristic_hits = 0
+        self.llm_calls = 0
+        self.concurrency = max(1, concurrency)
+        self.queue = EnrichmentQueue()
+        self._tasks: set[asyncio.Task] = set()
+        self._db_lock = asyncio.Lock()
+        self.batcher = batcher if batcher is not None else EnrichmentBatcher(
+            self._extract_batch,
+            self._extract_single,
+            prompt_overhead_tokens=len(EXTRACT_REQUESTS_PROMPT) // 4,
+        )
+
+    def _extract_single(self, request: str) -> RequestResources:
+        return ExtractResources().invoke(
+            model=self.llm,
+            model_name="gpt-4.1",
+            prompt_args={"request": request}
+        )
+
+    def _extract_batch(self, requests: list[str]) -> BatchRequestResources:
+        return BatchExtractResources().invoke(
+            model=self.llm,
+            model_name="gpt-4.1",
+            prompt_args={"requests": requests}
+        )
     
-    # TODO: blocking async calls
+    async def preload(self) -> int:
+        """Load enrichment results persisted by previous runs into the cache."""
+        if self.db is None:
+            return 0
+        async with self._db_lock:
+            records = await crud.get_enrichment_records(self.db)
+        for r in records:
+            self.cache.merge({r.template: {"positions": r.positions, "hits": r.hits}}, r.application_id)
+        log.info(f"Preloaded {len(records)} enrichment templates from the database")
+        return len(records)
+
+    async def _persist(self, request, app_id) -> None:
+        template = route_template(request)
+        entry = self.cache.get(template, app_id)
+        if self.db is None or app_id is None or entry is None:
+            return
+        async with self._db_lock:
+            await crud.upsert_enrichment_records(
+                self.db, app_id, {template: entry.model_dump(mode="json")}
+            )
+
     async def run(self) -> None:
         """
-        Listen for raw messages forever.  Each message is handed off to its own
-        asyncio.Task so the loop can keep listening immediately.
+        Listen for raw messages forever. Messages go through a priority queue
+        drained by a bounded pool of workers, so a burst can't fan out into
+        an unbounded number of concurrent LLM calls.
         """
-        self._tasks: set[asyncio.Task] = set()
+        for i in range(self.concurrency):
+            task = asyncio.create_task(self._worker(), name=f"enrichment-worker-{i}")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if self.cache.path:
+            task = asyncio.create_task(self.cache.run(), name="enrichment-cache-flush")
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
         while True:
             log.info("Waiting for raw HTTP message…")
             raw_msg = await self._sub_q.get()
+            self.queue.put_nowait(raw_msg)
 
-            # Fire‑and‑forget, but keep a reference so we can introspect / cancel.
-            task = asyncio.create_task(self._handle_message(raw_msg))
-            self._tasks.add(task)
-            task.add_done_callback(self._tasks.discard)
+    async def _worker(self) -> None:
+        while True:
+            raw_msg = await self.queue.get()
+            start = time.monotonic()
+            try:
+                await self._handle_message(raw_msg)
+            finally:
+                self.queue.service_time.add(time.monotonic() - start)
+                self.queue.task_done()
+                log.info("[QUEUE] %s", self.queue)
 
     async def _handle_message(self, raw_msg) -> None:
         """
-        Worker for a *single* HTTPMessage.  Runs in its own task.
+        Enrich and publish a *single* HTTPMessage.
         All exceptions are caught so they don’t kill the whole process.
         """
         try:
@@ -77,6 +159,7 @@ class RequestEnrichmentWorker(BaseRequestEnrichmentWorker):
                 raw_msg.http_msg,
                 raw_msg.username,
                 role=raw_msg.role,
+                app_id=raw_msg.app_id,
             )
             await self._outbound.publish(enr_msg)
         except asyncio.CancelledError:
@@ -95,11 +178,14 @@ class RequestEnrichmentWorker(BaseRequestEnrichmentWorker):
             task.cancel()
         with suppress(asyncio.CancelledError):
             await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.batcher.shutdown()
+        await asyncio.to_thread(self.cache.flush)
 
     async def _enrich(self, 
                       message: HTTPMessage,
                       username: str,
-                      role: str | None = None) -> EnrichedRequest:
+                      role: str | None = None,
+                      app_id: UUID | None = None) -> EnrichedRequest:
         """
         Enriches an HTTP message by extracting authentication/session information.
         
@@ -109,24 +195,40 @@ class RequestEnrichmentWorker(BaseRequestEnrichmentWorker):
         3. Form-based auth in POST data (username/password fields)
         """
         request = message.request
-        resources = ExtractResources().invoke(
-            model=self.llm,
-            model_name="gpt-4.1",
-            prompt_args={"request": message.request.to_str()}
-        )
+        resource_locators = self.cache.lookup(request, app_id)
+        if resource_locators is None:
+            heuristic = self.heuristics.extract(request)
+            if heuristic.is_confident():
+                self.heuristic_hits += 1
+                resources = heuristic.to_request_resources()
+            else:
+                self.llm_calls += 1
+                resources = await self.batcher.extract(message.request.to_str())
+            resource_locators = [
+                ResourceLocator(
+                    id=r.id,
+                    request_part=r.request_part,
+                    type_name=r.type.name
+                ) for r in resources.resources or []
+            ]
+            if await asyncio.to_thread(self.cache.store, request, resource_locators, app_id):
+                await self._persist(request, app_id)
+        else:
+            stats = self.cache.stats()
+            log.info(
+                f"[CACHE] {request.method} {request.url} hit "
+                f"(hit_rate={stats['hit_rate']:.2f}, llm_calls_saved={stats['llm_calls_saved']})"
+            )
+
         enriched = EnrichedRequest(
             request=request,
             username=username,
             role=role,
             session=request.auth_session,
-            resource_locators=[
-                ResourceLocator(
-                    id=r.id,
-                    request_part=r.request_part,
-                    type_name=r.type.name
-                ) for r in resources.resources
-            ],
+            resource_locators=resource_locators,
+            response=message.response,
+            app_id=app_id,
         ) 
-        log.info(f"Enriched resources: {resources.resources}")
-        print(f"Enriched resources: {resources.resources}")
+        log.info(f"Enriched resources: {resource_locators}")
+        print(f"Enriched resources: {resource_locators}")
         return enriched
\ No newline at end of file
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.llm import BatchRequestResources, RequestResources
+
+log = logging.getLogger(__name__)
+
+ENRICHMENT_BATCH_WINDOW = float(os.environ.get("ENRICHMENT_BATCH_WINDOW", "0.05"))
+ENRICHMENT_BATCH_MAX = int(os.environ.get("ENRICHMENT_BATCH_MAX", "16"))
+
+InvokeSingle = Callable[[str], RequestResources]
+InvokeBatch = Callable[[List[str]], BatchRequestResources]
+
+
+@dataclass
+class BatchStats:
+    batches: int = 0
+    messages: int = 0
+    llm_calls: int = 0
+    fallbacks: int = 0
+    prompt_tokens_saved: int = 0
+    llm_seconds: float = 0.0
+
+    @property
+    def avg_batch_size(self) -> float:
+        return self.messages / self.batches if self.batches else 0.0
+
+    @property
+    def messages_per_call(self) -> float:
+        return self.messages / self.llm_calls if self.llm_calls else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"batches={self.batches} messages={self.messages} llm_calls={self.llm_calls} "
+            f"avg_batch={self.avg_batch_size:.1f} msgs/call={self.messages_per_call:.1f} "
+            f"fallbacks={self.fallbacks} prompt_tokens_saved~{self.prompt_tokens_saved}"
+        )
+
+
+class EnrichmentBatcher:
+    """
+    Collects extraction requests for up to `window` seconds (or until
+    `max_batch` are pending) and sends them to the model as a single batch
+    prompt, then hands each caller its own `RequestResources`. Requests the
+    batch response doesn't cover are retried one by one.
+
+    The invoke callables are synchronous LLM calls and run in a thread so
+    they don't block the event loop.
+    """
+
+    def __init__(
+        self,
+        invoke_batch: InvokeBatch,
+        invoke_single: InvokeSingle,
+        *,
+        window: float = ENRICHMENT_BATCH_WINDOW,
+        max_batch: int = ENRICHMENT_BATCH_MAX,
+        prompt_overhead_tokens: int = 0,
+    ):
+        self._invoke_batch = invoke_batch
+        self._invoke_single = invoke_single
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.prompt_overhead_tokens = prompt_overhead_tokens
+        self.stats = BatchStats()
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_batch > 1
+
+    async def extract(self, request: str) -> RequestResources:
+        if not self.enabled:
+            self.stats.batches += 1
+            self.stats.messages += 1
+            return await self._single(request)
+
+        loop = asyncio.get_running_loop()
+        fut: asyncio.Future = loop.create_future()
+        self._pending.append((request, fut))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _timed(self, fn, arg):
+        start = time.perf_counter()
+        try:
+            return await asyncio.to_thread(fn, arg)
+        finally:
+            self.stats.llm_calls += 1
+            self.stats.llm_seconds += time.perf_counter() - start
+
+    async def _single(self, request: str) -> RequestResources:
+        return await self._timed(self._invoke_single, request)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.stats.batches += 1
+        self.stats.messages += len(batch)
+
+        by_index: Dict[int, RequestResources] = {}
+        if len(batch) > 1:
+            try:
+                response = await self._timed(self._invoke_batch, [r for r, _ in batch])
+                by_index = {
+                    res.index: RequestResources(description=res.description, resources=res.resources)
+                    for res in response.results
+                }
+                self.stats.prompt_tokens_saved += (len(batch) - 1) * self.prompt_overhead_tokens
+            except Exception as exc:
+                log.warning("Batch extraction of %d requests failed, falling back: %s", len(batch), exc)
+
+        async def resolve(i: int, request: str, fut: asyncio.Future) -> None:
+            try:
+                result = by_index.get(i)
+                if result is None:
+                    if len(batch) > 1:
+                        self.stats.fallbacks += 1
+                    result = await self._single(request)
+                if not fut.done():
+                    fut.set_result(result)
+            except Exception as exc:
+                if not fut.done():
+                    fut.set_exception(exc)
+
+        await asyncio.gather(*(resolve(i, r, f) for i, (r, f) in enumerate(batch)))
+        log.info("[BATCH] %s", self.stats)
+
+    async def shutdown(self) -> None:
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,263 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+from pydantic import BaseModel
+
+from httplib import HTTPRequest, HTTPRequestData, ResourceLocator
+from src.llm import RequestPart
+from cnc.helpers.ids import is_id_like
+
+log = logging.getLogger(__name__)
+
+# Optional JSON mirror of the cache; the hub persists entries in the database
+ENRICHMENT_CACHE_PATH = os.environ.get("ENRICHMENT_CACHE_PATH")
+# seconds between rewrites of the JSON mirror while entries change
+ENRICHMENT_CACHE_SAVE_INTERVAL = float(os.environ.get("ENRICHMENT_CACHE_SAVE_INTERVAL", "30"))
+ID_PLACEHOLDER = "{id}"
+
+AnyRequest = Union[HTTPRequest, HTTPRequestData]
+BodyPath = Tuple[Union[str, int], ...]
+AppId = Any  # UUID or str; None for app-agnostic entries
+
+
+def flatten_body(body: Any, prefix: BodyPath = ()) -> Iterable[Tuple[BodyPath, Any]]:
+    """Yield (path, leaf value) for every scalar inside a JSON-like body."""
+    if isinstance(body, dict):
+        for k, v in body.items():
+            yield from flatten_body(v, prefix + (k,))
+    elif isinstance(body, list):
+        for i, v in enumerate(body):
+            yield from flatten_body(v, prefix + (i,))
+    else:
+        yield prefix, body
+
+
+def _path_str(path: BodyPath) -> str:
+    return "/".join("*" if isinstance(p, int) else str(p) for p in path)
+
+
+def route_template(request: AnyRequest) -> str:
+    """
+    Structural fingerprint of a request: method, host, path with ID-like
+    segments replaced by {id}, sorted query keys and the body's key paths.
+    `GET /api/Users/1` and `GET /api/Users/2` share a template.
+    """
+    parts = urlsplit(request.url)
+    segments = [ID_PLACEHOLDER if is_id_like(s) else s for s in parts.path.split("/")]
+    query_keys = sorted({k for k, _ in parse_qsl(parts.query, keep_blank_values=True)})
+
+    template = f"{request.method.upper()} {parts.netloc.lower()}{'/'.join(segments)}"
+    if query_keys:
+        template += "?" + "&".join(query_keys)
+    if request.post_data:
+        body_keys = sorted({_path_str(p) for p, _ in flatten_body(request.post_data)})
+        template += " {" + ",".join(body_keys) + "}"
+    return template
+
+
+class LocatorPosition(BaseModel):
+    """Where a resource id sits inside a request, independent of its value."""
+    request_part: RequestPart
+    where: str                      # "path" | "query" | "body" | "header"
+    key: List[Union[str, int]]      # segment index, query/header name, or body path
+    prefix: str = ""
+    suffix: str = ""
+    type_name: str
+
+    def _raw(self, request: AnyRequest) -> Optional[str]:
+        if self.where == "path":
+            segments = urlsplit(request.url).path.split("/")
+            idx = self.key[0]
+            return segments[idx] if isinstance(idx, int) and idx < len(segments) else None
+        if self.where == "query":
+            return dict(parse_qsl(urlsplit(request.url).query, keep_blank_values=True)).get(self.key[0])
+        if self.where == "header":
+            headers = {k.lower(): v for k, v in request.headers.items()}
+            return headers.get(str(self.key[0]).lower())
+        if self.where == "body":
+            node: Any = request.post_data
+            for k in self.key:
+                try:
+                    node = node[k]
+                except (KeyError, IndexError, TypeError):
+                    return None
+            return None if isinstance(node, (dict, list)) or node is None else str(node)
+        return None
+
+    def extract(self, request: AnyRequest) -> Optional[ResourceLocator]:
+        """Re-apply this position to a new concrete request."""
+        raw = self._raw(request)
+        if raw is None or not raw.startswith(self.prefix) or not raw.endswith(self.suffix):
+            return None
+        value = raw[len(self.prefix): len(raw) - len(self.suffix)] if self.suffix else raw[len(self.prefix):]
+        if not value:
+            return None
+        return ResourceLocator(id=value, request_part=self.request_part, type_name=self.type_name)
+
+
+def _split_around(raw: str, value: str) -> Optional[Tuple[str, str]]:
+    idx = raw.find(value)
+    if idx < 0:
+        return None
+    return raw[:idx], raw[idx + len(value):]
+
+
+def locate(request: AnyRequest, locator: ResourceLocator) -> Optional[LocatorPosition]:
+    """Find a value-independent position for `locator` inside `request`."""
+    candidates: List[Tuple[str, List[Union[str, int]], str]] = []
+    parts = urlsplit(request.url)
+    if locator.request_part == RequestPart.URL:
+        candidates += [("path", [i], s) for i, s in enumerate(parts.path.split("/"))]
+        candidates += [("query", [k], v) for k, v in parse_qsl(parts.query, keep_blank_values=True)]
+    elif locator.request_part == RequestPart.BODY:
+        candidates += [
+            ("body", list(p), str(v)) for p, v in flatten_body(request.post_data or {}) if v is not None
+        ]
+    elif locator.request_part == RequestPart.HEADERS:
+        candidates += [("header", [k], v) for k, v in request.headers.items()]
+
+    # Exact matches beat substring matches
+    for exact in (True, False):
+        for where, key, raw in candidates:
+            if exact and raw != locator.id:
+                continue
+            around = _split_around(raw, locator.id)
+            if around is None:
+                continue
+            return LocatorPosition(
+                request_part=locator.request_part,
+                where=where,
+                key=key,
+                prefix=around[0],
+                suffix=around[1],
+                type_name=locator.type_name,
+            )
+    return None
+
+
+class CacheEntry(BaseModel):
+    positions: List[LocatorPosition]
+    hits: int = 0
+
+
+class EnrichmentCache:
+    """
+    Resource-locator cache keyed by application and `route_template`. Cached
+    positions are re-applied to the concrete values of each new request, so
+    structurally identical requests skip the LLM. `dump`/`merge` move an
+    application's entries in and out as plain JSON for persistence and
+    export between environments. With a `path`, new entries are written to
+    it in batches by `run`, or by `flush`.
+    """
+
+    def __init__(self, path: Optional[str] = ENRICHMENT_CACHE_PATH):
+        self.path = path
+        self._entries: Dict[Tuple[str, str], CacheEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # entries stored since the file was last written
+        self._dirty = False
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _app_key(app_id: AppId) -> str:
+        return str(app_id) if app_id is not None else ""
+
+    def get(self, template: str, app_id: AppId = None) -> Optional[CacheEntry]:
+        return self._entries.get((self._app_key(app_id), template))
+
+    def lookup(self, request: AnyRequest, app_id: AppId = None) -> Optional[List[ResourceLocator]]:
+        """Cached locators re-bound to `request`'s values, or None on a miss."""
+        entry = self.get(route_template(request), app_id)
+        if entry is not None:
+            locators = [p.extract(request) for p in entry.positions]
+            if all(locators):
+                entry.hits += 1
+                self.hits += 1
+                return locators
+        self.misses += 1
+        return None
+
+    def store(self, request: AnyRequest, locators: List[ResourceLocator], app_id: AppId = None) -> bool:
+        """Cache the locators found for `request`; returns False if any can't be positioned."""
+        positions = [locate(request, rl) for rl in locators]
+        if not all(positions):
+            log.debug("Not caching %s: unlocatable resource id", request.url)
+            return False
+        with self._lock:
+            self._entries[(self._app_key(app_id), route_template(request))] = CacheEntry(positions=positions)
+            self._dirty = True
+        return True
+
+    # ── persistence ───────────────────────────────────────────────────────
+    def dump(self, app_id: AppId = None) -> Dict[str, Any]:
+        """An application's entries as {template: entry}."""
+        app_key = self._app_key(app_id)
+        with self._lock:
+            return {t: e.model_dump(mode="json") for (a, t), e in self._entries.items() if a == app_key}
+
+    def merge(self, entries: Dict[str, Any], app_id: AppId = None) -> int:
+        app_key = self._app_key(app_id)
+        with self._lock:
+            for template, entry in entries.items():
+                self._entries[(app_key, template)] = CacheEntry.model_validate(entry)
+        return len(entries)
+
+    def save(self, path: str) -> None:
+        with self._lock:
+            apps = {a for a, _ in self._entries}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({a: self.dump(a or None) for a in apps}, f)
+        os.replace(tmp, path)
+
+    def flush(self) -> bool:
+        """Write the entries stored since the last flush to `path`; False if there was nothing to write."""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return False
+            self._dirty = False
+        self.save(self.path)
+        return True
+
+    async def run(self, interval: float = ENRICHMENT_CACHE_SAVE_INTERVAL) -> None:
+        """Flush off the event loop every `interval` seconds."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except OSError as exc:
+                log.warning("Writing enrichment cache %s failed: %s", self.path, exc)
+
+    def load(self, path: str) -> None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                n = sum(self.merge(entries, a or None) for a, entries in json.load(f).items())
+            log.info("Loaded %d enrichment templates from %s", n, path)
+        except (OSError, ValueError, AttributeError) as e:
+            log.warning("Could not load enrichment cache %s: %s", path, e)
+
+    # ── reporting ─────────────────────────────────────────────────────────
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "templates": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "llm_calls_saved": self.hits,
+        }
@@ -0,0 +1,85 @@
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+from typing import Deque, Set, Tuple
+
+from cnc.schemas.http import EnrichAuthNZMessage
+from cnc.services.enrichment_cache import route_template
+
+ENRICHMENT_CONCURRENCY = int(os.environ.get("ENRICHMENT_CONCURRENCY", "16"))
+
+PRIORITY_NOVEL = 0      # unseen route template, user or role
+PRIORITY_KNOWN = 1
+
+
+class LatencyStats:
+    """Running latency summary over the last `window` samples."""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: Deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def p95(self) -> float:
+        if not self._recent:
+            return 0.0
+        ordered = sorted(self._recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def __str__(self) -> str:
+        return f"n={self.count} avg={self.avg * 1e3:.0f}ms p95={self.p95 * 1e3:.0f}ms max={self.max * 1e3:.0f}ms"
+
+
+class EnrichmentQueue:
+    """
+    Priority queue in front of the enrichment workers. Messages for a route
+    template, user or role that hasn't been seen yet jump ahead of repeats
+    of already known traffic; ties are served FIFO.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._seen_templates: Set[str] = set()
+        self._seen_principals: Set[Tuple[str, str]] = set()
+        self.queue_time = LatencyStats()
+        self.service_time = LatencyStats()
+
+    def __len__(self) -> int:
+        return self._queue.qsize()
+
+    def priority(self, msg: EnrichAuthNZMessage) -> int:
+        template = route_template(msg.http_msg.request)
+        principal = (msg.username, msg.role or "")
+        novel = template not in self._seen_templates or principal not in self._seen_principals
+        self._seen_templates.add(template)
+        self._seen_principals.add(principal)
+        return PRIORITY_NOVEL if novel else PRIORITY_KNOWN
+
+    def put_nowait(self, msg: EnrichAuthNZMessage) -> None:
+        self._queue.put_nowait((self.priority(msg), next(self._seq), time.monotonic(), msg))
+
+    async def get(self) -> EnrichAuthNZMessage:
+        _, _, enqueued_at, msg = await self._queue.get()
+        self.queue_time.add(time.monotonic() - enqueued_at)
+        return msg
+
+    def task_done(self) -> None:
+        self._queue.task_done()
+
+    def __str__(self) -> str:
+        return f"depth={len(self)} queue_time[{self.queue_time}] service_time[{self.service_time}]"
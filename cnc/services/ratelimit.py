@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Iterator, AsyncIterator, Mapping, Optional
+from urllib.parse import urlsplit
+
+log = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = {429, 503}
+POLL_INTERVAL = 0.01  # seconds between re-checks while a host is saturated
+
+
+@dataclass
+class HostLimits:
+    """Starting point and bounds for every host's token bucket / AIMD window."""
+    rate: float = 10.0              # tokens per second
+    burst: float = 10.0
+    min_rate: float = 0.5
+    max_rate: float = 200.0
+    rate_increase: float = 0.5      # additive increase per healthy response
+    concurrency: float = 4.0
+    min_concurrency: float = 1.0
+    max_concurrency: float = 64.0
+    decrease: float = 0.5           # multiplicative decrease on throttling
+    decrease_cooldown: float = 1.0  # at most one decrease per host per window
+    latency_factor: float = 3.0     # latency > factor * baseline counts as congestion
+    max_retry_after: float = 300.0
+    rps_window: float = 10.0
+
+
+@dataclass
+class HostStats:
+    host: str
+    rps: float
+    rate: float
+    concurrency_limit: int
+    in_flight: int
+    sent: int
+    throttled: int
+    errors: int
+    latency_ms: Optional[float]
+
+    def __str__(self) -> str:
+        latency = f"{self.latency_ms:.0f}ms" if self.latency_ms is not None else "-"
+        return (
+            f"{self.host}: {self.rps:.1f} req/s (rate={self.rate:.1f}/s "
+            f"limit={self.concurrency_limit} in_flight={self.in_flight} "
+            f"sent={self.sent} throttled={self.throttled} errors={self.errors} latency={latency})"
+        )
+
+
+class _HostState:
+    __slots__ = (
+        "rate", "tokens", "refilled_at", "limit", "in_flight", "blocked_until",
+        "latency_ewma", "last_decrease", "sent", "throttled", "errors", "completed",
+    )
+
+    def __init__(self, limits: HostLimits, now: float):
+        self.rate = limits.rate
+        self.tokens = limits.burst
+        self.refilled_at = now
+        self.limit = limits.concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency_ewma: Optional[float] = None
+        self.last_decrease = 0.0
+        self.sent = 0
+        self.throttled = 0
+        self.errors = 0
+        self.completed: Deque[float] = deque()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Return the Retry-After delay in seconds (delta-seconds or HTTP-date form)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return (parts.netloc or parts.path.split("/", 1)[0]).lower()
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class Slot:
+    """One granted request slot; call `record` with the outcome before release."""
+
+    def __init__(self, scheduler: "HostScheduler", host: str):
+        self._scheduler = scheduler
+        self.host = host
+        self._started = time.monotonic()
+        self._recorded = False
+
+    def record(self, status: Optional[int], headers: Optional[Mapping[str, str]] = None) -> None:
+        if self._recorded:
+            return
+        self._recorded = True
+        retry_after = None
+        if headers is not None:
+            retry_after = parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+        self._scheduler._release(self.host, status, time.monotonic() - self._started, retry_after)
+
+    def _finish(self) -> None:
+        # Exceptions escaping the slot count as transport errors
+        self.record(None)
+
+
+class HostScheduler:
+    """
+    Per-target-host scheduler shared by every attack worker.
+
+    Each host gets a token bucket that bounds the steady request rate and an
+    AIMD concurrency window: both grow additively on healthy responses and are
+    cut multiplicatively on 429/503/5xx, transport errors or latency spikes.
+    A Retry-After header pauses the host until it expires.
+    """
+
+    def __init__(self, limits: Optional[HostLimits] = None):
+        self.limits = limits or HostLimits()
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    # ── acquisition ───────────────────────────────────────────────────────
+    def _try_acquire(self, host: str) -> float:
+        """Grab a slot for `host`; returns 0 on success, else seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            st = self._hosts.get(host)
+            if st is None:
+                st = self._hosts[host] = _HostState(self.limits, now)
+
+            if now < st.blocked_until:
+                return st.blocked_until - now
+            if st.in_flight >= int(st.limit):
+                return POLL_INTERVAL
+
+            st.tokens = min(self.limits.burst, st.tokens + (now - st.refilled_at) * st.rate)
+            st.refilled_at = now
+            if st.tokens < 1.0:
+                return (1.0 - st.tokens) / st.rate
+
+            st.tokens -= 1.0
+            st.in_flight += 1
+            st.sent += 1
+            return 0.0
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[Slot]:
+        """
+        Blocking acquire for worker threads. A paused host can hold it for up
+        to `max_retry_after` seconds, so it refuses to run on an event loop:
+        async callers use `aslot`.
+        """
+        if _on_event_loop():
+            raise RuntimeError("HostScheduler.slot() would block the event loop, use aslot()")
+        host = host_key(url)
+        while (wait := self._try_acquire(host)) > 0:
+            time.sleep(wait)
+        slot = Slot(self, host)
+        try:
+            yield slot
+        finally:
+            slot._finish()
+
+    @asynccontextmanager
+    async def aslot(self, url: str) -> AsyncIterator[Slot]:
+        host = host_key(url)
+        while (wait := self._try_acquire(host)) > 0:
+            await asyncio.sleep(wait)
+        slot = Slot(self, host)
+        try:
+            yield slot
+        finally:
+            slot._finish()
+
+    # ── feedback ──────────────────────────────────────────────────────────
+    def _decrease(self, st: _HostState, now: float) -> None:
+        if now - st.last_decrease < self.limits.decrease_cooldown:
+            return
+        st.last_decrease = now
+        st.limit = max(self.limits.min_concurrency, st.limit * self.limits.decrease)
+        st.rate = max(self.limits.min_rate, st.rate * self.limits.decrease)
+
+    def _release(
+        self,
+        host: str,
+        status: Optional[int],
+        latency: float,
+        retry_after: Optional[float],
+    ) -> None:
+        now = time.monotonic()
+        with self._lock:
+            st = self._hosts[host]
+            st.in_flight = max(0, st.in_flight - 1)
+            st.completed.append(now)
+
+            if status is None or status in THROTTLE_STATUSES or status >= 500:
+                if status in THROTTLE_STATUSES:
+                    st.throttled += 1
+                else:
+                    st.errors += 1
+                self._decrease(st, now)
+                if retry_after is not None:
+                    st.blocked_until = max(
+                        st.blocked_until, now + min(retry_after, self.limits.max_retry_after)
+                    )
+                    log.info("[RATE ] %s asked us to back off for %.1fs", host, retry_after)
+                return
+
+            baseline = st.latency_ewma
+            st.latency_ewma = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+            if baseline is not None and latency > self.limits.latency_factor * baseline:
+                self._decrease(st, now)
+                return
+
+            st.limit = min(self.limits.max_concurrency, st.limit + 1.0 / st.limit)
+            st.rate = min(self.limits.max_rate, st.rate + self.limits.rate_increase)
+
+    # ── reporting ─────────────────────────────────────────────────────────
+    def stats(self) -> Dict[str, HostStats]:
+        """Achieved requests per second (over `rps_window`) plus current limits, per host."""
+        now = time.monotonic()
+        window = self.limits.rps_window
+        out: Dict[str, HostStats] = {}
+        with self._lock:
+            for host, st in self._hosts.items():
+                while st.completed and now - st.completed[0] > window:
+                    st.completed.popleft()
+                out[host] = HostStats(
+                    host=host,
+                    rps=len(st.completed) / window,
+                    rate=st.rate,
+                    concurrency_limit=int(st.limit),
+                    in_flight=st.in_flight,
+                    sent=st.sent,
+                    throttled=st.throttled,
+                    errors=st.errors,
+                    latency_ms=st.latency_ewma * 1000 if st.latency_ewma is not None else None,
+                )
+        return out
+
+    def log_stats(self) -> None:
+        for stats in self.stats().values():
+            log.info("[RATE ] %s", stats)
@@ -0,0 +1,176 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+from pydantic import BaseModel, Field
+
+from httplib import HTTPRequest, HTTPRequestData
+from src.llm import RequestPart, RequestResources, Resource, ResourceType
+from cnc.helpers.ids import id_shape, NUMERIC_RE
+from cnc.services.enrichment_cache import flatten_body
+
+AnyRequest = Union[HTTPRequest, HTTPRequestData]
+
+CONFIDENCE_THRESHOLD = 0.75
+
+# Confidence of a path segment id, by shape, when preceded by a collection name
+PATH_SHAPE_CONFIDENCE = {
+    "uuid": 0.95,
+    "objectid": 0.95,
+    "numeric": 0.9,
+    "hex": 0.85,
+    "email": 0.85,
+    "hashid": 0.65,
+}
+KEYED_ID_CONFIDENCE = 0.9      # foo_id=<id-like>, fooId: <id-like>
+UUID_VALUE_CONFIDENCE = 0.8    # owner: "5f1d7f5e-..."
+# product: "2" -- as likely to be a zipCode or mobileNum, so the LLM decides
+NOUN_KEY_CONFIDENCE = 0.6
+UNSHAPED_ID_CONFIDENCE = 0.6   # foo_id: "some-slug"
+
+VERSION_SEGMENT_RE = re.compile(r"^v\d+(\.\d+)*$", re.IGNORECASE)
+ID_KEY_RE = re.compile(r"^(?P<noun>.*?)[-_]?(id|Id|ID|uuid|Uuid|UUID)$")
+NON_RESOURCE_KEYS = {
+    "quantity", "qty", "amount", "price", "total", "count", "page", "limit", "offset",
+    "size", "per_page", "pagesize", "sort", "rating", "version", "reference", "status",
+    "visibility", "notes", "forms", "password", "csrfmiddlewaretoken", "csrf", "token",
+    "timestamp", "ts", "expires", "lang", "locale",
+}
+
+
+class ResourceCandidate(BaseModel):
+    resource: Resource
+    confidence: float
+    shape: Optional[str] = None
+
+
+class HeuristicResult(BaseModel):
+    candidates: List[ResourceCandidate] = Field(default_factory=list)
+    # parameters that look like they could be ids but we can't tell
+    ambiguous: List[str] = Field(default_factory=list)
+
+    def is_confident(self, threshold: float = CONFIDENCE_THRESHOLD) -> bool:
+        # finding nothing is not evidence of no ids: slugs, names and ids in
+        # free-form fields are only recognized by the LLM
+        return (
+            bool(self.candidates)
+            and not self.ambiguous
+            and all(c.confidence >= threshold for c in self.candidates)
+        )
+
+    def to_request_resources(self) -> RequestResources:
+        return RequestResources(
+            description="heuristic",
+            resources=[c.resource for c in self.candidates],
+        )
+
+
+def singularize(word: str) -> str:
+    word = word.lower()
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("sses", "shes", "ches", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _key_noun(key: str) -> str:
+    """'items-0-product' -> 'product', 'BasketId' -> 'basket', 'user_id' -> 'user'."""
+    last = re.split(r"[-.\[\]]", key.strip("-_[]"))[-1] or key
+    m = ID_KEY_RE.match(last)
+    noun = m.group("noun") if m else last
+    noun = re.sub(r"(?<=[a-z])(?=[A-Z])", "_", noun).strip("_")
+    return singularize(noun) if noun else ""
+
+
+def _is_id_key(key: str) -> bool:
+    last = re.split(r"[-.\[\]]", key.strip("-_[]"))[-1] or key
+    return bool(ID_KEY_RE.match(last))
+
+
+class HeuristicExtractor:
+    """
+    Deterministic resource-id extractor used as a fast path before the LLM.
+
+    Recognizes numeric path segments, UUIDs, Mongo ObjectIds, hex ids,
+    hashids, email addresses and `*_id` style query/body fields, each
+    scored with a confidence. Only ids that can be located and swapped in
+    place are reported. Callers should fall back to the LLM when
+    `HeuristicResult.is_confident()` is False.
+    """
+
+    def _candidate(
+        self, rid: str, type_name: str, part: RequestPart, confidence: float, shape: Optional[str]
+    ) -> ResourceCandidate:
+        return ResourceCandidate(
+            resource=Resource(id=rid, type=ResourceType(name=type_name or "resource"), request_part=part),
+            confidence=confidence,
+            shape=shape,
+        )
+
+    def _from_path(self, path: str, out: HeuristicResult) -> Optional[str]:
+        """Collect path ids; returns the last collection name seen in the path."""
+        prev_noun: Optional[str] = None
+        for seg in path.split("/"):
+            if not seg:
+                continue
+            shape = id_shape(seg)
+            if shape:
+                conf = PATH_SHAPE_CONFIDENCE[shape] if prev_noun else PATH_SHAPE_CONFIDENCE[shape] - 0.2
+                out.candidates.append(
+                    self._candidate(seg, prev_noun or "resource", RequestPart.URL, conf, shape)
+                )
+                continue
+            if any(c.isdigit() for c in seg) and not VERSION_SEGMENT_RE.match(seg) and "." not in seg:
+                out.ambiguous.append(seg)
+                continue
+            prev_noun = singularize(seg.replace("-", "_"))
+        return prev_noun
+
+    def _from_fields(
+        self,
+        fields: List[Tuple[str, Any]],
+        part: RequestPart,
+        out: HeuristicResult,
+        default_noun: Optional[str] = None,
+    ) -> None:
+        for key, value in fields:
+            if value is None or isinstance(value, bool):
+                continue
+            value = str(value)
+            if not value:
+                continue
+            noun = _key_noun(key) or default_noun or ""
+            if noun in NON_RESOURCE_KEYS or key.lower() in NON_RESOURCE_KEYS or "csrf" in key.lower():
+                continue
+            last = key.split("-")[-1]
+            if last.isupper() and not ID_KEY_RE.match(last):
+                continue  # form-management fields such as items-TOTAL_FORMS
+            shape = id_shape(value)
+            if _is_id_key(key):
+                conf = KEYED_ID_CONFIDENCE if shape else UNSHAPED_ID_CONFIDENCE
+                out.candidates.append(self._candidate(value, noun, part, conf, shape))
+            elif shape == "email":
+                out.candidates.append(self._candidate(value, "user", part, PATH_SHAPE_CONFIDENCE["email"], shape))
+            elif shape and NUMERIC_RE.match(value) and noun:
+                out.candidates.append(self._candidate(value, noun, part, NOUN_KEY_CONFIDENCE, shape))
+            elif shape in ("uuid", "objectid"):
+                out.candidates.append(self._candidate(value, noun or "resource", part, UUID_VALUE_CONFIDENCE, shape))
+            elif shape and noun:
+                out.candidates.append(self._candidate(value, noun, part, UNSHAPED_ID_CONFIDENCE, shape))
+
+    def extract(self, request: AnyRequest) -> HeuristicResult:
+        out = HeuristicResult()
+        parts = urlsplit(request.url)
+        path_noun = self._from_path(parts.path, out)
+        self._from_fields(
+            parse_qsl(parts.query, keep_blank_values=True), RequestPart.URL, out, path_noun
+        )
+        if request.post_data:
+            fields = [
+                ("-".join(str(p) for p in path), v) for path, v in flatten_body(request.post_data)
+            ]
+            self._from_fields(fields, RequestPart.BODY, out, path_noun)
+        return out
@@ -0,0 +1,139 @@
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+from httplib import HTTPRequest, HTTPRequestData
+from cnc.helpers.ids import is_id_like
+from cnc.services.enrichment_cache import ID_PLACEHOLDER
+
+log = logging.getLogger(__name__)
+
+# siblings with the same sub-structure past this count are values, not routes
+ROUTE_VARIANCE_THRESHOLD = int(os.environ.get("ROUTE_VARIANCE_THRESHOLD", "20"))
+
+AnyRequest = Union[HTTPRequest, HTTPRequestData]
+
+
+class _Node:
+    __slots__ = ("children", "param", "wildcard")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        # set once literal siblings were collapsed: unseen literals go to `param`
+        self.wildcard = False
+
+    def signature(self) -> frozenset:
+        keys = frozenset(self.children)
+        return keys | {ID_PLACEHOLDER} if self.param is not None else keys
+
+    def merge(self, other: "_Node") -> None:
+        for seg, child in other.children.items():
+            if seg in self.children:
+                self.children[seg].merge(child)
+            else:
+                self.children[seg] = child
+        if other.param is not None:
+            if self.param is None:
+                self.param = other.param
+            else:
+                self.param.merge(other.param)
+        self.wildcard = self.wildcard or other.wildcard
+
+    def to_state(self) -> Dict[str, Any]:
+        state: Dict[str, Any] = {"c": {seg: c.to_state() for seg, c in self.children.items()}}
+        if self.param is not None:
+            state["p"] = self.param.to_state()
+        if self.wildcard:
+            state["w"] = 1
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "_Node":
+        node = cls()
+        node.children = {seg: cls.from_state(c) for seg, c in state["c"].items()}
+        if "p" in state:
+            node.param = cls.from_state(state["p"])
+        node.wildcard = bool(state.get("w"))
+        return node
+
+
+class RouteInferer:
+    """
+    Incrementally clusters concrete URLs into parameterised routes with one
+    trie of path segments per host. ID-shaped segments are parameters right
+    away. When more than `threshold` literal siblings share the same
+    sub-structure they are collapsed into a parameter as well, so usernames,
+    slugs and file names stop producing one route per value.
+
+    `GET http://shop/api/Baskets/1?x=2` -> `GET http://shop/api/Baskets/{id}?x`
+    """
+
+    def __init__(self, threshold: int = ROUTE_VARIANCE_THRESHOLD):
+        self.threshold = threshold
+        self._roots: Dict[str, _Node] = {}
+        self.collapses = 0
+
+    def _collapse(self, node: _Node) -> None:
+        groups: Dict[frozenset, List[str]] = {}
+        for seg, child in node.children.items():
+            groups.setdefault(child.signature(), []).append(seg)
+        segs = max(groups.values(), key=len)
+        if len(segs) <= self.threshold:
+            return
+        if node.param is None:
+            node.param = _Node()
+        for seg in segs:
+            node.param.merge(node.children.pop(seg))
+        node.wildcard = True
+        self.collapses += 1
+        log.debug("Collapsed %d literal segments into a parameter", len(segs))
+
+    def _walk(self, host: str, path: str) -> Tuple[List[str], List[_Node]]:
+        node = self._roots.setdefault(host, _Node())
+        out: List[str] = []
+        grown: List[_Node] = []
+        for seg in path.split("/"):
+            if seg in node.children:
+                node = node.children[seg]
+                out.append(seg)
+            elif is_id_like(seg) or (node.wildcard and seg):
+                if node.param is None:
+                    node.param = _Node()
+                node = node.param
+                out.append(ID_PLACEHOLDER)
+            else:
+                grown.append(node)
+                child = node.children[seg] = _Node()
+                node = child
+                out.append(seg)
+        return out, grown
+
+    def path_template(self, host: str, path: str) -> str:
+        out, grown = self._walk(host, path)
+        # check variance once the new branch is complete, deepest node first
+        before = self.collapses
+        for node in reversed(grown):
+            if len(node.children) > self.threshold:
+                self._collapse(node)
+        if self.collapses != before:
+            out, _ = self._walk(host, path)
+        return "/".join(out)
+
+    def route(self, request: AnyRequest) -> str:
+        """Observe `request` and return its route key."""
+        parts = urlsplit(request.url)
+        route = f"{request.method.upper()} {parts.scheme}://{parts.netloc.lower()}"
+        route += self.path_template(parts.netloc.lower(), parts.path)
+        query_keys = sorted({k for k, _ in parse_qsl(parts.query, keep_blank_values=True)})
+        if query_keys:
+            route += "?" + "&".join(query_keys)
+        return route
+
+    def to_state(self) -> Dict[str, Any]:
+        return {host: root.to_state() for host, root in self._roots.items()}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        for host, root in state.items():
+            self._roots[host] = _Node.from_state(root)
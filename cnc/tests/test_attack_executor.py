@@ -0,0 +1,78 @@
+import asyncio
+from unittest.mock import Mock
+
+from cnc.workers.attackers.authnz.intruder import (
+    AsyncHTTPClient,
+    AuthSession,
+    AuthzTester,
+    HTTPRequestData,
+    RequestPart,
+    ResourceLocator,
+)
+
+
+class SlowClient(Mock):
+    """AsyncHTTPClient stand-in that records peak concurrency."""
+
+    def __init__(self, delay: float = 0.02):
+        super().__init__(spec=AsyncHTTPClient)
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self.sent = []
+
+    async def send(self, request, *, auth_session=None):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        self.sent.append(request.url)
+
+    async def shutdown(self):
+        pass
+
+
+def _ingest(tester, user, url, rid):
+    tester.ingest(
+        username=user,
+        role="viewer",
+        request=HTTPRequestData(method="GET", url=url, headers={}, post_data=None),
+        resource_locators=[ResourceLocator(id=rid, type_name="order", request_part=RequestPart.URL)],
+        session=Mock(spec=AuthSession),
+    )
+
+
+def test_ingest_schedules_without_waiting_and_caps_concurrency():
+    client = SlowClient()
+    tester = AuthzTester(http_client=client, concurrency=3)
+
+    async def main():
+        for i in range(10):
+            _ingest(tester, "alice", f"http://shop/shop{i}x/orders/{i}", str(i))
+        _ingest(tester, "bob", "http://shop/orders/99", "99")
+        # nothing has been sent yet, ingest only scheduled the attacks
+        assert client.sent == []
+        await tester.aclose()
+
+    asyncio.run(main())
+    assert len(client.sent) == len(tester.findings) > 3
+    assert client.peak == 3
+
+
+def test_failed_attacks_are_counted_not_raised():
+    client = SlowClient()
+
+    async def boom(request, *, auth_session=None):
+        raise RuntimeError("connection reset")
+
+    client.send = boom
+    tester = AuthzTester(http_client=client)
+
+    async def main():
+        _ingest(tester, "alice", "http://shop/orders/1", "1")
+        _ingest(tester, "bob", "http://shop/orders/2", "2")
+        await tester.aclose()
+
+    asyncio.run(main())
+    assert tester.findings == []
+    assert tester.stats()["failed"] > 0
@@ -0,0 +1,114 @@
+import itertools
+from unittest.mock import Mock
+
+from cnc.workers.attackers.authnz.intruder import (
+    AuthSession,
+    AuthzTester,
+    HTTPClient,
+    HTTPRequestData,
+    RequestPart,
+    ResourceLocator,
+)
+from cnc.workers.attackers.authnz.models import (
+    HorizontalResourceAuthz,
+    HorizontalUserAuthz,
+    PlannedTest,
+    VerticalUserAuthz,
+)
+from cnc.workers.attackers.authnz.scheduler import AttackScheduler, sensitivity
+
+
+def _attack(variant, action, type_name="order", user="bob:user"):
+    return variant(attack_info=PlannedTest(user=user, resource_id="1", action=action, type_name=type_name))
+
+
+def _drain(scheduler):
+    out = []
+    while (attack := scheduler.pop()) is not None:
+        out.append(attack)
+    return out
+
+
+def test_vertical_then_sensitive_then_novel():
+    reviews = "GET http://shop/api/reviews/{id}"
+    users = "GET http://shop/api/users/{id}"
+    scheduler = AttackScheduler()
+    scheduler.push([
+        _attack(HorizontalUserAuthz, users, "user"),
+        _attack(HorizontalUserAuthz, users, "user", user="carol:user"),
+        _attack(HorizontalResourceAuthz, "GET http://shop/api/accounts/{id}", "account"),
+        _attack(HorizontalUserAuthz, "GET http://shop/api/products/{id}", "product"),
+    ], variant=None, type_name=None, action=reviews)
+    scheduler.push(
+        [_attack(VerticalUserAuthz, reviews, "review", user="admin:admin")],
+        variant=VerticalUserAuthz, type_name="review", action=reviews,
+    )
+
+    order = [(type(a).__name__, a.attack_info.type_name, a.attack_info.user) for a in _drain(scheduler)]
+    assert order[0] == ("VerticalUserAuthz", "review", "admin:admin")
+    # the second /users attack waits behind the equally sensitive, untested /accounts
+    assert [t for _, t, _ in order[1:]] == ["user", "account", "user", "product"]
+    assert sensitivity("Card", "DELETE http://shop/api/x") > sensitivity("Card", "GET http://shop/api/x")
+
+
+def test_budget_stops_dispatch_without_expanding_the_rest():
+    pulled = itertools.count()
+
+    def endless():
+        for i in itertools.count():
+            next(pulled)
+            yield _attack(HorizontalUserAuthz, f"GET http://shop/api/orders/{i}")
+
+    scheduler = AttackScheduler(budget=5)
+    scheduler.push(endless(), variant=HorizontalUserAuthz, type_name="order", action="GET http://shop/api/orders/{id}")
+    assert len(_drain(scheduler)) == 5
+    assert scheduler.exhausted
+    assert next(pulled) <= 6
+
+
+def test_tester_stops_sending_once_budget_is_spent():
+    client = Mock(spec=HTTPClient)
+    client.send.return_value = None
+    tester = AuthzTester(http_client=client, budget=2)
+
+    def ingest(user, role, url, rid):
+        tester.ingest(
+            username=user,
+            role=role,
+            request=HTTPRequestData(method="GET", url=url, headers={}, post_data=None),
+            resource_locators=[ResourceLocator(id=rid, type_name="order", request_part=RequestPart.URL)],
+            session=AuthSession(headers={"X-User": user}),
+        )
+
+    ingest("alice", "user", "http://shop/api/orders/1", "1")
+    ingest("bob", "user", "http://shop/api/orders/2", "2")
+    ingest("admin", "admin", "http://shop/api/admin/orders/3", "3")
+    ingest("carol", "user", "http://shop/api/orders/4", "4")
+
+    assert len(tester.findings) == 2
+    assert tester.scheduler().exhausted and len(tester.scheduler()) > 0
+
+
+def test_budget_is_spent_per_application():
+    client = Mock(spec=HTTPClient)
+    client.send.return_value = None
+    tester = AuthzTester(http_client=client, budget=1)
+
+    def ingest(app_id, user, rid):
+        tester.ingest(
+            username=user,
+            role="user",
+            request=HTTPRequestData(method="GET", url=f"http://{app_id}/api/orders/{rid}", headers={}, post_data=None),
+            resource_locators=[ResourceLocator(id=rid, type_name="order", request_part=RequestPart.URL)],
+            session=AuthSession(headers={"X-User": user}),
+            app_id=app_id,
+        )
+
+    ingest("shop", "alice", "1")
+    ingest("shop", "bob", "2")
+    # shop's budget is gone, blog still gets its own
+    ingest("blog", "carol", "3")
+    ingest("blog", "dave", "4")
+
+    assert len(tester.findings) == 2
+    assert tester.scheduler("shop").exhausted and tester.scheduler("blog").exhausted
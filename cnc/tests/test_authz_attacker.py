@@ -0,0 +1,57 @@
+import asyncio
+from unittest.mock import Mock
+from uuid import uuid4
+
+from httplib import AuthSession, HTTPRequest, HTTPRequestData, RequestPart, ResourceLocator
+from cnc.schemas.http import EnrichedRequest
+from cnc.services.queue import BroadcastChannel
+from cnc.workers.attackers.authnz.attacker import AuthzAttacker
+from cnc.workers.attackers.authnz.intruder import AuthzTester, HTTPClient
+
+
+def _enriched(app_id, user, rid):
+    return EnrichedRequest(
+        request=HTTPRequest(data=HTTPRequestData(method="GET", url=f"http://shop/api/orders/{rid}", headers={})),
+        username=user,
+        role="user",
+        session=AuthSession(headers={"Authorization": f"Bearer {user}"}),
+        resource_locators=[ResourceLocator(id=rid, type_name="order", request_part=RequestPart.URL)],
+        app_id=app_id,
+    )
+
+
+def test_enriched_requests_are_attacked_under_their_application():
+    attacker = AuthzAttacker(inbound=BroadcastChannel[EnrichedRequest](), snapshot_dir=None)
+    app_id = uuid4()
+    tester = attacker._testers[str(app_id)] = AuthzTester(http_client=Mock(spec=HTTPClient), budget=1)
+
+    async def main():
+        for user, rid in (("alice", "1"), ("bob", "2")):
+            await attacker.ingest(**attacker._explode(_enriched(app_id, user, rid)))
+
+    asyncio.run(main())
+    assert len(tester.findings) == 1
+    assert tester.scheduler(str(app_id)).exhausted
+    assert set(tester.stats()["schedulers"]) == {str(app_id)}
+
+
+def test_each_application_restores_its_own_snapshot(tmp_path):
+    app_a, app_b = uuid4(), uuid4()
+
+    async def first_run():
+        attacker = AuthzAttacker(inbound=BroadcastChannel[EnrichedRequest](), snapshot_dir=str(tmp_path))
+        await attacker.ingest(**attacker._explode(_enriched(app_a, "alice", "1")))
+        await attacker.ingest(**attacker._explode(_enriched(app_b, "carol", "3")))
+        await attacker.shutdown()
+
+    async def restart():
+        attacker = AuthzAttacker(inbound=BroadcastChannel[EnrichedRequest](), snapshot_dir=str(tmp_path))
+        graphs = [(await attacker._tester(str(a)))._graph for a in (app_a, app_b)]
+        await attacker.shutdown()
+        return graphs
+
+    asyncio.run(first_run())
+    assert {str(app_a), str(app_b)} <= {p.name for p in tmp_path.iterdir()}
+    graph_a, graph_b = asyncio.run(restart())
+    assert graph_a.has_user("alice:user") and not graph_a.has_user("carol:user")
+    assert graph_b.has_user("carol:user") and not graph_b.has_user("alice:user")
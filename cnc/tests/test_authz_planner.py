@@ -0,0 +1,73 @@
+from httplib import HTTPRequestData, ResourceLocator
+from src.llm import RequestPart
+from cnc.workers.attackers.authnz.intruder import (
+    AccessGraph,
+    RequestTemplate,
+    TemplateRegistry,
+    TestPlanner,
+)
+from cnc.workers.attackers.authnz.models import HorizontalResourceAuthz, VerticalResourceAuthz
+
+
+def _tpl(url: str, *types: str) -> RequestTemplate:
+    return RequestTemplate(
+        HTTPRequestData(method="GET", url=url, headers={}),
+        [ResourceLocator(id="1", request_part=RequestPart.URL, type_name=t) for t in types],
+    )
+
+
+def test_registry_type_index_follows_template_replacement():
+    templates = TemplateRegistry()
+    templates.add("GET /orders/1", _tpl("http://x/orders/1", "order"))
+    templates.add("GET /users/1", _tpl("http://x/users/1", "user", "order"))
+    assert templates.actions_for_type("order") == {"GET /orders/1", "GET /users/1"}
+
+    templates.add("GET /users/1", _tpl("http://x/users/1", "user"))
+    assert templates.actions_for_type("order") == {"GET /orders/1"}
+    assert templates.actions_for_type("missing") == set()
+
+
+def test_graph_type_index():
+    graph = AccessGraph()
+    graph.record(user="a:admin", role="admin", type_name="order", resource_id="1")
+    graph.record(user="b:user", role="user", type_name="order", resource_id="2")
+    graph.record(user="b:user", role="user", type_name="order", resource_id="1")
+    assert graph.resources_of_type("order") == {"1", "2"}
+    assert graph.roles_of_resource(type_name="order", resource_id="1") == {"admin", "user"}
+    assert graph.has_user("a:admin") and not graph.has_user("c:user")
+
+
+def test_new_user_gets_one_attack_per_variant():
+    graph, templates = AccessGraph(), TemplateRegistry()
+    templates.add("GET /orders/1", _tpl("http://x/orders/1", "order"))
+    for rid, (user, role) in enumerate([("a", "admin")] * 50 + [("b", "user")] * 50):
+        graph.record(user=f"{user}:{role}", role=role, type_name="order", resource_id=str(rid))
+
+    planner = TestPlanner(graph, templates)
+    attacks = list(planner.schedule_from_ingest(
+        new_username="c", new_role="user", new_resources=[("", "")],
+        new_action="GET /orders/1", is_new_user=True,
+    ))
+    resource_attacks = [a for a in attacks if a.attack_info.type_name == "order"]
+    assert sorted(type(a).__name__ for a in resource_attacks) == [
+        HorizontalResourceAuthz.__name__, VerticalResourceAuthz.__name__,
+    ]
+
+
+def test_graph_and_planner_state_round_trip():
+    graph = AccessGraph()
+    graph.record(user="a:admin", role="admin", type_name="order", resource_id="1")
+    graph.record(user="b:user", role="user", type_name="order", resource_id="1")
+    graph.record(user="b:user", role="user", type_name="card", resource_id="1")
+    assert not graph.record(user="b:user", role="user", type_name="order", resource_id="1")
+    planner = TestPlanner(graph, TemplateRegistry())
+    planner.mark_executed(["VerticalResourceAuthz", "b:user", "GET /orders/{id}", "order"])
+
+    restored = AccessGraph()
+    restored.load_state(graph.to_state())
+    assert restored.to_state() == graph.to_state()
+    assert restored.resources_of_type("card") == {"1"} and "2" not in restored.resources_of_type("card")
+    assert dict(restored.resource_roles("order")) == {"1": {"admin", "user"}}
+    assert planner.executed() == [["VerticalResourceAuthz", "b:user", "GET /orders/{id}", "order"]]
+    assert planner._is_planned(VerticalResourceAuthz, "b:user", "GET /orders/{id}", "order")
+    assert not planner._is_planned(HorizontalResourceAuthz, "b:user", "GET /orders/{id}", "order")
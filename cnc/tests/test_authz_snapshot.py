@@ -0,0 +1,98 @@
+import asyncio
+from unittest.mock import Mock
+
+from cnc.workers.attackers.authnz.intruder import (
+    AuthSession,
+    AuthzTester,
+    HTTPClient,
+    HTTPRequestData,
+    RequestPart,
+    ResourceLocator,
+)
+from cnc.workers.attackers.authnz.snapshot import SnapshotStore, Snapshotter
+
+
+def _tester():
+    return AuthzTester(http_client=Mock(spec=HTTPClient))
+
+
+def _ingest(tester, user, role, rid):
+    tester.ingest(
+        username=user,
+        role=role,
+        request=HTTPRequestData(method="GET", url=f"http://shop/orders/{rid}", headers={}),
+        resource_locators=[ResourceLocator(id=rid, type_name="order", request_part=RequestPart.URL)],
+        session=AuthSession(headers={"Authorization": f"Bearer {user}"}),
+    )
+
+
+def _restored(store):
+    tester = _tester()
+    asyncio.run(Snapshotter(tester, store).restore())
+    return tester
+
+
+def test_restore_from_base_and_delta_keeps_coverage(tmp_path):
+    store = SnapshotStore(str(tmp_path), min_compact_bytes=0)
+    tester = _tester()
+    snap = Snapshotter(tester, store)
+    _ingest(tester, "alice", "user", "1")
+    _ingest(tester, "bob", "user", "2")
+    snap.flush_sync()
+    # after the base is written only the journal goes to disk
+    _ingest(tester, "carol", "admin", "3")
+    asyncio.run(Snapshotter(tester, SnapshotStore(str(tmp_path))).flush())
+
+    restored = _restored(store)
+    assert restored.snapshot()["graph"] == tester.snapshot()["graph"]
+    assert sorted(restored.snapshot()["executed"]) == sorted(tester.snapshot()["executed"])
+    assert restored._sessions.get("carol:admin").headers == {"Authorization": "Bearer carol"}
+
+    # the restarted tester plans exactly what the original would have
+    before = len(tester.findings)
+    _ingest(tester, "alice", "user", "1")
+    _ingest(restored, "alice", "user", "1")
+    assert restored.findings == tester.findings[before:]
+
+
+def test_truncated_delta_line_is_ignored(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    tester = _tester()
+    snap = Snapshotter(tester, store)
+    _ingest(tester, "alice", "user", "1")
+    asyncio.run(snap.flush())
+    with open(store.delta_path, "a") as f:
+        f.write('[["r","mallory:user","user","order"')
+
+    restored = _restored(store)
+    assert restored._graph.has_user("alice:user")
+    assert not restored._graph.has_user("mallory:user")
+
+
+def test_flush_compacts_once_delta_outgrows_base(tmp_path):
+    store = SnapshotStore(str(tmp_path), min_compact_bytes=1)
+    tester = _tester()
+    snap = Snapshotter(tester, store)
+    _ingest(tester, "alice", "user", "1")
+    asyncio.run(snap.flush())
+    assert store._size(store.base_path) > 0
+    assert store._size(store.delta_path) == 0
+
+
+def test_queued_attacks_are_not_snapshotted_as_executed(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    tester = AuthzTester(http_client=Mock(spec=HTTPClient), budget=1)
+    snap = Snapshotter(tester, store)
+    _ingest(tester, "alice", "user", "1")
+    _ingest(tester, "bob", "user", "2")
+    _ingest(tester, "carol", "user", "3")
+    asyncio.run(snap.flush())
+    # the budget let one attack through, the rest are still queued
+    assert len(tester.findings) == 1
+    assert len(tester.scheduler()) > 0
+    assert len(tester.snapshot()["executed"]) == 1
+
+    # after a restart the queued attacks are planned again
+    restored = _restored(store)
+    _ingest(restored, "carol", "user", "3")
+    assert len(restored.findings) > 0
@@ -0,0 +1,55 @@
+from httplib import HTTPRequestData
+from cnc.services.dedup import BloomFilter, DedupVerdict, DecayingBloomFilter, RequestDeduplicator
+
+
+def _req(url: str, headers=None, post_data=None, method: str = "GET") -> HTTPRequestData:
+    return HTTPRequestData(method=method, url=url, headers=headers or {}, post_data=post_data)
+
+
+def test_exact_and_near_duplicates():
+    dedup = RequestDeduplicator(capacity=1000, ttl=60)
+    check = lambda req, user="alice": dedup.check("app", req, user, "user")
+
+    assert check(_req("http://shop/api/Users/1")) == DedupVerdict.NEW
+    assert check(_req("http://shop/api/Users/1", {"X-Request-Id": "abc"})) == DedupVerdict.DUPLICATE
+    assert check(_req("http://shop/api/Users/2")) == DedupVerdict.NEAR_DUPLICATE
+    assert check(_req("http://shop/api/Users/1"), user="bob") == DedupVerdict.NEW
+    assert dedup.stats()["duplicate"] == 1
+
+
+def test_body_key_order_does_not_matter():
+    dedup = RequestDeduplicator(capacity=1000, ttl=60)
+    a = _req("http://shop/api/Basket", post_data={"a": 1, "b": 2}, method="POST")
+    b = _req("http://shop/api/Basket", post_data={"b": 2, "a": 1}, method="POST")
+    assert dedup.check("app", a, "alice", "user") == DedupVerdict.NEW
+    assert dedup.check("app", b, "alice", "user") == DedupVerdict.DUPLICATE
+
+
+def test_apps_are_isolated_and_bounded():
+    dedup = RequestDeduplicator(capacity=1000, ttl=60, max_apps=2)
+    req = _req("http://shop/api/Users/1")
+    assert dedup.check("a", req, "alice", "user") == DedupVerdict.NEW
+    assert dedup.check("b", req, "alice", "user") == DedupVerdict.NEW
+    dedup.check("c", req, "alice", "user")
+    assert dedup.stats()["apps"] == 2
+    # "a" was evicted, so its history is gone
+    assert dedup.check("a", req, "alice", "user") == DedupVerdict.NEW
+
+
+def test_decaying_filter_forgets_after_two_rotations():
+    f = DecayingBloomFilter(capacity=2, error_rate=0.01, ttl=3600)
+    key = b"k" * 16
+    assert not f.check_and_add(key)
+    assert f.check_and_add(key)
+    # fill the active generation to force rotations
+    for i in range(4):
+        f.check_and_add(bytes([i]) * 16)
+    assert not f.check_and_add(key)
+
+
+def test_bloom_false_positive_rate():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(i.to_bytes(16, "little"))
+    false_positives = sum((i + 10 ** 6).to_bytes(16, "little") in bloom for i in range(5000))
+    assert false_positives / 5000 < 0.03
@@ -0,0 +1,90 @@
+import asyncio
+
+from src.llm import (
+    BatchRequestResources,
+    IndexedRequestResources,
+    RequestPart,
+    RequestResources,
+    Resource,
+    ResourceType,
+)
+from cnc.services.enrichment_batch import EnrichmentBatcher
+
+
+def _resources(rid: str) -> RequestResources:
+    return RequestResources(resources=[
+        Resource(id=rid, type=ResourceType(name="user"), request_part=RequestPart.URL)
+    ])
+
+
+class FakeLLM:
+    def __init__(self, drop=()):
+        self.batch_calls = []
+        self.single_calls = []
+        self.drop = set(drop)
+
+    def batch(self, requests):
+        self.batch_calls.append(list(requests))
+        return BatchRequestResources(results=[
+            IndexedRequestResources(index=i, resources=_resources(r).resources)
+            for i, r in enumerate(requests) if r not in self.drop
+        ])
+
+    def single(self, request):
+        self.single_calls.append(request)
+        return _resources(request)
+
+
+def _run(batcher, requests):
+    async def main():
+        return await asyncio.gather(*(batcher.extract(r) for r in requests))
+    return asyncio.run(main())
+
+
+def test_burst_is_sent_as_one_batch_and_demultiplexed():
+    llm = FakeLLM()
+    batcher = EnrichmentBatcher(llm.batch, llm.single, window=0.01, max_batch=50, prompt_overhead_tokens=100)
+    requests = [f"GET /api/Users/{i}" for i in range(30)]
+
+    results = _run(batcher, requests)
+
+    assert len(llm.batch_calls) == 1 and not llm.single_calls
+    assert [r.resources[0].id for r in results] == requests
+    assert batcher.stats.avg_batch_size == 30
+    assert batcher.stats.prompt_tokens_saved == 29 * 100
+
+
+def test_max_batch_splits_burst():
+    llm = FakeLLM()
+    batcher = EnrichmentBatcher(llm.batch, llm.single, window=1.0, max_batch=4)
+    _run(batcher, [str(i) for i in range(8)])
+    assert [len(b) for b in llm.batch_calls] == [4, 4]
+
+
+def test_missing_results_fall_back_to_single_calls():
+    llm = FakeLLM(drop={"b"})
+    batcher = EnrichmentBatcher(llm.batch, llm.single, window=0.01, max_batch=10)
+    results = _run(batcher, ["a", "b", "c"])
+    assert [r.resources[0].id for r in results] == ["a", "b", "c"]
+    assert llm.single_calls == ["b"]
+    assert batcher.stats.fallbacks == 1
+
+
+def test_batch_failure_falls_back_to_single_calls():
+    llm = FakeLLM()
+
+    def broken(requests):
+        raise ValueError("bad json")
+
+    batcher = EnrichmentBatcher(broken, llm.single, window=0.01, max_batch=10)
+    results = _run(batcher, ["a", "b"])
+    assert [r.resources[0].id for r in results] == ["a", "b"]
+    assert llm.single_calls == ["a", "b"]
+
+
+def test_disabled_batching_calls_single():
+    llm = FakeLLM()
+    batcher = EnrichmentBatcher(llm.batch, llm.single, window=0, max_batch=10)
+    _run(batcher, ["a", "b"])
+    assert not llm.batch_calls
+    assert sorted(llm.single_calls) == ["a", "b"]
@@ -0,0 +1,97 @@
+import os
+
+from httplib import HTTPRequestData, ResourceLocator, RequestPart
+from cnc.services.enrichment_cache import EnrichmentCache, route_template
+
+
+def _req(url: str, method: str = "GET", post_data=None, headers=None) -> HTTPRequestData:
+    return HTTPRequestData(method=method, url=url, headers=headers or {}, post_data=post_data)
+
+
+def test_route_template_normalizes_ids():
+    a = _req("http://shop/api/Users/1")
+    b = _req("http://shop/api/Users/2")
+    c = _req("http://shop/api/Users/5f1d7f5e-0c52-4a0e-9b1e-3f7a1b2c3d4e")
+    assert route_template(a) == route_template(b) == route_template(c)
+    assert route_template(a) != route_template(_req("http://shop/api/Users/1", method="DELETE"))
+
+
+def test_route_template_includes_body_and_query_keys():
+    a = _req("http://shop/api/Basket?page=1", "POST", {"ProductId": 1, "BasketId": "7"})
+    b = _req("http://shop/api/Basket?page=9", "POST", {"BasketId": "3", "ProductId": 2})
+    c = _req("http://shop/api/Basket?page=1", "POST", {"ProductId": 1})
+    assert route_template(a) == route_template(b)
+    assert route_template(a) != route_template(c)
+
+
+def test_hit_rebinds_locators_to_new_values(tmp_path):
+    cache = EnrichmentCache(path=None)
+    first = _req("http://shop/api/Users/1")
+    cache.store(first, [ResourceLocator(id="1", request_part=RequestPart.URL, type_name="user")])
+
+    locators = cache.lookup(_req("http://shop/api/Users/42"))
+    assert locators == [ResourceLocator(id="42", request_part=RequestPart.URL, type_name="user")]
+    assert cache.stats()["llm_calls_saved"] == 1
+
+
+def test_body_and_header_positions():
+    cache = EnrichmentCache(path=None)
+    first = _req(
+        "http://shop/rest/basket",
+        "POST",
+        {"items": [{"ProductId": 3}], "BasketId": "6"},
+        {"Authorization": "Bearer tok-aaa"},
+    )
+    cache.store(first, [
+        ResourceLocator(id="3", request_part=RequestPart.BODY, type_name="product"),
+        ResourceLocator(id="aaa", request_part=RequestPart.HEADERS, type_name="token"),
+    ])
+
+    second = _req(
+        "http://shop/rest/basket",
+        "POST",
+        {"items": [{"ProductId": 9}], "BasketId": "6"},
+        {"Authorization": "Bearer tok-bbb"},
+    )
+    ids = {rl.type_name: rl.id for rl in cache.lookup(second)}
+    assert ids == {"product": "9", "token": "bbb"}
+
+
+def test_miss_when_structure_differs():
+    cache = EnrichmentCache(path=None)
+    cache.store(_req("http://shop/api/Users/1"), [])
+    assert cache.lookup(_req("http://shop/api/Products/1")) is None
+    assert cache.lookup(_req("http://shop/api/Users/7")) == []
+    assert cache.hit_rate == 0.5
+
+
+def test_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = EnrichmentCache(path=path)
+    cache.store(
+        _req("http://shop/api/Users/1"),
+        [ResourceLocator(id="1", request_part=RequestPart.URL, type_name="user")],
+    )
+    # stores are batched: nothing is written until a flush
+    assert not os.path.exists(path)
+    assert cache.flush()
+    assert not cache.flush()
+
+    restarted = EnrichmentCache(path=path)
+    assert len(restarted) == 1
+    assert restarted.lookup(_req("http://shop/api/Users/3"))[0].id == "3"
+
+
+def test_entries_are_scoped_per_application():
+    cache = EnrichmentCache(path=None)
+    cache.store(
+        _req("http://shop/api/Users/1"),
+        [ResourceLocator(id="1", request_part=RequestPart.URL, type_name="user")],
+        app_id="app-a",
+    )
+    assert cache.lookup(_req("http://shop/api/Users/2"), "app-b") is None
+
+    exported = cache.dump("app-a")
+    other = EnrichmentCache(path=None)
+    assert other.merge(exported, "app-b") == 1
+    assert other.lookup(_req("http://shop/api/Users/2"), "app-b")[0].id == "2"
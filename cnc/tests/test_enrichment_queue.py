@@ -0,0 +1,38 @@
+import asyncio
+
+from httplib import HTTPMessage, HTTPRequest, HTTPRequestData
+from cnc.schemas.http import EnrichAuthNZMessage
+from cnc.services.enrichment_queue import EnrichmentQueue, LatencyStats
+
+
+def _msg(url: str, username: str = "alice", role: str = "user") -> EnrichAuthNZMessage:
+    request = HTTPRequest(data=HTTPRequestData(method="GET", url=url, headers={}, post_data=None))
+    return EnrichAuthNZMessage(http_msg=HTTPMessage(request=request, response=None), username=username, role=role)
+
+
+def test_novel_templates_and_principals_jump_the_queue():
+    async def main():
+        queue = EnrichmentQueue()
+        queue.put_nowait(_msg("http://shop/api/Users/1"))
+        queue.put_nowait(_msg("http://shop/api/Users/2"))           # repeat template
+        queue.put_nowait(_msg("http://shop/api/Users/3", "bob"))    # new user
+        queue.put_nowait(_msg("http://shop/api/Products/1"))        # new template
+        return [(m.http_msg.request.url, m.username) for m in [await queue.get() for _ in range(4)]]
+
+    order = asyncio.run(main())
+    assert order == [
+        ("http://shop/api/Users/1", "alice"),
+        ("http://shop/api/Users/3", "bob"),
+        ("http://shop/api/Products/1", "alice"),
+        ("http://shop/api/Users/2", "alice"),
+    ]
+
+
+def test_latency_stats():
+    stats = LatencyStats()
+    for ms in range(1, 101):
+        stats.add(ms / 1000)
+    assert stats.count == 100
+    assert abs(stats.avg - 0.0505) < 1e-9
+    assert stats.p95 == 0.096
+    assert stats.max == 0.1
@@ -0,0 +1,40 @@
+from uuid import uuid4
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from common.frontier import FrontierSet
+from routers.application import make_application_router
+
+
+def _client():
+    app = FastAPI()
+    app.include_router(make_application_router(frontiers=FrontierSet()))
+    return TestClient(app)
+
+
+def test_reset_starts_a_new_exploration_run():
+    client, app_id = _client(), uuid4()
+    base = f"/application/{app_id}/frontier"
+
+    def claim(agent):
+        return client.post(f"{base}/claim", json={"agent_id": agent}).json()
+
+    client.post(f"{base}/pages", json={"agent_id": "a", "urls": ["http://app/"]})
+    assert claim("a")["url"] == "http://app/"
+    client.post(f"{base}/complete", json={"agent_id": "a", "url": "http://app/"})
+    # a second run without a reset would find the start page explored already
+    assert client.post(f"{base}/pages", json={"agent_id": "a", "urls": ["http://app/"]}).json() == {"added": 0}
+
+    assert client.post(f"{base}/reset").json() == {"ok": True}
+    assert client.get(f"{base}/stats").json()["agents"] == 0
+    assert client.post(f"{base}/pages", json={"agent_id": "b", "urls": ["http://app/"]}).json() == {"added": 1}
+    assert claim("b") == {"url": "http://app/", "exhausted": False}
+
+
+def test_reset_only_touches_one_application():
+    client, app_a, app_b = _client(), uuid4(), uuid4()
+    client.post(f"/application/{app_b}/frontier/pages", json={"agent_id": "a", "urls": ["http://b/"]})
+
+    client.post(f"/application/{app_a}/frontier/reset")
+    assert client.get(f"/application/{app_b}/frontier/stats").json()["queued"] == 1
@@ -0,0 +1,60 @@
+from cnc.workers.attackers.authnz.intruder import HTTPRequestData, RequestPart, RequestTemplate, ResourceLocator
+from cnc.workers.attackers.authnz.mutation import JsonBodySlot, ReplaceSlot, UrlSlot, compile_slot
+
+
+def _template(url, post_data=None, headers=None, *locators):
+    data = HTTPRequestData(method="POST", url=url, headers=headers or {}, post_data=post_data)
+    return RequestTemplate(data, list(locators))
+
+
+def test_url_path_and_query_slots_fill_the_located_position():
+    t = _template(
+        "http://shop/api/12/orders/12?basket=12&x=1",
+        None,
+        None,
+        ResourceLocator(id="12", request_part=RequestPart.URL, type_name="order"),
+    )
+    # the first exact segment match, not a substring of the host or query
+    assert t.mutate_for_resource(target="99", type_name="order").url == "http://shop/api/99/orders/12?basket=12&x=1"
+
+    q = _template(
+        "http://shop/api/basket?owner=7&id=item-7",
+        None,
+        None,
+        ResourceLocator(id="7", request_part=RequestPart.URL, type_name="item"),
+    )
+    assert q.mutate_for_resource(target="8", type_name="item").url == "http://shop/api/basket?owner=8&id=item-7"
+
+
+def test_json_body_slot_targets_the_right_field_and_keeps_types():
+    # "price" contains a 5 too; a textual replace would hit it first
+    t = _template(
+        "http://shop/api/basket",
+        {"price": "15", "product": {"id": 5}},
+        None,
+        ResourceLocator(id="5", request_part=RequestPart.BODY, type_name="product"),
+    )
+    assert isinstance(compile_slot(t.data, t.resource_locators[0]), JsonBodySlot)
+    mutated = t.mutate_for_resource(target="42", type_name="product")
+    assert mutated.post_data == {"price": "15", "product": {"id": 42}}
+    # the template itself is untouched
+    assert t.data.post_data == {"price": "15", "product": {"id": 5}}
+
+
+def test_header_slot_and_replace_fallback():
+    t = _template(
+        "http://shop/api/me",
+        None,
+        {"X-Tenant": "tenant-3"},
+        ResourceLocator(id="3", request_part=RequestPart.HEADERS, type_name="tenant"),
+    )
+    assert t.mutate_for_resource(target="4", type_name="tenant").headers == {"X-Tenant": "tenant-4"}
+
+    missing = ResourceLocator(id="nope", request_part=RequestPart.URL, type_name="x")
+    data = HTTPRequestData(method="GET", url="http://shop/a", headers={})
+    assert isinstance(compile_slot(data, missing), ReplaceSlot)
+    assert isinstance(
+        compile_slot(HTTPRequestData(method="GET", url="http://shop/a/1", headers={}),
+                     ResourceLocator(id="1", request_part=RequestPart.URL, type_name="a")),
+        UrlSlot,
+    )
@@ -0,0 +1,68 @@
+import json
+from unittest.mock import Mock
+
+import httpx
+
+from cnc.workers.attackers.authnz.intruder import (
+    AuthSession,
+    AuthzTester,
+    HTTPClient,
+    HTTPRequestData,
+    RequestPart,
+    ResourceLocator,
+)
+from cnc.workers.attackers.authnz.oracle import ResponseOracle, fingerprint
+
+
+def _json_fp(obj, status=200):
+    return fingerprint(status, json.dumps(obj).encode(), "application/json")
+
+
+OWNER_BODY = {"id": 1, "email": "alice@shop.test", "orders": [{"id": 7, "total": 12.5}]}
+
+
+def test_similar_json_response_is_a_success():
+    oracle = ResponseOracle()
+    other = {"id": 2, "email": "bob@shop.test", "orders": [{"id": 9, "total": 3.0}]}
+    result = oracle.judge(_json_fp(OWNER_BODY), _json_fp(other))
+    assert result.success and result.confidence >= 0.8
+
+
+def test_denials_and_error_bodies_are_failures():
+    oracle = ResponseOracle()
+    baseline = _json_fp(OWNER_BODY)
+    assert not oracle.judge(baseline, _json_fp({"message": "forbidden"}, status=403)).success
+    assert not oracle.judge(baseline, _json_fp({"error": "not yours"})).success
+    login = fingerprint(200, b"<html><form>Please sign in to continue</form></html>", "text/html")
+    assert not oracle.judge(baseline, login).success
+
+
+def test_missing_baseline_is_inconclusive():
+    result = ResponseOracle().judge(None, _json_fp(OWNER_BODY))
+    assert not result.success and result.confidence == 0.0
+
+
+def test_executor_replays_owner_baseline_and_judges():
+    bodies = {
+        "alice": json.dumps(OWNER_BODY).encode(),
+        "bob": json.dumps({**OWNER_BODY, "id": 2}).encode(),
+    }
+    client = Mock(spec=HTTPClient)
+
+    def send(request, *, auth_session=None):
+        return httpx.Response(200, content=bodies[auth_session.headers["X-User"]], headers={"content-type": "application/json"})
+
+    client.send.side_effect = send
+    tester = AuthzTester(http_client=client)
+    for user in ("alice", "bob"):
+        session = AuthSession(headers={"X-User": user})
+        tester.ingest(
+            username=user,
+            role="user",
+            request=HTTPRequestData(method="GET", url=f"http://shop/api/{user}/profile", headers={}),
+            resource_locators=[ResourceLocator(id=user, type_name="profile", request_part=RequestPart.URL)],
+            session=session,
+        )
+
+    judged = [f for f in tester.findings if f.result is not None]
+    assert judged and all(f.result.success for f in judged)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+
+from cnc.services.ratelimit import HostScheduler, HostLimits, host_key, parse_retry_after
+
+
+def _limits(**overrides) -> HostLimits:
+    base = dict(rate=1000.0, burst=1000.0, concurrency=4.0, decrease_cooldown=0.0)
+    base.update(overrides)
+    return HostLimits(**base)
+
+
+def test_host_key_ignores_path_and_case():
+    assert host_key("https://Example.com:8443/api/Users/1") == "example.com:8443"
+    assert host_key("http://example.com/a") == host_key("http://EXAMPLE.com/b")
+
+
+def test_parse_retry_after_seconds_and_garbage():
+    assert parse_retry_after("7") == 7.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+
+
+def test_throttle_halves_window_and_rate():
+    scheduler = HostScheduler(_limits())
+    with scheduler.slot("http://target/a") as slot:
+        slot.record(429, {})
+
+    stats = scheduler.stats()["target"]
+    assert stats.concurrency_limit == 2
+    assert stats.rate == pytest.approx(500.0)
+    assert stats.throttled == 1
+
+
+def test_healthy_responses_grow_window():
+    scheduler = HostScheduler(_limits())
+    for _ in range(20):
+        with scheduler.slot("http://target/a") as slot:
+            slot.record(200, {})
+
+    assert scheduler.stats()["target"].concurrency_limit > 4
+
+
+def test_retry_after_blocks_host():
+    scheduler = HostScheduler(_limits())
+    with scheduler.slot("http://target/a") as slot:
+        slot.record(503, {"retry-after": "1"})
+
+    assert scheduler._try_acquire("target") > 0.5
+    assert scheduler._try_acquire("other") == 0.0
+
+
+def test_exception_inside_slot_counts_as_error():
+    scheduler = HostScheduler(_limits())
+    with pytest.raises(RuntimeError):
+        with scheduler.slot("http://target/a"):
+            raise RuntimeError("boom")
+
+    stats = scheduler.stats()["target"]
+    assert stats.errors == 1
+    assert stats.in_flight == 0
+
+
+def test_async_slots_respect_concurrency_cap():
+    scheduler = HostScheduler(_limits(concurrency=2.0, max_concurrency=2.0))
+    peak = 0
+
+    async def hit():
+        nonlocal peak
+        async with scheduler.aslot("http://target/a") as slot:
+            peak = max(peak, scheduler.stats()["target"].in_flight)
+            await asyncio.sleep(0.01)
+            slot.record(200, {})
+
+    async def main():
+        await asyncio.gather(*(hit() for _ in range(10)))
+
+    asyncio.run(main())
+    stats = scheduler.stats()["target"]
+    assert peak <= 2
+    assert stats.sent == 10
+    assert stats.rps > 0
+
+
+def test_token_bucket_limits_rate():
+    scheduler = HostScheduler(_limits(rate=50.0, burst=1.0, max_rate=50.0))
+    start = time.monotonic()
+    for _ in range(6):
+        with scheduler.slot("http://target/a"):
+            pass
+    # 1 token of burst then 5 more at 50/s
+    assert time.monotonic() - start >= 0.08
+
+
+def test_blocking_slot_refuses_to_run_on_the_event_loop():
+    scheduler = HostScheduler(_limits())
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            with scheduler.slot("http://target/a"):
+                pass
+        async with scheduler.aslot("http://target/a") as slot:
+            slot.record(200)
+
+    asyncio.run(main())
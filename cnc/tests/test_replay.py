@@ -0,0 +1,103 @@
+import argparse
+import asyncio
+import time
+from unittest.mock import Mock
+
+import httpx
+
+import pytest
+
+from httplib import HTTPMessage, HTTPRequest, HTTPRequestData
+from cnc.replay import OfflineEnricher, _aiter, build_matrix, parse_burp_spec, replay
+from cnc.services.attack import AttackResult
+from cnc.services.enrichment_cache import EnrichmentCache
+from cnc.workers.attackers.authnz.intruder import AsyncHTTPClient
+from cnc.workers.attackers.authnz.models import HorizontalUserAuthz, PlannedTest
+
+
+class RecordingClient(Mock):
+    def __init__(self):
+        super().__init__(spec=AsyncHTTPClient)
+        self.sent = []
+
+    async def send(self, request, *, auth_session=None):
+        self.sent.append(request.url)
+
+    async def shutdown(self):
+        pass
+
+
+def _msg(url):
+    return HTTPMessage(request=HTTPRequest(data=HTTPRequestData(method="GET", url=url, headers={})), response=None)
+
+
+def test_parse_burp_spec():
+    assert parse_burp_spec("alice:admin=exports/alice.xml") == ("alice", "admin", "exports/alice.xml")
+    assert parse_burp_spec("bob=bob.xml") == ("bob", "", "bob.xml")
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_burp_spec("alice.xml")
+
+
+def test_build_matrix_groups_outcomes():
+    def attack(user, rid, success):
+        a = HorizontalUserAuthz(attack_info=PlannedTest(user=user, resource_id=rid, action="GET /orders/{id}", type_name="order" if rid else None))
+        if success is not None:
+            a.result = AttackResult(success=success, result="200", description="", confidence=0.9)
+        return a
+
+    report = build_matrix([attack("bob:user", "1", True), attack("alice:user", "2", False), attack("carol:user", None, None)])
+    assert report["summary"] == {"cells": 3, "users": 3, "actions": 1, "vulnerable": 1, "denied": 1, "unknown": 1}
+    assert [c["user"] for c in report["cells"]] == ["alice:user", "bob:user", "carol:user"]
+    assert report["cells"][1]["resource"] == "order:1"
+    assert report["cells"][2]["resource"] == "-"
+
+
+def test_build_matrix_lists_untested_cells_of_the_grid():
+    a = HorizontalUserAuthz(attack_info=PlannedTest(user="bob:user", resource_id="1", action="GET /orders/{id}", type_name="order"))
+    a.result = AttackResult(success=False, result="403", description="", confidence=0.9)
+
+    report = build_matrix(
+        [a],
+        users=["alice:user", "bob:user"],
+        coverage={"GET /orders/{id}": ["order:1", "order:2"], "GET /profile": ["-"]},
+    )
+    assert report["summary"] == {"cells": 6, "users": 2, "actions": 2, "denied": 1, "untested": 5}
+    untested = {(c["user"], c["action"], c["resource"]) for c in report["cells"] if c["outcome"] == "untested"}
+    assert ("bob:user", "GET /orders/{id}", "order:1") not in untested
+    assert ("alice:user", "GET /profile", "-") in untested
+
+
+def test_replay_runs_cross_user_attacks_from_heuristic_locators():
+    client = RecordingClient()
+    captured = [
+        ("alice", "user", _msg("http://shop/api/orders/1001")),
+        ("bob", "user", _msg("http://shop/api/orders/2002")),
+    ]
+    enricher = OfflineEnricher(EnrichmentCache(path=None))
+    report = asyncio.run(replay(_aiter(captured), enricher, concurrency=4, http_client=client))
+
+    assert enricher.sources["heuristic"] == 2
+    assert "http://shop/api/orders/1001" in client.sent or "http://shop/api/orders/2002" in client.sent
+    attacked = [c for c in report["cells"] if c["outcome"] != "untested"]
+    assert len(attacked) == len(client.sent)
+    assert report["summary"]["users"] == 2
+    # alice and bob x both orders: whatever was not attacked is still listed
+    grid = {(c["user"], c["resource"]) for c in report["cells"]}
+    assert {(u, f"order:{rid}") for u in ("alice:user", "bob:user") for rid in ("1001", "2002")} <= grid
+
+
+def test_replay_does_not_wait_for_fresh_sessions():
+    class ExpiredClient(RecordingClient):
+        async def send(self, request, *, auth_session=None):
+            self.sent.append(request.url)
+            return httpx.Response(401, request=httpx.Request(request.method, request.url))
+
+    client = ExpiredClient()
+    captured = [
+        ("alice", "user", _msg("http://shop/api/orders/1001")),
+        ("bob", "user", _msg("http://shop/api/orders/2002")),
+    ]
+    start = time.monotonic()
+    asyncio.run(replay(_aiter(captured), OfflineEnricher(EnrichmentCache(path=None)), http_client=client))
+    assert client.sent
+    assert time.monotonic() - start < 5
@@ -0,0 +1,84 @@
+from unittest.mock import Mock
+
+import httpx
+
+from httplib import HTTPRequestData
+from cnc.services.route_inference import RouteInferer
+from cnc.workers.attackers.authnz.intruder import AuthSession, AuthzTester, HTTPClient, RequestPart, ResourceLocator
+
+
+def _req(url, method="GET"):
+    return HTTPRequestData(method=method, url=url, headers={})
+
+
+def test_id_segments_and_query_values_share_a_route():
+    routes = RouteInferer()
+    a = routes.route(_req("http://shop/api/Baskets/1?page=2"))
+    b = routes.route(_req("http://shop/api/Baskets/2?page=3"))
+    assert a == b == "GET http://shop/api/Baskets/{id}?page"
+    assert routes.route(_req("http://shop/api/Baskets/1", "PUT")) == "PUT http://shop/api/Baskets/{id}"
+
+
+def test_high_variance_literals_collapse_but_static_siblings_stay():
+    routes = RouteInferer(threshold=5)
+    for name in ["alice", "bob", "carol", "dave", "erin", "frank"]:
+        routes.route(_req(f"http://shop/profile/{name}/orders"))
+    assert routes.collapses == 1
+    assert routes.route(_req("http://shop/profile/mallory/orders")) == "GET http://shop/profile/{id}/orders"
+    assert routes.route(_req("http://shop/profile/alice/orders")) == "GET http://shop/profile/{id}/orders"
+
+    # a handful of distinct API resources is not variance
+    for res in ["Users", "Products", "Feedbacks"]:
+        assert routes.route(_req(f"http://shop/api/{res}")) == f"GET http://shop/api/{res}"
+
+
+def test_route_state_round_trips():
+    routes = RouteInferer(threshold=2)
+    for name in ["a-x", "b-x", "c-x"]:
+        routes.route(_req(f"http://shop/files/{name}"))
+    restored = RouteInferer(threshold=2)
+    restored.load_state(routes.to_state())
+    assert restored.route(_req("http://shop/files/z-x")) == "GET http://shop/files/{id}"
+
+
+def test_planner_fan_out_follows_routes_not_urls():
+    tester = AuthzTester(http_client=Mock(spec=HTTPClient))
+    for user in ("alice", "bob"):
+        for i in range(20):
+            rid = f"{user}-{chr(97 + i)}"
+            tester.ingest(
+                username=user,
+                role="customer",
+                request=_req(f"http://shop/api/Baskets/{rid}"),
+                resource_locators=[ResourceLocator(id=rid, type_name="basket", request_part=RequestPart.URL)],
+                session=AuthSession(headers={}),
+            )
+    assert list(tester._templates.actions()) == ["GET http://shop/api/Baskets/{id}"]
+    assert len(tester.findings) <= 4
+
+
+def test_second_user_on_a_route_is_swapped_not_self_replayed():
+    sent = []
+
+    def send(req, auth_session=None):
+        sent.append((auth_session.headers["who"], req.url))
+        return httpx.Response(403 if auth_session.headers["who"] == "alice" else 200, json={"id": 1})
+
+    client = Mock(spec=HTTPClient)
+    client.send.side_effect = send
+    tester = AuthzTester(http_client=client)
+    for user, rid in (("alice", "1"), ("bob", "2")):
+        tester.ingest(
+            username=user,
+            role="customer",
+            request=_req(f"http://shop/api/Baskets/{rid}"),
+            resource_locators=[ResourceLocator(id=rid, type_name="basket", request_part=RequestPart.URL)],
+            session=AuthSession(headers={"who": user}),
+        )
+
+    attacks = [f for f in tester.findings if f.attack_info.user == "alice:customer"]
+    # bob's request as alice, and alice's own request for bob's basket
+    assert {f.attack_info.template_user for f in attacks} == {"bob:customer", "alice:customer"}
+    assert {tester._executor._prepare(f)[0].url for f in attacks} == {"http://shop/api/Baskets/2"}
+    assert ("alice", "http://shop/api/Baskets/2") in sent
+    assert not any(f.result and f.result.success for f in tester.findings)
@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import json
+import time
+
+import httpx
+
+from httplib import AuthSession, HTTPRequestData
+from cnc.workers.attackers.authnz.sessions import SessionManager, UserSession, jwt_expiry, looks_expired
+
+
+def _jwt(exp: float) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"eyJhbGciOiJIUzI1NiJ9.{payload}.sig"
+
+
+def _resp(status: int, url: str = "http://shop/api/me", **kwargs) -> httpx.Response:
+    return httpx.Response(status, request=httpx.Request("GET", url), **kwargs)
+
+
+def test_cookie_jar_tracks_set_cookie_per_user():
+    alice = UserSession(AuthSession(headers={"Cookie": "sid=a1; lang=en", "Accept": "application/json"}))
+    bob = UserSession(AuthSession(headers={"Cookie": "sid=b1"}))
+    alice.observe(_resp(200, headers={"set-cookie": "sid=a2; Path=/"}))
+
+    assert alice.request_headers("http://shop/api/x")["Cookie"] == "sid=a2; lang=en"
+    assert alice.request_headers("http://shop/api/x")["Accept"] == "application/json"
+    assert bob.request_headers("http://shop/api/x")["Cookie"] == "sid=b1"
+
+
+def test_expiry_detection():
+    assert jwt_expiry(_jwt(1234)) == 1234
+    assert jwt_expiry("opaque-token") is None
+    assert looks_expired(_resp(401))
+    assert not looks_expired(_resp(403))
+    sess = UserSession(AuthSession(headers={"Authorization": f"Bearer {_jwt(time.time() + 5)}"}))
+    assert sess.expires_soon()
+
+
+def test_concurrent_rejections_share_one_renewal():
+    calls = []
+
+    async def refresher(user):
+        calls.append(user)
+        await asyncio.sleep(0.01)
+        return AuthSession(headers={"Authorization": "Bearer fresh"})
+
+    async def probe(request, sess):
+        return _resp(401)
+
+    async def main():
+        manager = SessionManager(refresher=refresher)
+        manager.update("alice:user", AuthSession(headers={"Authorization": "Bearer stale"}))
+        manager.set_probe("alice:user", HTTPRequestData(method="GET", url="http://shop/api/me", headers={}))
+        generation = manager.get("alice:user").generation
+        return await asyncio.gather(*(manager.handle_rejection("alice:user", generation, probe) for _ in range(10)))
+
+    renewed = asyncio.run(main())
+    assert calls == ["alice:user"]
+    assert all(s is not None and s.headers["Authorization"] == "Bearer fresh" for s in renewed)
+
+
+def test_probe_success_means_real_denial():
+    async def refresher(user):
+        raise AssertionError("a valid session must not be renewed")
+
+    probes = []
+
+    async def probe(request, sess):
+        probes.append(request.url)
+        return _resp(200)
+
+    async def main():
+        manager = SessionManager(refresher=refresher)
+        manager.update("bob:user", AuthSession(headers={"Authorization": "Bearer ok"}))
+        manager.set_probe("bob:user", HTTPRequestData(method="GET", url="http://shop/api/me", headers={}))
+        generation = manager.get("bob:user").generation
+        return await asyncio.gather(*(manager.handle_rejection("bob:user", generation, probe) for _ in range(5)))
+
+    assert asyncio.run(main()) == [None] * 5
+    assert probes == ["http://shop/api/me"]
+
+
+def test_expired_user_waits_for_fresh_traffic():
+    async def main():
+        manager = SessionManager(wait_timeout=1)
+        manager.update("carol:user", AuthSession(headers={"Authorization": "Bearer old"}))
+        generation = manager.get("carol:user").generation
+        waiter = asyncio.create_task(manager.handle_rejection("carol:user", generation, None))
+        await asyncio.sleep(0.01)
+        manager.update("carol:user", AuthSession(headers={"Authorization": "Bearer new"}))
+        return await waiter
+
+    assert asyncio.run(main()).headers["Authorization"] == "Bearer new"
+
+
+def test_only_new_credentials_replace_a_session():
+    manager = SessionManager()
+    assert manager.update("alice:user", AuthSession(headers={"Authorization": "Bearer a", "Referer": "http://shop/"}))
+    sess = manager.get("alice:user")
+    sess.observe(_resp(200, headers={"set-cookie": "sid=a2; Path=/"}))
+
+    # same credentials, another page: the session and its refreshed cookies stay
+    assert not manager.update(
+        "alice:user",
+        AuthSession(headers={"Authorization": "Bearer a", "Referer": "http://shop/cart", "Content-Length": "12"}),
+    )
+    assert sess.generation == 1
+    assert sess.request_headers("http://shop/api/x")["Cookie"] == "sid=a2"
+
+    assert manager.update("alice:user", AuthSession(headers={"Authorization": "Bearer b"}))
+    assert sess.generation == 2
+    assert manager.update("alice:user", AuthSession(headers={"Authorization": "Bearer b", "Cookie": "sid=a3"}))
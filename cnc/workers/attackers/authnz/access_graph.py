@@ -0,0 +1,202 @@
+"""
+Compact storage for the AuthZ access graph.
+
+Users, resource types, resource ids and roles are interned to dense
+integers once. Per-user resources are sorted `array("I")` of id numbers,
+the roles that touched a resource are a bitset keyed by one packed int,
+so a graph of millions of accesses holds each string once instead of in
+every set and tuple it appears in.
+"""
+import logging
+from array import array
+from bisect import bisect_left
+from collections.abc import Set as AbstractSet
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# resource keys pack (type, id) as type << ID_BITS | id
+ID_BITS = 32
+
+
+class Interner:
+    """Bidirectional str <-> dense int mapping; numbers are never reused."""
+
+    __slots__ = ("_index", "_values")
+
+    def __init__(self) -> None:
+        self._index: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def intern(self, value: str) -> int:
+        idx = self._index.get(value)
+        if idx is None:
+            idx = self._index[value] = len(self._values)
+            self._values.append(value)
+        return idx
+
+    def get(self, value: str) -> Optional[int]:
+        return self._index.get(value)
+
+    def value(self, idx: int) -> str:
+        return self._values[idx]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class IdsView(AbstractSet):
+    """Read-only set of resource id strings backed by an array of interned ids."""
+
+    __slots__ = ("_ids", "_interner", "_contains")
+
+    def __init__(self, ids: array, interner: Interner, contains: Any) -> None:
+        self._ids = ids
+        self._interner = interner
+        self._contains = contains
+
+    def __iter__(self) -> Iterator[str]:
+        value = self._interner.value
+        return (value(i) for i in self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, resource_id: object) -> bool:
+        idx = self._interner.get(resource_id) if isinstance(resource_id, str) else None
+        return idx is not None and self._contains(idx)
+
+
+_EMPTY_IDS = IdsView(array("I"), Interner(), lambda idx: False)
+
+
+class AccessGraph:
+    """
+    user  →  { resource_type → {resource_id, …} }
+    PLUS: (resource_type, resource_id) → set(role)
+    PLUS: resource_type → {resource_id, …} across all users
+    """
+
+    def __init__(self) -> None:
+        self.users = Interner()
+        self.types = Interner()
+        self.ids = Interner()
+        self.roles = Interner()
+        # user -> type -> sorted ids
+        self._graph: Dict[int, Dict[int, array]] = {}
+        # type << ID_BITS | id -> role bitset
+        self._resource_roles: Dict[int, int] = {}
+        # type -> ids in first-seen order
+        self._by_type: Dict[int, array] = {}
+        self._role_sets: Dict[int, frozenset] = {}
+
+    def _roles_of_bits(self, bits: int) -> frozenset:
+        roles = self._role_sets.get(bits)
+        if roles is None:
+            roles = self._role_sets[bits] = frozenset(
+                self.roles.value(i) for i in range(bits.bit_length()) if bits >> i & 1
+            )
+        return roles
+
+    # ── public API ────────────────────────────────────────────────────────
+    def record(
+        self, *, user: str, role: str, type_name: str, resource_id: str
+    ) -> bool:
+        """Record one access; False if the graph already had it."""
+        t = self.types.intern(type_name)
+        rid = self.ids.intern(resource_id)
+        bit = 1 << self.roles.intern(role)
+        types = self._graph.setdefault(self.users.intern(user), {})
+        ids = types.get(t)
+        if ids is None:
+            ids = types[t] = array("I")
+        key = t << ID_BITS | rid
+        roles = self._resource_roles.get(key)
+        pos = bisect_left(ids, rid)
+        has_id = pos < len(ids) and ids[pos] == rid
+        if has_id and roles is not None and roles & bit:
+            return False
+        if not has_id:
+            ids.insert(pos, rid)
+        if roles is None:
+            self._by_type.setdefault(t, array("I")).append(rid)
+            roles = 0
+        self._resource_roles[key] = roles | bit
+        log.debug(
+            "Record access: user=%s role=%s type=%s id=%s",
+            user,
+            role,
+            type_name,
+            resource_id,
+        )
+        return True
+
+    def has_user(self, user: str) -> bool:
+        idx = self.users.get(user)
+        return idx is not None and idx in self._graph
+
+    def other_users(self, user: str) -> Iterable[str]:
+        value = self.users.value
+        return (u for u in map(value, self._graph) if u != user)
+
+    def resources_of_type(self, type_name: str) -> AbstractSet:
+        """Every known id of `type_name` (read-only view)."""
+        t = self.types.get(type_name)
+        ids = self._by_type.get(t) if t is not None else None
+        if ids is None:
+            return _EMPTY_IDS
+        return IdsView(ids, self.ids, lambda rid: (t << ID_BITS | rid) in self._resource_roles)
+
+    def roles_of_resource(self, *, type_name: str, resource_id: str) -> frozenset:
+        """Return every role that has touched (type,id) so far."""
+        t, rid = self.types.get(type_name), self.ids.get(resource_id)
+        if t is None or rid is None:
+            return frozenset()
+        return self._roles_of_bits(self._resource_roles.get(t << ID_BITS | rid, 0))
+
+    def resource_roles(self, type_name: str) -> Iterator[Tuple[str, frozenset]]:
+        """(resource_id, roles) for every id of `type_name`, without per-id lookups by string."""
+        t = self.types.get(type_name)
+        if t is None or t not in self._by_type:
+            return
+        value, bits_of, base = self.ids.value, self._resource_roles, t << ID_BITS
+        # snapshot the length: planner streams resume after later records
+        ids = self._by_type[t]
+        for i in range(len(ids)):
+            rid = ids[i]
+            yield value(rid), self._roles_of_bits(bits_of[base | rid])
+
+    # ── snapshots ─────────────────────────────────────────────────────────
+    def to_state(self) -> Dict[str, Any]:
+        # ids grouped by (type, role set): few distinct role sets keep this compact
+        grouped: Dict[Tuple[int, int], List[str]] = {}
+        value = self.ids.value
+        for key, bits in self._resource_roles.items():
+            grouped.setdefault((key >> ID_BITS, bits), []).append(value(key & (1 << ID_BITS) - 1))
+        return {
+            "graph": {
+                self.users.value(u): {self.types.value(t): [value(i) for i in ids] for t, ids in types.items()}
+                for u, types in self._graph.items()
+            },
+            "roles": [
+                [self.types.value(t), sorted(self._roles_of_bits(bits)), ids]
+                for (t, bits), ids in grouped.items()
+            ],
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Bulk-load a to_state() dump into an empty graph."""
+        intern_id = self.ids.intern
+        for u, types in state["graph"].items():
+            self._graph[self.users.intern(u)] = {
+                self.types.intern(t): array("I", sorted(map(intern_id, ids))) for t, ids in types.items()
+            }
+        for type_name, roles, ids in state["roles"]:
+            t = self.types.intern(type_name)
+            bits = 0
+            for role in roles:
+                bits |= 1 << self.roles.intern(role)
+            rids = array("I", map(intern_id, ids))
+            base = t << ID_BITS
+            self._resource_roles.update((base | rid, bits) for rid in rids)
+            self._by_type.setdefault(t, array("I")).extend(rids)
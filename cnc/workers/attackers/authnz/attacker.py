@@ -6,9 +6,11 @@ from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, Optional, Set, List, Tuple, Type, Iterable, Protocol, Sequence, Union
 from uuid import UUID
+import asyncio
 import httpx
 import json
 import logging
+import os
 import xml.etree.ElementTree as ET
 
 from cnc.services.attack import (
@@ -16,12 +18,19 @@ from cnc.services.attack import (
     ApplicationFindingsStore
 )
 from cnc.services.queue import BroadcastChannel
-from httplib import HTTPRequest, HTTPRequestData, AuthSession, ResourceLocator
+from cnc.services.ratelimit import HostScheduler
+from cnc.services.route_inference import RouteInferer
+from httplib import HTTPRequest, HTTPRequestData, HTTPResponse, AuthSession, ResourceLocator
 from playwright.sync_api import Request
 from cnc.schemas.http import EnrichedRequest
 from src.llm import RequestResources, Resource, ResourceType, RequestPart
 
-from .intruder import AuthzTester, HTTPClient
+from .intruder import AuthzTester, AsyncHTTPClient
+from .scheduler import AUTHZ_REQUEST_BUDGET
+from .snapshot import AUTHZ_SNAPSHOT_DIR, SnapshotStore, Snapshotter
+
+ATTACK_CONCURRENCY = int(os.environ.get("ATTACK_CONCURRENCY", "32"))
+ATTACK_HTTP2 = os.environ.get("ATTACK_HTTP2", "0").lower() in ("1", "true", "yes")
 
 class AuthzAttacker(BaseAttackWorker):
     """
@@ -36,7 +45,13 @@ class AuthzAttacker(BaseAttackWorker):
     def __init__(self, 
                  inbound: BroadcastChannel[EnrichedRequest],
                  db_session: Optional[AsyncSession] = None,
-                 app_id: Optional[UUID] = None):
+                 app_id: Optional[UUID] = None,
+                 scheduler: Optional[HostScheduler] = None,
+                 concurrency: int = ATTACK_CONCURRENCY,
+                 http2: bool = ATTACK_HTTP2,
+                 snapshot_dir: Optional[str] = AUTHZ_SNAPSHOT_DIR,
+                 routes: Optional[RouteInferer] = None,
+                 budget: int = AUTHZ_REQUEST_BUDGET):
         super().__init__(db_session)
         # Subscribe to inbound channel
         self._sub_q = inbound.subscribe()
@@ -53,14 +68,62 @@ class AuthzAttacker(BaseAttackWorker):
         # if app_id:
         #     findings_store = ApplicationFindingsStore(app_id)
         
-        # Initialize AuthzTester with findings store
-        self._authz_tester = AuthzTester(
-            http_client=HTTPClient(timeout=5),
-            findings_log=findings_store
+        # Attacks run as background tasks on a pooled async client, so
+        # ingest() returns as soon as they are planned
+        self._client = AsyncHTTPClient(
+            timeout=5,
+            scheduler=scheduler,
+            max_connections=concurrency,
+            max_keepalive_connections=concurrency,
+            http2=http2,
+        )
+        self._findings_store = findings_store
+        self._concurrency = concurrency
+        self._routes = routes
+        self._budget = budget
+        self._snapshot_dir = snapshot_dir
+
+        # One AuthzTester per application, so access graphs, budgets and
+        # snapshots of different applications never mix. Messages without an
+        # app_id belong to this worker's own application.
+        self._app_id = str(app_id) if app_id else None
+        self._testers: Dict[Optional[str], AuthzTester] = {}
+        # Planner coverage, access graph and sessions survive restarts
+        self._snapshotters: Dict[Optional[str], Snapshotter] = {}
+        self._snapshot_tasks: List[asyncio.Task] = []
+        self._authz_tester = self._new_tester(self._app_id)
+
+    def _new_tester(self, app_id: Optional[str]) -> AuthzTester:
+        tester = self._testers[app_id] = AuthzTester(
+            http_client=self._client,
+            findings_log=self._findings_store,
+            concurrency=self._concurrency,
+            routes=self._routes,
+            budget=self._budget,
         )
+        if self._snapshot_dir:
+            store = SnapshotStore(os.path.join(self._snapshot_dir, app_id or "default"))
+            self._snapshotters[app_id] = Snapshotter(tester, store)
+        return tester
+
+    async def _start_snapshots(self, app_id: Optional[str]) -> None:
+        snapshotter = self._snapshotters.get(app_id)
+        if snapshotter:
+            await snapshotter.restore()
+            self._snapshot_tasks.append(asyncio.create_task(snapshotter.run()))
+
+    async def _tester(self, app_id: Optional[str]) -> AuthzTester:
+        """The application's tester, restored from its snapshot on first use."""
+        app_id = app_id or self._app_id
+        tester = self._testers.get(app_id)
+        if tester is None:
+            tester = self._new_tester(app_id)
+            await self._start_snapshots(app_id)
+        return tester
   
     async def run(self):
         """Process incoming enriched requests for authz vulnerabilities"""
+        await self._start_snapshots(self._app_id)
         while True:
             enr: EnrichedRequest = await self._sub_q.get()
             await self.ingest(**self._explode(enr))
@@ -73,7 +136,9 @@ class AuthzAttacker(BaseAttackWorker):
             "role": enriched.role,
             # Session would be fetched separately if needed
             "resource_locators": enriched.resource_locators,
-            "session": enriched.session
+            "session": enriched.session,
+            "response": enriched.response,
+            "app_id": str(enriched.app_id) if enriched.app_id else None,
         }
 
     # TODO: tmrw -> should work..
@@ -84,13 +149,28 @@ class AuthzAttacker(BaseAttackWorker):
         role: str,
         request: HTTPRequestData,
         resource_locators: Sequence[ResourceLocator],
-        session: Optional[AuthSession] = None
+        session: Optional[AuthSession] = None,
+        response: Optional[HTTPResponse] = None,
+        app_id: Optional[str] = None
     ) -> None:
         """Process a single request for authorization vulnerabilities"""        
-        self._authz_tester.ingest(
+        tester = await self._tester(app_id)
+        tester.ingest(
             username=username,
             role=role,
             request=request,
             resource_locators=resource_locators,
-            session=session
-        )
\ No newline at end of file
+            session=session,
+            response=response,
+            app_id=app_id
+        )
+
+    async def shutdown(self) -> None:
+        """Wait for in-flight attacks, release the connection pool and write final snapshots."""
+        for task in self._snapshot_tasks:
+            task.cancel()
+        # the testers share one client, closing it again is a no-op
+        for tester in self._testers.values():
+            await tester.aclose()
+        for snapshotter in self._snapshotters.values():
+            snapshotter.flush_sync()
@@ -1,16 +1,26 @@
 from dataclasses import dataclass, field, replace  # Use field for default_factory
-from typing import List, Optional, Dict, Any, Set, Tuple, Type, Iterable, Protocol, Sequence, Union
+from typing import List, Optional, Dict, Any, Set, Tuple, Type, Iterable, Protocol, Sequence, Union, Callable
 from enum import Enum
+import asyncio
+import http.cookiejar
+import time
 import json  # Added import
 import httpx  # Added import
 import logging
 from abc import ABC, abstractmethod
 
 from playwright.sync_api import Request
-from httplib import HTTPRequest, HTTPRequestData, AuthSession, ResourceLocator
+from httplib import HTTPRequest, HTTPRequestData, HTTPResponse, AuthSession, ResourceLocator
 from src.llm import RequestResources, Resource, ResourceType, RequestPart
 
 from cnc.services.attack import FindingsStore
+from cnc.services.ratelimit import HostScheduler
+from cnc.services.route_inference import RouteInferer
+from .access_graph import ID_BITS, AccessGraph, Interner
+from .mutation import MutationSlot, compile_mutations
+from .oracle import BaselineStore, ResponseOracle, fingerprint
+from .scheduler import AUTHZ_REQUEST_BUDGET, AttackScheduler
+from .sessions import SESSION_WAIT_TIMEOUT, Refresher, SessionManager, UserSession, looks_expired
 from .models import (
     AuthNZAttack,
     PlannedTest,
@@ -27,11 +37,73 @@ class NetworkError(RuntimeError):
     """Raised for transport‑level issues (DNS, TLS, timeout…)."""
 
 
+def _no_shared_cookies() -> http.cookiejar.CookieJar:
+    # one client serves every user; cookies live in each UserSession instead
+    return http.cookiejar.CookieJar(policy=http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+
+
+def _prepare_send(
+    request: HTTPRequestData, auth_session: Optional[AuthSession]
+) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, Any]]:
+    """Resolve effective headers, cookies and body kwargs for one request."""
+    headers = {**request.headers}
+    cookies: Dict[str, str] = {}
+    if isinstance(auth_session, UserSession):
+        headers.update(auth_session.request_headers(request.url))
+    elif auth_session:
+        # Adapt to the existing AuthSession interface
+        session_cookies = getattr(auth_session, "cookies", {})
+        session_headers = getattr(auth_session, "headers", {})
+        headers.update(session_headers)  # auth overrides template
+        cookies.update(session_cookies)
+
+    # Decide whether to treat body as JSON
+    kwargs: Dict[str, Any] = {}
+    post_data = getattr(request, "post_data", None)
+
+    if post_data is not None:
+        ctype = headers.get("content-type", "").lower()
+        if "application/json" in ctype:
+            # Check if post_data is already a dict/JSON object or a string
+            if isinstance(post_data, dict):
+                kwargs["json"] = post_data
+            else:
+                try:
+                    kwargs["json"] = json.loads(post_data)
+                except (json.JSONDecodeError, TypeError):
+                    log.warning("Could not decode JSON for %s – sending raw", request.url)
+                    log.warning("Sending raw data: %s", post_data)
+                    kwargs["content"] = post_data.encode("utf-8") if isinstance(post_data, str) else post_data
+        else:
+            if isinstance(post_data, str):
+                kwargs["content"] = post_data.encode("utf-8")
+            else:
+                kwargs["content"] = post_data
+    return headers, cookies, kwargs
+
+
+def _refresh_session(auth_session: Optional[AuthSession], resp: httpx.Response) -> None:
+    if isinstance(auth_session, UserSession):
+        auth_session.observe(resp)
+
+
 class HTTPClient:
-    """Thin wrapper around *one* httpx.Client for connection reuse."""
+    """
+    Thin wrapper around *one* httpx.Client for connection reuse.
+    When a HostScheduler is given every request waits for a per-host slot.
+    """
 
-    def __init__(self, *, follow_redirects: bool = True, timeout: float = 30.0):
-        self._client = httpx.Client(follow_redirects=follow_redirects, timeout=timeout)
+    def __init__(
+        self,
+        *,
+        follow_redirects: bool = True,
+        timeout: float = 30.0,
+        scheduler: Optional[HostScheduler] = None,
+    ):
+        self._client = httpx.Client(
+            follow_redirects=follow_redirects, timeout=timeout, cookies=_no_shared_cookies()
+        )
+        self._scheduler = scheduler
 
     def shutdown(self) -> None:
         self._client.close()
@@ -42,84 +114,200 @@ class HTTPClient:
         *,
         auth_session: Optional[AuthSession] = None,
     ) -> httpx.Response:
-        # Resolve effective headers / cookies
-        headers = {**request.headers}
-        cookies: Dict[str, str] = {}
-        if auth_session:
-            # Adapt to the existing AuthSession interface
-            session_cookies = getattr(auth_session, "cookies", {})
-            session_headers = getattr(auth_session, "headers", {})
-            headers.update(session_headers)  # auth overrides template
-            cookies.update(session_cookies)
-
-        # Decide whether to treat body as JSON
-        kwargs: Dict[str, Any] = {}
-        post_data = getattr(request, "post_data", None)
-
-        if post_data is not None:
-            ctype = headers.get("content-type", "").lower()
-            if "application/json" in ctype:
-                # Check if post_data is already a dict/JSON object or a string
-                if isinstance(post_data, dict):
-                    kwargs["json"] = post_data
-                else:
-                    try:
-                        kwargs["json"] = json.loads(post_data)
-                    except (json.JSONDecodeError, TypeError):
-                        log.warning("Could not decode JSON for %s – sending raw", request.url)
-                        log.warning("Sending raw data: %s", post_data)
-                        kwargs["content"] = post_data.encode("utf-8") if isinstance(post_data, str) else post_data
-            else:
-                if isinstance(post_data, str):
-                    kwargs["content"] = post_data.encode("utf-8")
-                else:
-                    kwargs["content"] = post_data
+        headers, cookies, kwargs = _prepare_send(request, auth_session)
 
         # ── TRACE: outbound request ────────────────────────────
         log.info(f"[SEND ] {request.method} {request.url}")
         # ───────────────────────────────────────────────────────
 
         try:
-            resp = self._client.request(
-                method=request.method,
-                url=request.url,
-                headers=headers,
-                cookies=cookies,
-                **kwargs,
-            )
+            if self._scheduler:
+                with self._scheduler.slot(request.url) as slot:
+                    resp = self._client.request(
+                        method=request.method,
+                        url=request.url,
+                        headers=headers,
+                        cookies=cookies,
+                        **kwargs,
+                    )
+                    slot.record(resp.status_code, resp.headers)
+            else:
+                resp = self._client.request(
+                    method=request.method,
+                    url=request.url,
+                    headers=headers,
+                    cookies=cookies,
+                    **kwargs,
+                )
         except httpx.RequestError as exc:
             raise NetworkError("%s %s failed: %s" % (request.method, request.url, exc)) from exc
 
         # ── TRACE: response line ───────────────────────────────
-        log.info(f"[SEND ] ← {resp.status_code} ({len(resp.content)} bytes)")
+        log.info(f"[SEND ] ← {resp.status_code} ({len(resp.content)} bytes)")
         # ───────────────────────────────────────────────────────
 
-        # Let session refresh itself
-        if auth_session:
-            update_method = getattr(auth_session, "update_session", None)
-            if update_method:
-                update_method(resp.headers)
+        _refresh_session(auth_session, resp)
+        return resp
+
+
+class AsyncHTTPClient:
+    """
+    Pooled httpx.AsyncClient counterpart of HTTPClient. Connections are
+    kept alive and reused across attacks; with `http2=True` (requires the
+    `h2` package) requests to the same host are multiplexed over one
+    connection.
+    """
+
+    def __init__(
+        self,
+        *,
+        follow_redirects: bool = True,
+        timeout: float = 30.0,
+        scheduler: Optional[HostScheduler] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        http2: bool = False,
+    ):
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                log.warning("http2 requested but the 'h2' package is not installed; using HTTP/1.1")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            follow_redirects=follow_redirects,
+            timeout=timeout,
+            cookies=_no_shared_cookies(),
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+            ),
+        )
+        self._scheduler = scheduler
+
+    async def shutdown(self) -> None:
+        await self._client.aclose()
+
+    async def send(
+        self,
+        request: HTTPRequestData,
+        *,
+        auth_session: Optional[AuthSession] = None,
+    ) -> httpx.Response:
+        headers, cookies, kwargs = _prepare_send(request, auth_session)
+        log.info(f"[SEND ] {request.method} {request.url}")
+
+        try:
+            if self._scheduler:
+                async with self._scheduler.aslot(request.url) as slot:
+                    resp = await self._client.request(
+                        method=request.method,
+                        url=request.url,
+                        headers=headers,
+                        cookies=cookies,
+                        **kwargs,
+                    )
+                    slot.record(resp.status_code, resp.headers)
             else:
-                log.warning("AuthSession for user has no 'update_session' method")
+                resp = await self._client.request(
+                    method=request.method,
+                    url=request.url,
+                    headers=headers,
+                    cookies=cookies,
+                    **kwargs,
+                )
+        except httpx.RequestError as exc:
+            raise NetworkError("%s %s failed: %s" % (request.method, request.url, exc)) from exc
+
+        log.info(f"[SEND ] ← {resp.status_code} ({len(resp.content)} bytes)")
+        _refresh_session(auth_session, resp)
         return resp
 
 
 class TemplateRegistry:
-    """Store the canonical request for each distinct *action* (URL)."""
+    """
+    Store the canonical request of every principal for each distinct
+    *action* (route). The first principal to register an action is its
+    owner, whose template stands in for principals without one.
+    """
 
     def __init__(self) -> None:
-        self._templates: Dict[str, "RequestTemplate"] = {}
-
-    def add(self, action: str, template: "RequestTemplate") -> None:
-        self._templates[action] = template
-        log.debug("Registered template for %s", action)
-
-    def template(self, action: str) -> "RequestTemplate":
-        return self._templates[action]
+        # action → principal → template, in registration order
+        self._templates: Dict[str, Dict[str, "RequestTemplate"]] = {}
+        # resource type → actions whose templates carry that type
+        self._by_type: Dict[str, Set[str]] = {}
+
+    def _index(self, action: str) -> None:
+        types = set().union(*(t.get_resource_types() for t in self._templates.get(action, {}).values()))
+        for type_name, actions in self._by_type.items():
+            if type_name not in types:
+                actions.discard(action)
+        for type_name in types:
+            self._by_type.setdefault(type_name, set()).add(action)
+
+    def add(self, action: str, template: "RequestTemplate", user: str = "") -> bool:
+        """Register `user`'s template for `action`; False if it was already the current one."""
+        per_user = self._templates.setdefault(action, {})
+        if per_user.get(user) == template:
+            return False
+        per_user[user] = template
+        self._index(action)
+        log.debug("Registered template for %s (%s)", action, user or "-")
+        return True
+
+    def template(self, action: str, user: Optional[str] = None) -> "RequestTemplate":
+        """`user`'s template for `action`, else the owner's."""
+        per_user = self._templates[action]
+        if user is not None and user in per_user:
+            return per_user[user]
+        return next(iter(per_user.values()))
+
+    def has(self, action: str, user: str) -> bool:
+        return user in self._templates.get(action, {})
+
+    def owner(self, action: str) -> Optional[str]:
+        return next(iter(self._templates.get(action, {})), None)
+
+    def rename(self, old: str, new: str) -> None:
+        """Fold `old` into `new`; templates already registered for `new` win."""
+        per_user = self._templates.pop(old, None)
+        if per_user is None:
+            return
+        self._index(old)
+        target = self._templates.setdefault(new, {})
+        for user, template in per_user.items():
+            target.setdefault(user, template)
+        self._index(new)
 
     def actions(self) -> Iterable[str]:
         return self._templates.keys()
 
+    def items(self) -> Iterable[Tuple[str, str, "RequestTemplate"]]:
+        """(action, principal, template) for every registered template."""
+        return [(a, u, t) for a, per_user in self._templates.items() for u, t in per_user.items()]
+
+    def actions_for_type(self, type_name: str) -> Set[str]:
+        """Actions whose template has a locator of `type_name` (read-only view)."""
+        return self._by_type.get(type_name, set())
+
+    def types(self) -> Iterable[str]:
+        return self._by_type.keys()
+
+    def to_state(self) -> Dict[str, Dict[str, list]]:
+        return {
+            action: {user: t.to_state() for user, t in per_user.items()}
+            for action, per_user in self._templates.items()
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        for action, per_user in state.items():
+            if isinstance(per_user, list):
+                # snapshots taken before templates were kept per principal
+                per_user = {"": per_user}
+            for user, t in per_user.items():
+                self.add(action, RequestTemplate.from_state(t), user)
+
 
 @dataclass(slots=True)
 class RequestTemplate:
@@ -127,10 +315,23 @@ class RequestTemplate:
 
     data: HTTPRequestData
     resource_locators: Sequence[ResourceLocator]
+    # type_name → precompiled slot, built on first mutation
+    _mutations: Optional[Dict[str, MutationSlot]] = field(default=None, init=False, repr=False, compare=False)
 
     def get_resource_types(self) -> Set[str]:
         return {rl.type_name for rl in self.resource_locators}
 
+    def to_state(self) -> list:
+        return [self.data.model_dump(mode="json"), [rl.model_dump(mode="json") for rl in self.resource_locators]]
+
+    @classmethod
+    def from_state(cls, state: list) -> "RequestTemplate":
+        data, locators = state
+        return cls(
+            HTTPRequestData.model_validate(data),
+            [ResourceLocator.model_validate(rl) for rl in locators],
+        )
+
     def mutate_for_resource(
         self, *, target: str | None, type_name: str | None
     ) -> HTTPRequestData:
@@ -139,80 +340,18 @@ class RequestTemplate:
         If either `target` or `type_name` is None, return the request untouched.
         """
         if not target or not type_name:
-            return HTTPRequestData(
-                method=self.data.method,
-                url=self.data.url,
-                headers=self.data.headers.copy(),
-                post_data=getattr(self.data, "post_data", None),
-                is_iframe=getattr(self.data, "is_iframe", False),
-                redirected_from_url=getattr(self.data, "redirected_from_url", None),
-                redirected_to_url=getattr(self.data, "redirected_to_url", None),
-            )
+            return self.data.model_copy(update={"headers": self.data.headers.copy()})
 
-        rl = next((r for r in self.resource_locators if r.type_name == type_name), None)
-        if rl is None:
+        if self._mutations is None:
+            self._mutations = compile_mutations(self.data, self.resource_locators)
+        slot = self._mutations.get(type_name)
+        if slot is None:
             raise ValueError(f"{type_name=} absent from template")
+        return slot.apply(self.data, target)
 
-        new_url = self.data.url
-        new_post_data = getattr(self.data, "post_data", None)
-        if rl.request_part == RequestPart.URL:
-            new_url = new_url.replace(rl.id, target, 1)
-        elif rl.request_part == RequestPart.BODY and new_post_data:
-            # Handle both string and JSON formats
-            if isinstance(new_post_data, str):
-                new_post_data = new_post_data.replace(rl.id, target, 1)
-            elif isinstance(new_post_data, dict):
-                post_data_str = json.dumps(new_post_data)
-                post_data_str = post_data_str.replace(rl.id, target, 1)
-                new_post_data = json.loads(post_data_str)
-
-        return HTTPRequestData(
-            method=self.data.method,
-            url=new_url,
-            headers=self.data.headers.copy(),
-            post_data=new_post_data,
-            is_iframe=getattr(self.data, "is_iframe", False),
-            redirected_from_url=getattr(self.data, "redirected_from_url", None),
-            redirected_to_url=getattr(self.data, "redirected_to_url", None),
-        )
 
-
-class AccessGraph:
-    """
-    user  →  { resource_type → {resource_id, …} }
-    PLUS: (resource_type, resource_id) → set(role)
-    """
-
-    def __init__(self) -> None:
-        self._graph: dict[str, dict[str, set[str]]] = {}
-        self._resource_roles: dict[tuple[str, str], set[str]] = {}
-
-    # ── public API ────────────────────────────────────────────────────────
-    def record(
-        self, *, user: str, role: str, type_name: str, resource_id: str
-    ) -> None:
-        self._graph.setdefault(user, {}).setdefault(type_name, set()).add(resource_id)
-        self._resource_roles.setdefault((type_name, resource_id), set()).add(role)
-        log.debug(
-            "Record access: user=%s role=%s type=%s id=%s",
-            user,
-            role,
-            type_name,
-            resource_id,
-        )
-
-    def other_users(self, user: str) -> Iterable[str]:
-        return (u for u in self._graph.keys() if u != user)
-
-    def resources_of_type(self, type_name: str) -> set[str]:
-        out: set[str] = set()
-        for per_user in self._graph.values():
-            out |= per_user.get(type_name, set())
-        return out
-
-    def roles_of_resource(self, *, type_name: str, resource_id: str) -> set[str]:
-        """Return every role that has touched (type,id) so far."""
-        return self._resource_roles.get((type_name, resource_id), set())
+# (variant or None if mixed, type_name, action, attacks)
+PlanStream = Tuple[Optional[Type[AuthNZAttack]], Optional[str], str, Iterable[AuthNZAttack]]
 
 
 class TestPlanner:
@@ -224,8 +363,14 @@ class TestPlanner:
     def __init__(self, graph: AccessGraph, templates: TemplateRegistry):
         self._graph = graph
         self._templates = templates
-        self._executed: set[tuple[str, str, str, str]] = set()
-        # (variant, user, action, type_name)
+        # (variant, user, action, type_name) packed into one int, see _sig_key;
+        # planned attacks are never generated twice, only completed ones are
+        # journaled and snapshotted so queued and in-flight ones rerun after a restart
+        self._planned: set[int] = set()
+        self._executed: set[int] = set()
+        self._variants = Interner()
+        self._actions = Interner()
+        self._journal: Optional[List[list]] = None
 
     # ── helpers ----------------------------------------------------------
     @staticmethod
@@ -241,10 +386,60 @@ class TestPlanner:
 
     def _actions_for_type(self, type_name: str) -> Iterable[str]:
         """Yields actions associated with a given resource type."""
-        for action in self._templates.actions():
-            template = self._templates.template(action)
-            if any(rl.type_name == type_name for rl in template.resource_locators):
-                yield action
+        return self._templates.actions_for_type(type_name)
+
+    def _sig_key(self, variant: int, user: int, action: int, type_name: int) -> int:
+        return ((action << ID_BITS | type_name) << ID_BITS | user) << 8 | variant
+
+    def _intern_sig(self, sig: Sequence[str]) -> int:
+        variant, user, action, type_name = sig
+        return self._sig_key(
+            self._variants.intern(variant),
+            self._graph.users.intern(user),
+            self._actions.intern(action),
+            self._graph.types.intern(type_name),
+        )
+
+    def _is_planned(
+        self, variant: type[AuthNZAttack], user: str, action: str, type_name: str | None
+    ) -> bool:
+        parts = (
+            self._variants.get(variant.__name__),
+            self._graph.users.get(user),
+            self._actions.get(action),
+            self._graph.types.get(type_name or ""),
+        )
+        return None not in parts and self._sig_key(*parts) in self._planned
+
+    def _resources_per_variant(
+        self,
+        *,
+        user: str,
+        role: str,
+        action: str,
+        type_name: str,
+        skip: set[str],
+    ) -> Iterable[tuple[type[AuthNZAttack], str]]:
+        """
+        First resource id of `type_name` for each not-yet-executed variant.
+        Attacks are deduplicated per (variant, user, action, type), so any
+        further ids would be discarded anyway.
+        """
+        wanted = [
+            v for v in (HorizontalResourceAuthz, VerticalResourceAuthz)
+            if not self._is_planned(v, user, action, type_name)
+        ]
+        if not wanted:
+            return
+        for rid, prior_roles in self._graph.resource_roles(type_name):
+            if rid in skip:
+                continue
+            variant = HorizontalResourceAuthz if role in prior_roles else VerticalResourceAuthz
+            if variant in wanted:
+                wanted.remove(variant)
+                yield variant, rid
+                if not wanted:
+                    return
 
     def _dedup(
         self,
@@ -254,11 +449,12 @@ class TestPlanner:
         resource_id: str | None,
         action: str,
         type_name: str | None,
+        template_user: str | None,
     ) -> Iterable[AuthNZAttack]:
-        sig = (variant.__name__, user, action, type_name or "")
-        if sig in self._executed:
+        key = self._intern_sig((variant.__name__, user, action, type_name or ""))
+        if key in self._planned:
             return
-        self._executed.add(sig)
+        self._planned.add(key)
 
         # ── TRACE: attack scheduled ────────────────────────────
         log.info(
@@ -269,84 +465,215 @@ class TestPlanner:
 
         yield variant(
             attack_info=PlannedTest(
-                user=user, resource_id=resource_id, action=action, type_name=type_name
+                user=user,
+                resource_id=resource_id,
+                action=action,
+                type_name=type_name,
+                template_user=template_user,
             )
         )
 
-    # ── public API -------------------------------------------------------
-    def schedule_from_ingest(
+    def mark_executed(self, sig: Sequence[str]) -> None:
+        key = self._intern_sig(sig)
+        self._planned.add(key)
+        self._executed.add(key)
+
+    def completed(self, attack: AuthNZAttack) -> None:
+        """Record that `attack` ran; only then does it count as executed across restarts."""
+        info = attack.attack_info
+        sig = [type(attack).__name__, info.user, info.action, info.type_name or ""]
+        key = self._intern_sig(sig)
+        if key in self._executed:
+            return
+        self._executed.add(key)
+        self._planned.add(key)
+        if self._journal is not None:
+            self._journal.append(["x", *sig])
+
+    def executed(self) -> List[list]:
+        mask = (1 << ID_BITS) - 1
+        users, types = self._graph.users, self._graph.types
+        return [
+            [
+                self._variants.value(key & 0xFF),
+                users.value(key >> 8 & mask),
+                self._actions.value(key >> 8 + 2 * ID_BITS),
+                types.value(key >> 8 + ID_BITS & mask),
+            ]
+            for key in self._executed
+        ]
+
+    def _template_user(self, action: str, user: str) -> Optional[str]:
+        """Principal whose template `user` is attacked with: their own, else the owner's."""
+        return user if self._templates.has(action, user) else self._templates.owner(action)
+
+    def _replays_own_request(
+        self, *, user: str, template_user: Optional[str], action: str, type_name: str | None, resource_id: str | None
+    ) -> bool:
+        """True if the attack would send `user` their own request unchanged."""
+        if template_user != user:
+            return False
+        if not resource_id or not type_name:
+            return True
+        return any(
+            rl.type_name == type_name and rl.id == resource_id
+            for rl in self._templates.template(action, user).resource_locators
+        )
+
+    def _user_substitutions(
         self,
+        label: str,
+        variant: type[AuthNZAttack],
         *,
-        new_username: str,
+        new_user: str,
         new_role: str,
-        new_resources: Sequence[tuple[str, str]],
-        new_action: str,
-        is_new_user: bool,
+        action: str,
+        type_name: str | None,
+        resource_id: str | None,
+        template_user: str | None = None,
     ) -> Iterable[AuthNZAttack]:
-        combined_new_user = f"{new_username}:{new_role}"
-
-        new_types = [r[0] for r in new_resources]
-        new_rids = [r[1] for r in new_resources]
-
-        # 1) New action  →  try it with existing users (no ID swap)
-        for u in self._graph.other_users(combined_new_user):
+        """
+        Other users of the matching role on `action`. With `template_user`
+        every one of them replays that principal's request; without it each
+        replays their own request for the action, or the owner's. Nobody is
+        sent their own request unchanged.
+        """
+        same_role = variant is HorizontalUserAuthz
+        for u in list(self._graph.other_users(new_user)):
             _, other_role = self._split_role(u)
-            variant = HorizontalUserAuthz if other_role == new_role else VerticalUserAuthz
-            
-            log.info(f"[FINDING-1 | UserSub]: {(variant.__name__, u, None, new_action, None)}")
+            if (other_role == new_role) != same_role:
+                continue
+            source = template_user if template_user is not None else self._template_user(action, u)
+            if source is None or self._replays_own_request(
+                user=u, template_user=source, action=action, type_name=type_name, resource_id=resource_id
+            ):
+                continue
+            if template_user is None and self._replays_own_request(
+                user=new_user, template_user=source, action=action, type_name=type_name, resource_id=resource_id
+            ):
+                # the new user's request unchanged: step 1 sends that one
+                continue
+
+            log.info(f"[{label}]: {(variant.__name__, u, resource_id, action, type_name)}")
 
             yield from self._dedup(
-                variant, user=u, resource_id=None, action=new_action, type_name=None
+                variant,
+                user=u,
+                resource_id=resource_id,
+                action=action,
+                type_name=type_name,
+                template_user=source,
             )
 
-        # 2) Same action(s) → try them with new *resource* for all other users
-        for type_name, res_id in new_resources:
-            for action in self._actions_for_type(type_name):
-                if action == new_action:
-                    continue
-                for u in self._graph.other_users(combined_new_user):
-                    _, other_role = self._split_role(u)
-                    variant = (
-                        HorizontalUserAuthz if other_role == new_role else VerticalUserAuthz
-                    )
+    def _new_user_substitutions(
+        self, *, new_user: str, new_role: str, action: str, type_name: str, skip: set[str]
+    ) -> Iterable[AuthNZAttack]:
+        for variant, rid in self._resources_per_variant(
+            user=new_user,
+            role=new_role,
+            action=action,
+            type_name=type_name,
+            skip=skip,
+        ):
+            source = self._template_user(action, new_user)
+            if self._replays_own_request(
+                user=new_user, template_user=source, action=action, type_name=type_name, resource_id=rid
+            ):
+                continue
+            log.info(f"[FINDING-3 | NewUserSub]: {(variant.__name__, new_user, rid, action, type_name)}")
 
-                    log.info(f"[FINDING-2 | ResourceSub]: {(variant.__name__, u, res_id, action, type_name)}")
+            yield from self._dedup(
+                variant,
+                user=new_user,
+                resource_id=rid,
+                action=action,
+                type_name=type_name,
+                template_user=source,
+            )
 
-                    yield from self._dedup(
+    # ── public API -------------------------------------------------------
+    def plan_from_ingest(
+        self,
+        *,
+        new_username: str,
+        new_role: str,
+        new_resources: Sequence[tuple[str, str]],
+        new_action: str,
+        is_new_user: bool,
+    ) -> List[PlanStream]:
+        """
+        The permutations of one ingest as lazy streams of (variant, type_name,
+        action, attacks); variant is None when a stream mixes variants.
+        Nothing is generated, nor marked executed, until a stream is iterated.
+        """
+        combined_new_user = f"{new_username}:{new_role}"
+        streams: List[PlanStream] = []
+
+        # 1) New request  →  replay it as existing users (no ID swap)
+        for variant in (VerticalUserAuthz, HorizontalUserAuthz):
+            streams.append((variant, None, new_action, self._user_substitutions(
+                "FINDING-1 | UserSub",
+                variant,
+                new_user=combined_new_user,
+                new_role=new_role,
+                action=new_action,
+                type_name=None,
+                resource_id=None,
+                template_user=combined_new_user,
+            )))
+
+        # 2) Same action(s) → try them with new *resource* for all other users,
+        #    the ingested route included: other users' own requests for it
+        for type_name, res_id in new_resources:
+            for action in list(self._actions_for_type(type_name)):
+                for variant in (VerticalUserAuthz, HorizontalUserAuthz):
+                    streams.append((variant, type_name, action, self._user_substitutions(
+                        "FINDING-2 | ResourceSub",
                         variant,
-                        user=u,
-                        resource_id=res_id,
+                        new_user=combined_new_user,
+                        new_role=new_role,
                         action=action,
                         type_name=type_name,
-                    )
+                        resource_id=res_id,
+                    )))
 
         # 3) New user  → try them on every known (action, type, id)
         if is_new_user:
-            for action in self._templates.actions():
-                tpl = self._templates.template(action)
-                for type_name in tpl.get_resource_types():
-                    for rid in self._graph.resources_of_type(type_name):
-                        if rid in new_rids:
-                            continue
-
-                        prior_roles = self._graph.roles_of_resource(
-                            type_name=type_name, resource_id=rid
-                        )
-
-                        log.info(f"[FINDING-3 | NewUserSub]: {(variant.__name__, combined_new_user, rid, action, type_name)}")
-
-                        variant = (
-                            HorizontalResourceAuthz
-                            if new_role in prior_roles
-                            else VerticalResourceAuthz
-                        )
-                        yield from self._dedup(
-                            variant,
-                            user=combined_new_user,
-                            resource_id=rid,
-                            action=action,
-                            type_name=type_name,
-                        )
+            skip = {r[1] for r in new_resources}
+            for type_name in list(self._templates.types()):
+                if not self._graph.resources_of_type(type_name):
+                    continue
+                for action in list(self._templates.actions_for_type(type_name)):
+                    streams.append((None, type_name, action, self._new_user_substitutions(
+                        new_user=combined_new_user,
+                        new_role=new_role,
+                        action=action,
+                        type_name=type_name,
+                        skip=skip,
+                    )))
+        return streams
+
+    def schedule_from_ingest(
+        self,
+        *,
+        new_username: str,
+        new_role: str,
+        new_resources: Sequence[tuple[str, str]],
+        new_action: str,
+        is_new_user: bool,
+    ) -> Iterable[AuthNZAttack]:
+        for _, _, _, stream in self.plan_from_ingest(
+            new_username=new_username,
+            new_role=new_role,
+            new_resources=new_resources,
+            new_action=new_action,
+            is_new_user=is_new_user,
+        ):
+            yield from stream
+
+
+def _response_fingerprint(resp: httpx.Response):
+    return fingerprint(resp.status_code, resp.content, resp.headers.get("content-type", ""))
 
 
 class TestExecutor:
@@ -355,25 +682,163 @@ class TestExecutor:
         *,
         client: HTTPClient,
         templates: TemplateRegistry,
-        sessions: Dict[str, AuthSession],
+        sessions: SessionManager,
+        baselines: Optional[BaselineStore] = None,
+        oracle: Optional[ResponseOracle] = None,
     ) -> None:
         self._client = client
         self._templates = templates
         self._sessions = sessions
+        self._baselines = baselines if baselines is not None else BaselineStore()
+        self._oracle = oracle or ResponseOracle()
 
-    def execute(self, attack: AuthNZAttack) -> AuthNZAttack:
+    def _prepare(self, attack: AuthNZAttack) -> Tuple[Optional[HTTPRequestData], Optional[UserSession]]:
         attack_info = attack.attack_info
-        template = self._templates.template(attack_info.action)
+        template = self._templates.template(attack_info.action, attack_info.template_user)
         req = template.mutate_for_resource(
             target=attack_info.resource_id, type_name=attack_info.type_name
         )
-        sess = self._sessions.get(attack_info.user)
+        return req, self._sessions.get(attack_info.user)
+
+    def _owner_request(self, action: str) -> Tuple[Optional[HTTPRequestData], Optional[UserSession]]:
+        owner = self._baselines.owner(action)
+        sess = self._sessions.get(owner) if owner else None
+        if not sess:
+            return None, None
+        return self._templates.template(action, owner).mutate_for_resource(target=None, type_name=None), sess
+
+    def _baseline(self, action: str):
+        """Owner's response for `action`, replayed once if ingest had no body."""
+        if self._baselines.get(action) is None:
+            req, sess = self._owner_request(action)
+            if req is not None:
+                resp = self._client.send(req, auth_session=sess)
+                if isinstance(resp, httpx.Response):
+                    self._baselines.put(action, _response_fingerprint(resp))
+        return self._baselines.get(action)
+
+    def execute(self, attack: AuthNZAttack) -> AuthNZAttack:
+        req, sess = self._prepare(attack)
+        if not sess:
+            return attack
+
+        resp = self._client.send(req, auth_session=sess)
+        if isinstance(resp, httpx.Response):
+            attack.result = self._oracle.judge(
+                self._baseline(attack.attack_info.action), _response_fingerprint(resp)
+            )
+        return attack
+
+
+class AsyncTestExecutor(TestExecutor):
+    """
+    Runs attacks as background tasks on an AsyncHTTPClient, at most
+    `concurrency` in flight. `submit` returns immediately so planning never
+    waits on the network; `drain` waits for everything submitted so far.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: AsyncHTTPClient,
+        templates: TemplateRegistry,
+        sessions: SessionManager,
+        baselines: Optional[BaselineStore] = None,
+        oracle: Optional[ResponseOracle] = None,
+        concurrency: int = 32,
+    ) -> None:
+        super().__init__(
+            client=client, templates=templates, sessions=sessions, baselines=baselines, oracle=oracle
+        )
+        self._sem = asyncio.Semaphore(concurrency)
+        self._baseline_locks: Dict[str, asyncio.Lock] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.completed = 0
+        self.failed = 0
+        self._started_at: Optional[float] = None
+
+    async def _send(self, req: HTTPRequestData, sess: UserSession) -> Optional[httpx.Response]:
+        async with self._sem:
+            resp = await self._client.send(req, auth_session=sess)
+        return resp if isinstance(resp, httpx.Response) else None
+
+    async def _send_as(self, user: str, req: HTTPRequestData) -> Optional[httpx.Response]:
+        """Send with `user`'s session, renewing it and retrying once if it expired."""
+        sess = await self._sessions.fresh(user)
+        if sess is None or sess.expired:
+            return None
+        resp = await self._send(req, sess)
+        if resp is not None and looks_expired(resp):
+            renewed = await self._sessions.handle_rejection(user, sess.generation, self._send)
+            if renewed is not None:
+                resp = await self._send(req, renewed)
+        return resp
+
+    async def _abaseline(self, action: str):
+        # single-flight: concurrent attacks on one action share one replay
+        async with self._baseline_locks.setdefault(action, asyncio.Lock()):
+            if self._baselines.get(action) is None:
+                owner = self._baselines.owner(action)
+                req, _ = self._owner_request(action)
+                if req is not None:
+                    resp = await self._send_as(owner, req)
+                    if resp is not None:
+                        self._baselines.put(action, _response_fingerprint(resp))
+        return self._baselines.get(action)
+
+    async def execute(self, attack: AuthNZAttack) -> AuthNZAttack:
+        req, sess = self._prepare(attack)
         if not sess:
             return attack
 
-        self._client.send(req, auth_session=sess)
+        resp = await self._send_as(attack.attack_info.user, req)
+        if resp is not None:
+            attack.result = self._oracle.judge(
+                await self._abaseline(attack.attack_info.action), _response_fingerprint(resp)
+            )
         return attack
 
+    def submit(
+        self, attack: AuthNZAttack, on_done: Optional[Callable[[AuthNZAttack], None]] = None
+    ) -> asyncio.Task:
+        if self._started_at is None:
+            self._started_at = time.monotonic()
+        task = asyncio.get_running_loop().create_task(self._run(attack, on_done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, attack: AuthNZAttack, on_done: Optional[Callable[[AuthNZAttack], None]]) -> None:
+        try:
+            result = await self.execute(attack)
+        except Exception as exc:
+            self.failed += 1
+            log.warning("Attack %s failed: %s", attack, exc)
+            return
+        self.completed += 1
+        if on_done:
+            on_done(result)
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def throughput(self) -> float:
+        """Completed attacks per second since the first submit."""
+        if self._started_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self._started_at
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    async def drain(self) -> None:
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+def _session_state(session: Any) -> Optional[Dict[str, Any]]:
+    return session.model_dump(mode="json") if isinstance(session, AuthSession) else None
+
 
 class AuthzTester:
     """
@@ -382,19 +847,47 @@ class AuthzTester:
     """
     def __init__(
         self,
-        http_client: Optional[HTTPClient] = None,
+        http_client: Optional[Union[HTTPClient, AsyncHTTPClient]] = None,
         findings_log: Optional[FindingsStore] = None,
+        concurrency: int = 32,
+        routes: Optional[RouteInferer] = None,
+        session_refresher: Optional[Refresher] = None,
+        budget: int = AUTHZ_REQUEST_BUDGET,
+        session_wait_timeout: float = SESSION_WAIT_TIMEOUT,
     ) -> None:
         self._client = http_client or HTTPClient()
+        # actions are inferred routes, not concrete urls
+        self._routes = routes if routes is not None else RouteInferer()
         self._graph = AccessGraph()
         self._templates = TemplateRegistry()
-        self._sessions: Dict[str, AuthSession] = {}
+        # how long an expired user's attacks wait for an agent to push fresh traffic
+        self._sessions = SessionManager(refresher=session_refresher, wait_timeout=session_wait_timeout)
         self._planner = TestPlanner(self._graph, self._templates)
-        self._executor = TestExecutor(
-            client=self._client, templates=self._templates, sessions=self._sessions
-        )
+        # one queue and request budget per application, created on first ingest
+        self._budget = budget
+        self._schedulers: Dict[Optional[str], AttackScheduler] = {}
+        self._concurrency = concurrency
+        self._baselines = BaselineStore()
+        if isinstance(self._client, AsyncHTTPClient):
+            self._executor: TestExecutor = AsyncTestExecutor(
+                client=self._client,
+                templates=self._templates,
+                sessions=self._sessions,
+                baselines=self._baselines,
+                concurrency=concurrency,
+            )
+        else:
+            self._executor = TestExecutor(
+                client=self._client,
+                templates=self._templates,
+                sessions=self._sessions,
+                baselines=self._baselines,
+            )
         self._findings_log = findings_log
         self.findings: List[Union[AuthNZAttack, str]] = []
+        self._route_collapses = self._routes.collapses
+        # state changes since the last snapshot flush, when snapshots are enabled
+        self._journal: Optional[List[list]] = None
 
     # Convert from IntruderRequest to ResourceLocator
     def _convert_resource_to_locator(self, resource: Resource) -> Optional[ResourceLocator]:
@@ -422,51 +915,234 @@ class AuthzTester:
         request: HTTPRequestData,
         resource_locators: Sequence[ResourceLocator],
         session: AuthSession | None = None,
+        response: HTTPResponse | None = None,
+        app_id: str | None = None,
     ) -> None:
         """
         Observe one live request and enqueue all static‑AuthZ permutations.
+        Actions are keyed by inferred route, so `/api/Baskets/1` and
+        `/api/Baskets/2` are one action. The first user to hit an action is
+        its owner; their response is the baseline attack responses are
+        judged against. Every user's latest request for an action is kept as
+        their template for it. The attacks are queued against `app_id`'s
+        request budget.
         """
         # ── TRACE: live request observed ───────────────────────
         log.info(f"[INGEST] {request.method} {request.url}  user={username}  role={role}")
         # ───────────────────────────────────────────────────────
 
-        action_key = f"{request.method.upper()} {request.url}"
+        action_key = self._routes.route(request)
+        if self._routes.collapses != self._route_collapses:
+            self._rekey_actions()
         combined_user = f"{username}:{role}"
 
-        is_new_user = combined_user not in self._graph._graph
+        is_new_user = not self._graph.has_user(combined_user)
 
-        self._templates.add(action_key, RequestTemplate(request, resource_locators))
+        if self._baselines.owner(action_key) is None and self._journal is not None:
+            self._journal.append(["o", action_key, combined_user])
+        self._baselines.set_owner(action_key, combined_user)
+        template = RequestTemplate(request, resource_locators)
+        if self._templates.add(action_key, template, combined_user) and self._journal is not None:
+            self._journal.append(["t", action_key, template.to_state(), combined_user])
         if session:
-            self._sessions[combined_user] = session
+            if self._sessions.update(combined_user, session) and self._journal is not None:
+                self._journal.append(["s", combined_user, _session_state(session)])
+        if (
+            response is not None
+            and response.data.body is not None
+            and self._baselines.owner(action_key) == combined_user
+        ):
+            self._baselines.put(
+                action_key,
+                fingerprint(response.status, response.data.body, response.get_content_type()),
+            )
+        if response is not None and 200 <= response.status < 300 and request.method.upper() == "GET":
+            # a safe request this user may make tells expiry apart from denial
+            self._sessions.set_probe(combined_user, request)
         for rl in resource_locators:
-            self._graph.record(
+            if self._graph.record(
                 user=combined_user,
                 role=role,
                 type_name=rl.type_name,
                 resource_id=rl.id,
-            )
+            ) and self._journal is not None:
+                self._journal.append(["r", combined_user, role, rl.type_name, rl.id])
 
         new_types = [(rl.type_name, rl.id) for rl in resource_locators]
         new_resources_for_planning: Sequence[tuple[str, str]] = (
             new_types if new_types else [("", "")]
         )
-        for attack in self._planner.schedule_from_ingest(
+        for variant, type_name, action, stream in self._planner.plan_from_ingest(
             new_username=username,
             new_role=role,
             new_resources=new_resources_for_planning,
             new_action=action_key,
             is_new_user=is_new_user,
         ):
-            attack_result = self._executor.execute(attack)
-            self.findings.append(attack_result)
-            if self._findings_log:
-                self._findings_log.append(attack_result)
+            self.scheduler(app_id).push(stream, variant=variant, type_name=type_name, action=action)
+        self._dispatch()
+
+    def scheduler(self, app_id: str | None = None) -> AttackScheduler:
+        scheduler = self._schedulers.get(app_id)
+        if scheduler is None:
+            scheduler = self._schedulers[app_id] = AttackScheduler(self._budget)
+        return scheduler
+
+    def _next_attack(self) -> Optional[AuthNZAttack]:
+        """Pop from the applications' queues in turn so one can't starve the others."""
+        for app_id in list(self._schedulers):
+            # rotate to the back
+            scheduler = self._schedulers[app_id] = self._schedulers.pop(app_id)
+            attack = scheduler.pop()
+            if attack is not None:
+                return attack
+        return None
+
+    def _dispatch(self, _: Any = None) -> None:
+        """Hand queued attacks to the executor in priority order."""
+        if isinstance(self._executor, AsyncTestExecutor):
+            # keep no more than `concurrency` in flight so later, more
+            # valuable attacks can still overtake the queue
+            while self._executor.in_flight < self._concurrency:
+                attack = self._next_attack()
+                if attack is None:
+                    return
+                self._executor.submit(attack, self._record).add_done_callback(self._dispatch)
+        else:
+            while (attack := self._next_attack()) is not None:
+                self._record(self._executor.execute(attack))
+
+    def _record(self, attack_result: AuthNZAttack) -> None:
+        self._planner.completed(attack_result)
+        self.findings.append(attack_result)
+        if self._findings_log:
+            self._findings_log.append(attack_result)
+        if attack_result.result and attack_result.result.success:
+            log.warning("AuthZ‑finding [confidence=%.2f]: %s", attack_result.result.confidence, attack_result)
+        else:
             log.info("AuthZ‑finding: %s", attack_result)
 
+    def _rekey_actions(self) -> None:
+        """Fold actions registered under routes that have since been collapsed."""
+        self._route_collapses = self._routes.collapses
+        for action in list(self._templates.actions()):
+            new = self._routes.route(self._templates.template(action).data)
+            if new != action:
+                self._templates.rename(action, new)
+                self._baselines.rename(action, new)
+                if self._journal is not None:
+                    self._journal.append(["m", action, new])
+
+    # ── progress ──────────────────────────────────────────────────────────
+    @property
+    def in_flight(self) -> int:
+        """Attacks sent and not judged yet; always 0 with a blocking client."""
+        return self._executor.in_flight if isinstance(self._executor, AsyncTestExecutor) else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Attack counts, throughput and the queue of every application."""
+        if isinstance(self._executor, AsyncTestExecutor):
+            completed, failed = self._executor.completed, self._executor.failed
+            throughput = self._executor.throughput
+        else:
+            completed, failed, throughput = len(self.findings), 0, 0.0
+        return {
+            "completed": completed,
+            "failed": failed,
+            "in_flight": self.in_flight,
+            "attacks_per_second": round(throughput, 2),
+            "schedulers": {app_id or "default": s.stats() for app_id, s in self._schedulers.items()},
+        }
+
+    def users(self) -> List[str]:
+        """Every principal seen so far, as user:role."""
+        users = dict.fromkeys(self._graph.other_users(""))
+        users.update((u, None) for _, u, _ in self._templates.items() if u)
+        return list(users)
+
+    def coverage(self) -> Dict[str, List[str]]:
+        """
+        Every action with the resources ("type:id") it can be attacked on:
+        the known ids of each type its templates carry, or just "-" for an
+        action without resource locators.
+        """
+        types: Dict[str, Set[str]] = {}
+        for action, _, template in self._templates.items():
+            types.setdefault(action, set()).update(template.get_resource_types())
+        return {
+            action: [
+                f"{t}:{rid}" for t in sorted(type_names) for rid in self._graph.resources_of_type(t)
+            ] or ["-"]
+            for action, type_names in types.items()
+        }
+
+    # ── snapshots ─────────────────────────────────────────────────────────
+    def enable_journal(self) -> None:
+        """Start recording state changes for incremental snapshots."""
+        if self._journal is None:
+            self._journal = []
+            self._planner._journal = self._journal
+
+    def take_journal(self) -> List[list]:
+        """State changes since the previous call, as compact ops."""
+        if not self._journal:
+            return []
+        ops = self._journal[:]
+        self._journal.clear()
+        return ops
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "graph": self._graph.to_state(),
+            "templates": self._templates.to_state(),
+            "executed": self._planner.executed(),
+            "owners": self._baselines.owners(),
+            "sessions": {u: _session_state(s) for u, s in self._sessions.items()},
+            "routes": self._routes.to_state(),
+        }
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self._graph.load_state(state["graph"])
+        self._templates.load_state(state["templates"])
+        for sig in state["executed"]:
+            self._planner.mark_executed(sig)
+        for action, owner in state["owners"].items():
+            self._baselines.set_owner(action, owner)
+        for user, sess in state["sessions"].items():
+            if sess is not None:
+                self._sessions.update(user, AuthSession.model_validate(sess))
+        self._routes.load_state(state.get("routes", {}))
+
+    def apply(self, ops: Iterable[list]) -> None:
+        """Replay journal ops on top of a restored snapshot."""
+        for op in ops:
+            kind = op[0]
+            if kind == "r":
+                self._graph.record(user=op[1], role=op[2], type_name=op[3], resource_id=op[4])
+            elif kind == "x":
+                self._planner.mark_executed(op[1:])
+            elif kind == "t":
+                self._templates.add(op[1], RequestTemplate.from_state(op[2]), op[3] if len(op) > 3 else "")
+            elif kind == "o":
+                self._baselines.set_owner(op[1], op[2])
+            elif kind == "m":
+                self._templates.rename(op[1], op[2])
+                self._baselines.rename(op[1], op[2])
+            elif kind == "s" and op[2] is not None:
+                self._sessions.update(op[1], AuthSession.model_validate(op[2]))
+
     # Convenience helper – call at shutdown
     def close(self) -> None:
         self._client.shutdown()
 
+    async def aclose(self) -> None:
+        """Wait for in-flight attacks, then close the client."""
+        if isinstance(self._executor, AsyncTestExecutor):
+            await self._executor.drain()
+            await self._client.shutdown()
+        else:
+            self._client.shutdown()
+
     def get_findings(self):
         return self.findings
 
@@ -477,6 +1153,8 @@ __all__ = [
     "ResourceLocator",
     "RequestPart",
     "HTTPClient",
+    "AsyncHTTPClient",
+    "AsyncTestExecutor",
     "NetworkError",
     "AuthNZAttack",
     "IntruderRequest",  # Keep for backward compatibility
@@ -6,6 +6,8 @@ class PlannedTest(BaseModel):
     resource_id: str | None
     action: str
     type_name: str | None
+    # principal whose request for `action` is replayed; None: the action's owner
+    template_user: str | None = None
 
 class AuthNZAttack(Attack):
     type: str = "AuthNZ Attack"
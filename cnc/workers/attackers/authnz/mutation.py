@@ -0,0 +1,156 @@
+"""
+Precompiled resource-id mutations for request templates.
+
+`compile_mutations` locates every ResourceLocator of a template once and
+turns it into a slot: the URL split around the id, a JSON path into the
+body, or a header name. Filling a slot with a new id is a string concat or
+a copy of the containers along one body path, instead of re-serialising the
+whole request and replacing the first textual occurrence.
+"""
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+
+from httplib import HTTPRequestData, ResourceLocator
+from src.llm import RequestPart
+from cnc.services.enrichment_cache import LocatorPosition, locate
+
+BodyPath = Tuple[Union[str, int], ...]
+
+
+def _copy(data: HTTPRequestData, **update: Any) -> HTTPRequestData:
+    # model_copy skips validation; headers are the only field callers mutate
+    update.setdefault("headers", dict(data.headers))
+    return data.model_copy(update=update)
+
+
+def _set_path(node: Any, path: BodyPath, value: Any) -> Any:
+    """Copy only the containers along `path` and set its leaf to `value`."""
+    if not path:
+        return value
+    key, rest = path[0], path[1:]
+    copy = list(node) if isinstance(node, list) else dict(node)
+    copy[key] = _set_path(node[key], rest, value)
+    return copy
+
+
+def _is_int(value: str) -> bool:
+    return value[1:].isdigit() if value[:1] == "-" else value.isdigit()
+
+
+@dataclass(slots=True, frozen=True)
+class UrlSlot:
+    head: str
+    tail: str
+
+    def apply(self, data: HTTPRequestData, target: str) -> HTTPRequestData:
+        return _copy(data, url=self.head + target + self.tail)
+
+
+@dataclass(slots=True, frozen=True)
+class TextBodySlot:
+    head: str
+    tail: str
+
+    def apply(self, data: HTTPRequestData, target: str) -> HTTPRequestData:
+        return _copy(data, post_data=self.head + target + self.tail)
+
+
+@dataclass(slots=True, frozen=True)
+class JsonBodySlot:
+    path: BodyPath
+    prefix: str
+    suffix: str
+    numeric: bool   # leaf was a bare JSON number
+
+    def apply(self, data: HTTPRequestData, target: str) -> HTTPRequestData:
+        value: Any = self.prefix + target + self.suffix
+        if self.numeric and _is_int(target):
+            value = int(target)
+        return _copy(data, post_data=_set_path(data.post_data, self.path, value))
+
+
+@dataclass(slots=True, frozen=True)
+class HeaderSlot:
+    name: str
+    prefix: str
+    suffix: str
+
+    def apply(self, data: HTTPRequestData, target: str) -> HTTPRequestData:
+        headers = dict(data.headers)
+        headers[self.name] = self.prefix + target + self.suffix
+        return _copy(data, headers=headers)
+
+
+@dataclass(slots=True, frozen=True)
+class ReplaceSlot:
+    """Fallback when the id could not be located: swap its first textual occurrence."""
+    locator: ResourceLocator
+
+    def apply(self, data: HTTPRequestData, target: str) -> HTTPRequestData:
+        rl = self.locator
+        url, post_data = data.url, data.post_data
+        if rl.request_part == RequestPart.URL:
+            url = url.replace(rl.id, target, 1)
+        elif rl.request_part == RequestPart.BODY and post_data:
+            if isinstance(post_data, str):
+                post_data = post_data.replace(rl.id, target, 1)
+            elif isinstance(post_data, dict):
+                post_data = json.loads(json.dumps(post_data).replace(rl.id, target, 1))
+        return _copy(data, url=url, post_data=post_data)
+
+
+MutationSlot = Union[UrlSlot, TextBodySlot, JsonBodySlot, HeaderSlot, ReplaceSlot]
+
+
+def _url_offset(url: str, pos: LocatorPosition) -> Optional[int]:
+    """Character offset of the id inside `url` for a path or query position."""
+    parts = urlsplit(url)
+    start = url.find("//") + 2 + len(parts.netloc) if parts.netloc else len(parts.scheme) + bool(parts.scheme)
+    if pos.where == "path":
+        idx = pos.key[0]
+        segments = parts.path.split("/")
+        if not isinstance(idx, int) or idx >= len(segments):
+            return None
+        return start + sum(len(s) + 1 for s in segments[:idx]) + len(pos.prefix)
+    if pos.where == "query":
+        offset = url.find("?") + 1
+        for pair in parts.query.split("&"):
+            name, sep, _ = pair.partition("=")
+            if sep and name == pos.key[0]:
+                return offset + len(name) + 1 + len(pos.prefix)
+            offset += len(pair) + 1
+    return None
+
+
+def compile_slot(data: HTTPRequestData, locator: ResourceLocator) -> MutationSlot:
+    pos = locate(data, locator)
+    if pos is None:
+        return ReplaceSlot(locator)
+
+    if pos.where in ("path", "query"):
+        offset = _url_offset(data.url, pos)
+        # percent-encoded values decode to something else than the raw url text
+        if offset is not None and data.url[offset: offset + len(locator.id)] == locator.id:
+            return UrlSlot(data.url[:offset], data.url[offset + len(locator.id):])
+    elif pos.where == "body":
+        if isinstance(data.post_data, str):
+            return TextBodySlot(pos.prefix, pos.suffix)
+        leaf: Any = data.post_data
+        for k in pos.key:
+            leaf = leaf[k]
+        numeric = isinstance(leaf, int) and not isinstance(leaf, bool) and not pos.prefix and not pos.suffix
+        return JsonBodySlot(tuple(pos.key), pos.prefix, pos.suffix, numeric)
+    elif pos.where == "header":
+        return HeaderSlot(str(pos.key[0]), pos.prefix, pos.suffix)
+    return ReplaceSlot(locator)
+
+
+def compile_mutations(data: HTTPRequestData, locators: Sequence[ResourceLocator]) -> Dict[str, MutationSlot]:
+    """One slot per resource type; the first locator of a type wins."""
+    slots: Dict[str, MutationSlot] = {}
+    for rl in locators:
+        if rl.type_name not in slots:
+            slots[rl.type_name] = compile_slot(data, rl)
+    return slots
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+
+from cnc.services.attack import AttackResult
+
+MAX_BODY_BYTES = 1 << 20     # skip JSON parsing past 1MB
+MAX_TOKENS = 512
+MAX_KEYS = 512
+SUCCESS_THRESHOLD = 0.8
+
+DENIED_STATUSES = {401, 403, 404, 405, 409, 422}
+ERROR_KEYS = {"error", "errors", "message_error", "detail"}
+
+TOKEN_RE = re.compile(rb"[A-Za-z0-9_]+")
+
+
+@dataclass(slots=True, frozen=True)
+class ResponseFingerprint:
+    status: int
+    length: int
+    json_keys: Optional[FrozenSet[str]]
+    simhash: Optional[int]
+
+    @property
+    def length_bucket(self) -> int:
+        return self.length.bit_length()
+
+
+def _json_keys(node: Any, prefix: str = "", out: Optional[set] = None) -> set:
+    out = set() if out is None else out
+    if len(out) >= MAX_KEYS:
+        return out
+    if isinstance(node, dict):
+        for k, v in node.items():
+            path = f"{prefix}.{k}" if prefix else str(k)
+            out.add(path)
+            _json_keys(v, path, out)
+    elif isinstance(node, list) and node:
+        # list items share a shape; the first one is representative
+        _json_keys(node[0], prefix + "[]", out)
+    return out
+
+
+def simhash(tokens: Iterable[bytes]) -> int:
+    rows = [format(int.from_bytes(hashlib.blake2b(t, digest_size=8).digest(), "big"), "064b") for t in tokens]
+    if not rows:
+        return 0
+    half = len(rows) / 2
+    # column-wise bit majority; zip/count keep the per-bit work in C
+    bits = "".join("1" if col.count("1") > half else "0" for col in zip(*rows))
+    return int(bits, 2)
+
+
+def fingerprint(status: int, body: Optional[bytes], content_type: str = "") -> ResponseFingerprint:
+    """Compact, comparison-ready summary of one response."""
+    if body is None:
+        return ResponseFingerprint(status=status, length=0, json_keys=None, simhash=None)
+
+    keys: Optional[FrozenSet[str]] = None
+    if len(body) <= MAX_BODY_BYTES and ("json" in content_type or body[:1] in (b"{", b"[")):
+        try:
+            keys = frozenset(_json_keys(json.loads(body)))
+        except (ValueError, UnicodeDecodeError):
+            keys = None
+
+    tokens = []
+    for m in TOKEN_RE.finditer(body):
+        tokens.append(m.group())
+        if len(tokens) >= MAX_TOKENS:
+            break
+    return ResponseFingerprint(status=status, length=len(body), json_keys=keys, simhash=simhash(tokens))
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def _simhash_similarity(a: int, b: int) -> float:
+    return 1.0 - bin(a ^ b).count("1") / 64
+
+
+class ResponseOracle:
+    """
+    Decides whether an authz attack succeeded by comparing its response to
+    the legitimate owner's baseline for the same template. A denial status
+    is a confident failure; a 2xx whose size, JSON shape and content are
+    close to the baseline is a likely success.
+    """
+
+    def __init__(self, threshold: float = SUCCESS_THRESHOLD):
+        self.threshold = threshold
+
+    def similarity(self, baseline: ResponseFingerprint, attack: ResponseFingerprint) -> float:
+        signals = [(0.2, 1.0 if baseline.length_bucket == attack.length_bucket else 0.0)]
+        if baseline.json_keys is not None and attack.json_keys is not None:
+            signals.append((0.4, _jaccard(baseline.json_keys, attack.json_keys)))
+        if baseline.simhash is not None and attack.simhash is not None:
+            signals.append((0.4, _simhash_similarity(baseline.simhash, attack.simhash)))
+        total = sum(w for w, _ in signals)
+        return sum(w * s for w, s in signals) / total
+
+    def judge(self, baseline: Optional[ResponseFingerprint], attack: ResponseFingerprint) -> AttackResult:
+        if attack.status in DENIED_STATUSES or 300 <= attack.status < 400:
+            return AttackResult(
+                success=False,
+                result=str(attack.status),
+                description=f"Denied with status {attack.status}",
+                confidence=0.9,
+            )
+        if attack.status >= 500:
+            return AttackResult(
+                success=False, result=str(attack.status), description="Server error", confidence=0.5
+            )
+        if baseline is None or not 200 <= baseline.status < 300:
+            return AttackResult(
+                success=False, result=str(attack.status), description="No usable baseline", confidence=0.0
+            )
+        if attack.json_keys is not None and attack.json_keys & ERROR_KEYS and not (
+            baseline.json_keys and baseline.json_keys & ERROR_KEYS
+        ):
+            return AttackResult(
+                success=False, result=str(attack.status), description="Error body", confidence=0.7
+            )
+
+        score = self.similarity(baseline, attack)
+        success = score >= self.threshold
+        return AttackResult(
+            success=success,
+            result=str(attack.status),
+            description=f"Similarity to owner baseline {score:.2f}",
+            confidence=round(score if success else 1.0 - score, 3),
+        )
+
+
+class BaselineStore:
+    """Owner and owner-response fingerprint for every action."""
+
+    def __init__(self) -> None:
+        self._owners: Dict[str, str] = {}
+        self._fingerprints: Dict[str, ResponseFingerprint] = {}
+
+    def set_owner(self, action: str, user: str) -> None:
+        self._owners.setdefault(action, user)
+
+    def owner(self, action: str) -> Optional[str]:
+        return self._owners.get(action)
+
+    def owners(self) -> Dict[str, str]:
+        return dict(self._owners)
+
+    def rename(self, old: str, new: str) -> None:
+        if old in self._owners:
+            self._owners.setdefault(new, self._owners.pop(old))
+        if old in self._fingerprints:
+            self._fingerprints.setdefault(new, self._fingerprints.pop(old))
+
+    def get(self, action: str) -> Optional[ResponseFingerprint]:
+        return self._fingerprints.get(action)
+
+    def put(self, action: str, fp: ResponseFingerprint) -> None:
+        if 200 <= fp.status < 300 and fp.simhash is not None:
+            self._fingerprints[action] = fp
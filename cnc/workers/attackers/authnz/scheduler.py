@@ -0,0 +1,143 @@
+import heapq
+import itertools
+import logging
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+from urllib.parse import urlsplit
+
+from .models import AuthNZAttack, VerticalResourceAuthz, VerticalUserAuthz
+
+log = logging.getLogger(__name__)
+
+# attack requests per application; 0 means unlimited
+AUTHZ_REQUEST_BUDGET = int(os.environ.get("AUTHZ_REQUEST_BUDGET", "0"))
+
+VERTICAL = 0
+HORIZONTAL = 1
+
+# words in a resource type or route that make a broken check expensive
+SENSITIVE_WORDS = {
+    "admin": 3, "role": 3, "permission": 3, "privilege": 3, "password": 3, "secret": 3,
+    "token": 3, "key": 3, "payment": 3, "card": 3, "wallet": 3, "credential": 3,
+    "user": 2, "account": 2, "profile": 2, "address": 2, "order": 2, "invoice": 2,
+    "billing": 2, "email": 2, "phone": 2, "message": 2, "document": 2, "file": 2,
+    "basket": 1, "cart": 1, "review": 1, "feedback": 1, "comment": 1,
+}
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+_WORD_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])")
+
+# attacks win ties against the stream they came from
+_ATTACK = 0
+_STREAM = 1
+
+Priority = Tuple[int, int, int]
+
+
+def _words(text: str) -> Iterator[str]:
+    for word in _WORD_RE.findall(text):
+        word = word.lower()
+        yield word[:-1] if word.endswith("s") and len(word) > 3 else word
+
+
+def _rank(variant: Type[AuthNZAttack]) -> int:
+    return VERTICAL if issubclass(variant, (VerticalUserAuthz, VerticalResourceAuthz)) else HORIZONTAL
+
+
+def sensitivity(type_name: Optional[str], action: str) -> int:
+    """Keyword score of a resource type and route; writes rank one above reads."""
+    method, _, url = action.partition(" ")
+    text = f"{type_name or ''} {urlsplit(url).path}"
+    score = max((SENSITIVE_WORDS.get(w, 0) for w in _words(text)), default=0)
+    return score + (method.upper() in MUTATING_METHODS)
+
+
+class AttackScheduler:
+    """
+    Best-first queue between the TestPlanner and the executor. Attacks are
+    ordered by variant (vertical before horizontal), then by how sensitive
+    the resource type and route look, then by novelty (fewest attacks sent
+    against the route so far); ties are served FIFO.
+
+    Planner streams are queued unexpanded under an optimistic bound and only
+    pulled one attack at a time when that bound reaches the front, so a
+    permutation space larger than the budget is never materialised. Once
+    `budget` attacks were dispatched `pop` returns None and the rest stays
+    queued.
+    """
+
+    def __init__(self, budget: int = AUTHZ_REQUEST_BUDGET):
+        self.budget = budget
+        self.dispatched = 0
+        self.expanded = 0
+        self._heap: List[Tuple[Priority, int, int, Any]] = []
+        self._seq = itertools.count()
+        self._tested: Counter = Counter()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def exhausted(self) -> bool:
+        return bool(self.budget) and self.dispatched >= self.budget
+
+    def priority(self, attack: AuthNZAttack) -> Priority:
+        info = attack.attack_info
+        return _rank(type(attack)), -sensitivity(info.type_name, info.action), self._tested[info.action]
+
+    def _bound(self, rank: int, type_name: Optional[str], action: str) -> Priority:
+        # tested counts only grow, so today's count bounds every later pull
+        return rank, -sensitivity(type_name, action), self._tested[action]
+
+    def push(
+        self,
+        stream: Iterable[AuthNZAttack],
+        *,
+        variant: Optional[Type[AuthNZAttack]],
+        type_name: Optional[str],
+        action: str,
+    ) -> None:
+        """Queue a planner stream whose attacks are all `variant` (None: mixed) on `action`."""
+        rank = _rank(variant) if variant is not None else VERTICAL
+        entry = (iter(stream), rank, type_name, action)
+        heapq.heappush(self._heap, (self._bound(rank, type_name, action), _STREAM, next(self._seq), entry))
+
+    def push_attack(self, attack: AuthNZAttack) -> None:
+        heapq.heappush(self._heap, (self.priority(attack), _ATTACK, next(self._seq), attack))
+
+    def pop(self) -> Optional[AuthNZAttack]:
+        """Next attack to send, or None when the queue is empty or the budget spent."""
+        if self.exhausted:
+            return None
+        while self._heap:
+            prio, kind, _, item = heapq.heappop(self._heap)
+            if kind == _STREAM:
+                stream, rank, type_name, action = item
+                attack = next(stream, None)
+                if attack is None:
+                    continue
+                self.expanded += 1
+                self.push_attack(attack)
+                heapq.heappush(self._heap, (self._bound(rank, type_name, action), _STREAM, next(self._seq), item))
+                continue
+            current = self.priority(item)
+            if current > prio:
+                # the route was tested since this was queued
+                heapq.heappush(self._heap, (current, _ATTACK, next(self._seq), item))
+                continue
+            self._tested[item.attack_info.action] += 1
+            self.dispatched += 1
+            if self.exhausted:
+                log.warning("AuthZ request budget of %d spent, %d entries left queued", self.budget, len(self._heap))
+            return item
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "dispatched": self.dispatched,
+            "expanded": self.expanded,
+            "queued": len(self._heap),
+            "budget": self.budget,
+        }
@@ -0,0 +1,251 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import re
+import time
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import httpx
+
+from httplib import AuthSession, HTTPRequestData
+
+log = logging.getLogger(__name__)
+
+# how long attacks for an expired user wait for the agent to push a fresh session
+SESSION_WAIT_TIMEOUT = float(os.environ.get("SESSION_WAIT_TIMEOUT", "60"))
+# a probe that proved the session valid vouches for it this long
+SESSION_PROBE_TTL = float(os.environ.get("SESSION_PROBE_TTL", "30"))
+# refresh bearer tokens this many seconds before their `exp`
+SESSION_EXPIRY_SKEW = float(os.environ.get("SESSION_EXPIRY_SKEW", "30"))
+
+EXPIRED_STATUSES = {401, 419, 440}
+LOGIN_PATH_RE = re.compile(r"/(login|log-in|signin|sign-in|sso)\b", re.IGNORECASE)
+
+# headers that describe the captured request, not the principal
+REQUEST_ONLY_HEADERS = {"cookie", "content-length", "host"}
+# ... and that change between requests without the credentials changing
+NON_CREDENTIAL_HEADERS = REQUEST_ONLY_HEADERS | {
+    "accept", "accept-encoding", "accept-language", "cache-control", "connection",
+    "content-type", "if-modified-since", "if-none-match", "origin", "pragma",
+    "priority", "referer", "upgrade-insecure-requests", "user-agent",
+}
+
+Refresher = Callable[[str], Awaitable[Optional[AuthSession]]]
+Probe = Callable[[HTTPRequestData, "UserSession"], Awaitable[Optional[httpx.Response]]]
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """`exp` claim of a JWT, or None if `token` is not one."""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    exp = payload.get("exp") if isinstance(payload, dict) else None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def looks_expired(resp: httpx.Response) -> bool:
+    """401-style status, or redirected onto a login page."""
+    if resp.status_code in EXPIRED_STATUSES:
+        return True
+    return bool(
+        resp.history
+        and LOGIN_PATH_RE.search(resp.url.path)
+        and not LOGIN_PATH_RE.search(resp.history[0].url.path)
+    )
+
+
+def _parse_cookie_header(value: str) -> Dict[str, str]:
+    cookies = {}
+    for part in value.split(";"):
+        name, sep, val = part.strip().partition("=")
+        if sep and name:
+            cookies[name] = val
+    return cookies
+
+
+def credentials(source: AuthSession) -> Tuple[frozenset, frozenset, frozenset]:
+    """Auth headers, cookies and body fields of a captured session, without per-request noise."""
+    headers, cookies = {}, {}
+    for k, v in (getattr(source, "headers", None) or {}).items():
+        key = k.lower()
+        if key == "cookie":
+            cookies.update(_parse_cookie_header(v))
+        elif key not in NON_CREDENTIAL_HEADERS and not key.startswith("sec-"):
+            headers[key] = v
+    body = getattr(source, "body", None) or {}
+    return frozenset(headers.items()), frozenset(cookies.items()), frozenset(body.items())
+
+
+class UserSession:
+    """
+    Live credentials of one user:role. Captured headers and cookies seed it;
+    Set-Cookie headers from attack responses land in a real cookie jar and
+    override the captured values for matching domains and paths.
+    """
+
+    def __init__(self, source: AuthSession):
+        self.generation = 0
+        self.update(source)
+
+    def update(self, source: AuthSession) -> None:
+        self.source = source
+        raw = dict(getattr(source, "headers", None) or {})
+        self.headers: Dict[str, str] = {}
+        self.captured_cookies: Dict[str, str] = {}
+        for k, v in raw.items():
+            if k.lower() == "cookie":
+                self.captured_cookies.update(_parse_cookie_header(v))
+            elif k.lower() not in REQUEST_ONLY_HEADERS:
+                self.headers[k] = v
+        auth = next((v for k, v in self.headers.items() if k.lower() == "authorization"), "")
+        self.expires_at = jwt_expiry(auth.split(" ", 1)[-1]) if auth else None
+        # captured cookies are fresh again; stale jar values must not shadow them
+        self.jar = httpx.Cookies()
+        self.generation += 1
+        self.verified_at = 0.0
+        # renewal timed out; attacks skip this user until fresh traffic arrives
+        self.expired = False
+
+    def expires_soon(self, now: Optional[float] = None) -> bool:
+        if self.expires_at is None:
+            return False
+        return (now if now is not None else time.time()) >= self.expires_at - SESSION_EXPIRY_SKEW
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        headers = dict(self.headers)
+        cookies = dict(self.captured_cookies)
+        if self.jar:
+            probe = httpx.Request("GET", url)
+            self.jar.set_cookie_header(probe)
+            cookies.update(_parse_cookie_header(probe.headers.get("cookie", "")))
+        if cookies:
+            headers["Cookie"] = "; ".join(f"{k}={v}" for k, v in cookies.items())
+        return headers
+
+    def observe(self, resp: httpx.Response) -> None:
+        self.jar.extract_cookies(resp)
+
+
+class SessionManager:
+    """
+    Sessions per user:role for attack replay. When a response looks like an
+    expired session, `handle_rejection` first replays a request the user is
+    known to be allowed to make; only if that fails too is the session
+    renewed, through `refresher` or by waiting for the agent to push fresh
+    traffic. Both steps are single-flight per user, so concurrent attacks
+    share one probe and one renewal instead of stampeding the login.
+    """
+
+    def __init__(
+        self,
+        refresher: Optional[Refresher] = None,
+        wait_timeout: float = SESSION_WAIT_TIMEOUT,
+        probe_ttl: float = SESSION_PROBE_TTL,
+    ):
+        self.refresher = refresher
+        self.wait_timeout = wait_timeout
+        self.probe_ttl = probe_ttl
+        self._sessions: Dict[str, UserSession] = {}
+        self._probes: Dict[str, HTTPRequestData] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._updated: Dict[str, asyncio.Event] = {}
+        self.renewals = 0
+        self.probes_ok = 0
+        self.timeouts = 0
+
+    def get(self, user: Optional[str]) -> Optional[UserSession]:
+        return self._sessions.get(user) if user else None
+
+    def update(self, user: str, source: AuthSession) -> bool:
+        """
+        Install freshly captured credentials; False if they are the ones
+        already installed, whatever else differs between the two requests.
+        """
+        sess = self._sessions.get(user)
+        if sess is None:
+            self._sessions[user] = UserSession(source)
+        elif credentials(sess.source) == credentials(source):
+            return False
+        else:
+            sess.update(source)
+        event = self._updated.pop(user, None)
+        if event is not None:
+            event.set()
+        return True
+
+    def set_probe(self, user: str, request: HTTPRequestData) -> None:
+        """Remember a request `user` is allowed to make, to tell expiry from denial."""
+        self._probes[user] = request
+
+    def items(self) -> Iterable[Tuple[str, AuthSession]]:
+        return ((u, s.source) for u, s in self._sessions.items())
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def fresh(self, user: str) -> Optional[UserSession]:
+        """The user's session, renewed first if its token is about to expire."""
+        sess = self._sessions.get(user)
+        if sess is not None and sess.expires_soon() and not sess.expired:
+            async with self._locks.setdefault(user, asyncio.Lock()):
+                if sess.expires_soon() and not sess.expired:
+                    return await self._renew(user, sess)
+        return sess
+
+    async def handle_rejection(self, user: str, generation: int, probe: Probe) -> Optional[UserSession]:
+        """
+        Called when a response to `user`'s session looked like expiry. Returns
+        a renewed session to retry with, or None if the session is fine (the
+        rejection is a real denial) or could not be renewed.
+        """
+        async with self._locks.setdefault(user, asyncio.Lock()):
+            sess = self._sessions.get(user)
+            if sess is None:
+                return None
+            if sess.generation != generation:
+                return sess
+            if sess.expired:
+                return None
+            if time.monotonic() - sess.verified_at < self.probe_ttl:
+                return None
+            request = self._probes.get(user)
+            if request is not None and not sess.expires_soon():
+                resp = await probe(request, sess)
+                if resp is not None and not looks_expired(resp):
+                    sess.verified_at = time.monotonic()
+                    self.probes_ok += 1
+                    return None
+            return await self._renew(user, sess)
+
+    async def _renew(self, user: str, sess: UserSession) -> Optional[UserSession]:
+        generation = sess.generation
+        if self.refresher is not None:
+            source = await self.refresher(user)
+            if source is not None:
+                self.update(user, source)
+        if sess.generation == generation:
+            log.info("Session for %s expired, waiting up to %.0fs for fresh traffic", user, self.wait_timeout)
+            event = self._updated.setdefault(user, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), self.wait_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                sess.expired = True
+                log.warning("No fresh session for %s after %.0fs", user, self.wait_timeout)
+                return None
+        self.renewals += 1
+        return sess
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "sessions": len(self._sessions),
+            "renewals": self.renewals,
+            "probes_ok": self.probes_ok,
+            "timeouts": self.timeouts,
+        }
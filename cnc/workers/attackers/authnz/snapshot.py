@@ -0,0 +1,139 @@
+import asyncio
+import gc
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .intruder import AuthzTester
+
+log = logging.getLogger(__name__)
+
+# one subdirectory per application, "default" for traffic without an app_id
+AUTHZ_SNAPSHOT_DIR = os.environ.get("AUTHZ_SNAPSHOT_DIR")
+AUTHZ_SNAPSHOT_INTERVAL = float(os.environ.get("AUTHZ_SNAPSHOT_INTERVAL", "30"))
+# rewrite the base once the delta log outgrows it (and is at least this big)
+MIN_COMPACT_BYTES = 1 << 20
+
+BASE_FILE = "base.json"
+DELTA_FILE = "delta.jsonl"
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # bulk loads allocate millions of containers that all survive; letting the
+    # cyclic GC rescan them on every generation threshold costs more than the load
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class SnapshotStore:
+    """
+    On-disk AuthzTester state for one application: `base.json` holds a full
+    snapshot, `delta.jsonl` one line of journal ops per flush since then.
+    """
+
+    def __init__(self, directory: str, min_compact_bytes: int = MIN_COMPACT_BYTES):
+        self.directory = directory
+        self.min_compact_bytes = min_compact_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @property
+    def base_path(self) -> str:
+        return os.path.join(self.directory, BASE_FILE)
+
+    @property
+    def delta_path(self) -> str:
+        return os.path.join(self.directory, DELTA_FILE)
+
+    def _size(self, path: str) -> int:
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def load(self) -> Tuple[Optional[Dict[str, Any]], List[list]]:
+        with _gc_paused():
+            return self._load()
+
+    def _load(self) -> Tuple[Optional[Dict[str, Any]], List[list]]:
+        base = None
+        if os.path.exists(self.base_path):
+            with open(self.base_path, "r", encoding="utf-8") as f:
+                base = json.load(f)
+        ops: List[list] = []
+        if os.path.exists(self.delta_path):
+            with open(self.delta_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        ops.extend(json.loads(line))
+                    except ValueError:
+                        # torn last line from a crash mid-append
+                        log.warning("Ignoring truncated snapshot delta in %s", self.delta_path)
+                        break
+        return base, ops
+
+    def append(self, ops: List[list]) -> None:
+        with open(self.delta_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(ops, separators=(",", ":")) + "\n")
+
+    def needs_compaction(self) -> bool:
+        delta = self._size(self.delta_path)
+        return delta >= self.min_compact_bytes and delta > self._size(self.base_path)
+
+    def write_base(self, state: Dict[str, Any]) -> None:
+        tmp = self.base_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            # dumps() uses the C encoder, streaming dump() does not
+            f.write(json.dumps(state, separators=(",", ":")))
+        os.replace(tmp, self.base_path)
+        open(self.delta_path, "w").close()
+
+
+class Snapshotter:
+    """Restores an AuthzTester from a SnapshotStore and keeps the store current."""
+
+    def __init__(self, tester: AuthzTester, store: SnapshotStore, interval: float = AUTHZ_SNAPSHOT_INTERVAL):
+        self.tester = tester
+        self.store = store
+        self.interval = interval
+        tester.enable_journal()
+
+    async def restore(self) -> int:
+        start = time.perf_counter()
+        base, ops = await asyncio.to_thread(self.store.load)
+        with _gc_paused():
+            if base is not None:
+                self.tester.restore(base)
+            self.tester.apply(ops)
+        log.info(
+            "Restored authz state from %s (%d delta ops) in %.2fs",
+            self.store.directory, len(ops), time.perf_counter() - start,
+        )
+        return len(ops)
+
+    async def flush(self) -> None:
+        ops = self.tester.take_journal()
+        if ops:
+            await asyncio.to_thread(self.store.append, ops)
+        if self.store.needs_compaction():
+            state = self.tester.snapshot()
+            await asyncio.to_thread(self.store.write_base, state)
+
+    def flush_sync(self) -> None:
+        ops = self.tester.take_journal()
+        if ops:
+            self.store.append(ops)
+        self.store.write_base(self.tester.snapshot())
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except OSError as exc:
+                log.warning("Snapshot flush to %s failed: %s", self.store.directory, exc)
@@ -6,11 +6,19 @@ from typing import Optional
 from database.session import create_db_and_tables, engine
 from services.queue import BroadcastChannel
 from services.enrichment import RequestEnrichmentWorker 
+from services.ratelimit import HostScheduler
+from services.enrichment_cache import EnrichmentCache
+from services.route_inference import RouteInferer
 from workers.attackers.authnz.attacker import AuthzAttacker
 from httplib import HTTPMessage
 from cnc.schemas.http import EnrichedRequest
 
-async def start_enrichment_worker(raw_channel: BroadcastChannel, enriched_channel: BroadcastChannel, session: AsyncSession):
+async def start_enrichment_worker(
+    raw_channel: BroadcastChannel,
+    enriched_channel: BroadcastChannel,
+    session: AsyncSession,
+    cache: Optional[EnrichmentCache] = None,
+):
     """
     Start the enrichment worker.
     
@@ -18,6 +26,7 @@ async def start_enrichment_worker(raw_channel: BroadcastChannel, enriched_channe
         raw_channel: Channel for raw HTTP messages
         enriched_channel: Channel for enriched requests
         session: Database session
+        cache: Enrichment cache shared with the API, warmed from the database
     """
     print("Starting enrichment worker...")
     
@@ -25,30 +34,59 @@ async def start_enrichment_worker(raw_channel: BroadcastChannel, enriched_channe
     enrichment_worker = RequestEnrichmentWorker(
         inbound=raw_channel,
         outbound=enriched_channel,
-        db_session=session
+        db_session=session,
+        cache=cache
     )
+    await enrichment_worker.preload()
     
-    # Run the worker
-    await enrichment_worker.run()
+    # Run the worker; on cancellation flush the pending batch and the cache file
+    try:
+        await enrichment_worker.run()
+    finally:
+        await enrichment_worker.shutdown()
 
-async def start_attacker_worker(enriched_channel: BroadcastChannel, session: AsyncSession):
+async def start_attacker_worker(
+    enriched_channel: BroadcastChannel,
+    session: AsyncSession,
+    scheduler: HostScheduler,
+    routes: Optional[RouteInferer] = None,
+):
     """
     Start the authorization attacker worker.
     
     Args:
         enriched_channel: Channel for enriched requests
         session: Database session
+        scheduler: Per-host rate limiter shared by all attack workers
+        routes: Route inference shared with the push deduplicator
     """
     print("Starting authorization attacker worker...")
     
     # Create worker with injected dependencies
     authz_worker = AuthzAttacker(
         inbound=enriched_channel,
-        db_session=session
+        db_session=session,
+        scheduler=scheduler,
+        routes=routes
     )
     
-    # Run the worker
-    await authz_worker.run()
+    # Run the worker; on cancellation drain attacks and write the final snapshot
+    try:
+        await authz_worker.run()
+    finally:
+        await authz_worker.shutdown()
+
+async def report_host_stats(scheduler: HostScheduler, interval: float = 30.0):
+    """
+    Periodically log the achieved requests per second for every target host.
+    
+    Args:
+        scheduler: Scheduler shared by the attack workers
+        interval: Seconds between reports
+    """
+    while True:
+        await asyncio.sleep(interval)
+        scheduler.log_stats()
 
 async def start_workers(app: Optional[FastAPI] = None):
     """
@@ -73,6 +111,9 @@ async def start_workers(app: Optional[FastAPI] = None):
     else:
         raise Exception("No channels found in FastAPI app.state. Please provide an app instance.")
     
+    # One scheduler for every attack worker so per-host limits are global
+    host_scheduler = HostScheduler()
+    
     # Create session factory
     async_session = async_sessionmaker(engine, expire_on_commit=False)
     
@@ -83,8 +124,9 @@ async def start_workers(app: Optional[FastAPI] = None):
         
         # Run all workers concurrently
         await asyncio.gather(
-            start_enrichment_worker(raw_channel, enriched_channel, session),
-            start_attacker_worker(enriched_channel, session)
+            start_enrichment_worker(raw_channel, enriched_channel, session, getattr(app.state, "enrichment_cache", None)),
+            start_attacker_worker(enriched_channel, session, host_scheduler, getattr(app.state, "route_inferer", None)),
+            report_host_stats(host_scheduler)
         )
 
 if __name__ == "__main__":
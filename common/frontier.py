@@ -0,0 +1,206 @@
+"""
+Exploration frontier shared by the agents exploring one application.
+
+Pages wait in a priority queue (shallow urls first) until an agent claims
+one. A claim is a lease: the agent renews it while it explores the page,
+and a lease that runs out, e.g. because the agent died, puts the page back
+in the queue. Once the agent has navigated, it registers the page's
+structure fingerprint; a page whose fingerprint was already explored, or
+is being explored under another url, is skipped, so N agents divide the
+application instead of exploring it N times.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+FRONTIER_LEASE_SECONDS = float(os.environ.get("FRONTIER_LEASE_SECONDS", "300"))
+# a page whose navigation failed this many times is dropped
+FRONTIER_MAX_ATTEMPTS = int(os.environ.get("FRONTIER_MAX_ATTEMPTS", "3"))
+
+
+def url_depth(url: str) -> int:
+    """Path segments of a url, counting SPA routes after '#'."""
+    parts = urlsplit(url)
+    path = parts.path + ("/" + parts.fragment if parts.fragment else "")
+    return len([seg for seg in path.split("/") if seg])
+
+
+@dataclass
+class Lease:
+    agent: str
+    expires: float
+    fingerprint: Optional[str] = None
+
+
+@dataclass
+class AgentActivity:
+    joined: float
+    last_seen: float
+    explored: int = 0
+
+
+@dataclass
+class Frontier:
+    lease_seconds: float = FRONTIER_LEASE_SECONDS
+    max_attempts: int = FRONTIER_MAX_ATTEMPTS
+    _queue: List[Tuple[float, int, str]] = field(default_factory=list)
+    _queued: Set[str] = field(default_factory=set)
+    _leases: Dict[str, Lease] = field(default_factory=dict)
+    _attempts: Dict[str, int] = field(default_factory=dict)
+    _done: Set[str] = field(default_factory=set)
+    # fingerprint -> url it was explored (or is being explored) under
+    _visited: Dict[str, str] = field(default_factory=dict)
+    _exploring: Dict[str, str] = field(default_factory=dict)
+    _agents: Dict[str, AgentActivity] = field(default_factory=dict)
+    _seq: "itertools.count" = field(default_factory=itertools.count)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def _touch(self, agent: str, now: float) -> AgentActivity:
+        activity = self._agents.get(agent)
+        if activity is None:
+            activity = self._agents[agent] = AgentActivity(joined=now, last_seen=now)
+        activity.last_seen = now
+        return activity
+
+    def _push(self, url: str) -> None:
+        priority = url_depth(url) + self._attempts.get(url, 0)
+        heapq.heappush(self._queue, (priority, next(self._seq), url))
+        self._queued.add(url)
+
+    def _expire(self, now: float) -> None:
+        for url, lease in [(u, l) for u, l in self._leases.items() if l.expires <= now]:
+            del self._leases[url]
+            if lease.fingerprint is not None:
+                self._exploring.pop(lease.fingerprint, None)
+            self._push(url)
+
+    # ── public API ────────────────────────────────────────────────────────
+    def add(self, agent: str, urls: Iterable[str]) -> int:
+        """Queue urls nobody has seen yet; returns how many were new."""
+        added = 0
+        with self._lock:
+            self._touch(agent, time.time())
+            for url in urls:
+                if url in self._queued or url in self._leases or url in self._done:
+                    continue
+                self._push(url)
+                added += 1
+        return added
+
+    def claim(self, agent: str) -> Optional[str]:
+        with self._lock:
+            now = time.time()
+            self._touch(agent, now)
+            self._expire(now)
+            while self._queue:
+                _, _, url = heapq.heappop(self._queue)
+                if url not in self._queued:
+                    continue
+                self._queued.discard(url)
+                self._leases[url] = Lease(agent=agent, expires=now + self.lease_seconds)
+                return url
+            return None
+
+    def renew(self, agent: str, url: str) -> bool:
+        with self._lock:
+            now = time.time()
+            self._touch(agent, now)
+            lease = self._leases.get(url)
+            if lease is None or lease.agent != agent:
+                return False
+            lease.expires = now + self.lease_seconds
+            return True
+
+    def visit(self, agent: str, url: str, fingerprint: str) -> bool:
+        """
+        Register the structure of the page `agent` navigated to for its lease
+        on `url`. False if that page was explored already or is being explored
+        under another url: the agent should complete the lease and move on.
+        """
+        with self._lock:
+            now = time.time()
+            activity = self._touch(agent, now)
+            self._expire(now)
+            lease = self._leases.get(url)
+            if lease is None or lease.agent != agent:
+                return False
+            if fingerprint in self._visited or self._exploring.get(fingerprint, url) != url:
+                return False
+            lease.fingerprint = fingerprint
+            lease.expires = now + self.lease_seconds
+            self._exploring[fingerprint] = url
+            activity.explored += 1
+            return True
+
+    def complete(self, agent: str, url: str) -> None:
+        with self._lock:
+            self._touch(agent, time.time())
+            lease = self._leases.get(url)
+            if lease is None or lease.agent != agent:
+                return
+            del self._leases[url]
+            self._done.add(url)
+            if lease.fingerprint is not None:
+                self._exploring.pop(lease.fingerprint, None)
+                self._visited[lease.fingerprint] = url
+
+    def release(self, agent: str, url: str) -> None:
+        """Give a claimed page back, e.g. because navigating to it failed."""
+        with self._lock:
+            self._touch(agent, time.time())
+            lease = self._leases.get(url)
+            if lease is None or lease.agent != agent:
+                return
+            del self._leases[url]
+            if lease.fingerprint is not None:
+                self._exploring.pop(lease.fingerprint, None)
+            self._attempts[url] = self._attempts.get(url, 0) + 1
+            if self._attempts[url] >= self.max_attempts:
+                self._done.add(url)
+            else:
+                self._push(url)
+
+    def exhausted(self) -> bool:
+        """Nothing queued and nobody exploring: no more pages can turn up."""
+        with self._lock:
+            self._expire(time.time())
+            return not self._queued and not self._leases
+
+    def stats(self) -> Dict:
+        with self._lock:
+            agent_hours = sum(a.last_seen - a.joined for a in self._agents.values()) / 3600
+            return {
+                "queued": len(self._queued),
+                "leased": len(self._leases),
+                "explored_pages": len(self._visited) + len(self._exploring),
+                "agents": len(self._agents),
+                "agent_hours": agent_hours,
+                "pages_per_agent_hour": (len(self._visited) + len(self._exploring)) / agent_hours if agent_hours else 0.0,
+                "explored_by_agent": {agent: a.explored for agent, a in self._agents.items()},
+            }
+
+
+class FrontierSet:
+    """One frontier per application, created on first use and dropped on reset."""
+
+    def __init__(self, lease_seconds: float = FRONTIER_LEASE_SECONDS):
+        self.lease_seconds = lease_seconds
+        self._frontiers: Dict[str, Frontier] = {}
+        self._lock = threading.Lock()
+
+    def get(self, app_id: str) -> Frontier:
+        with self._lock:
+            frontier = self._frontiers.get(str(app_id))
+            if frontier is None:
+                frontier = self._frontiers[str(app_id)] = Frontier(lease_seconds=self.lease_seconds)
+            return frontier
+
+    def reset(self, app_id: str) -> None:
+        """Forget an application's pages and agents, e.g. when a new run starts."""
+        with self._lock:
+            self._frontiers.pop(str(app_id), None)
@@ -0,0 +1,109 @@
+"""
+Compares the heuristic resource-id extractor against the LLM extractor on
+labelled requests: accuracy, how often the heuristic is confident enough to
+skip the LLM, and per-request latency.
+
+    python -m eval.bench_resource_heuristics [--llm]
+"""
+import argparse
+import ast
+import json
+import time
+from typing import Dict, List, Set, Tuple
+
+from httplib import HTTPRequestData
+from cnc.services.resource_heuristics import HeuristicExtractor
+from eval.extract_params_samples import EXTRACT_PARAMS_SAMPLES
+
+Expected = Set[Tuple[str, str, str]]  # (id, type, request_part)
+
+
+def _from_sample(sample: Dict) -> Tuple[str, Expected]:
+    expected = json.loads(sample["expected_output"])["resources"]
+    return sample["request"].strip(), {(r["id"], r["type"]["name"], r["request_part"]) for r in expected}
+
+
+# the labelled samples of the extraction eval, plus REST-style requests
+BENCH_ITEMS: List[Tuple[str, Expected]] = [_from_sample(s) for s in EXTRACT_PARAMS_SAMPLES] + [
+    ("GET http://localhost:3000/api/Users/1", {("1", "user", "URL")}),
+    ("GET http://localhost:3000/rest/basket/6", {("6", "basket", "URL")}),
+    ("DELETE http://localhost:3000/api/Feedbacks/12", {("12", "feedback", "URL")}),
+    (
+        "POST http://localhost:3000/api/BasketItems/\n{'ProductId': 24, 'BasketId': '6', 'quantity': 1}",
+        {("24", "product", "BODY"), ("6", "basket", "BODY")},
+    ),
+    (
+        "GET http://localhost:3000/rest/track-order/5267-f9cd5882f54c75a3",
+        {("5267-f9cd5882f54c75a3", "track_order", "URL")},
+    ),
+    (
+        "GET http://localhost:8000/api/v1/documents/5f1d7f5e-0c52-4a0e-9b1e-3f7a1b2c3d4e/",
+        {("5f1d7f5e-0c52-4a0e-9b1e-3f7a1b2c3d4e", "document", "URL")},
+    ),
+]
+
+
+def parse_item(raw: str) -> HTTPRequestData:
+    first, _, body = raw.partition("\n")
+    method, url = first.split(" ", 1)
+    post_data = ast.literal_eval(body.strip()) if body.strip() else None
+    return HTTPRequestData(method=method, url=url.strip(), headers={}, post_data=post_data)
+
+
+def found(resources) -> Expected:
+    return {(r.id, r.type.name.lower(), r.request_part.value) for r in resources}
+
+
+def bench_heuristic() -> None:
+    extractor = HeuristicExtractor()
+    correct = confident = confident_correct = 0
+    elapsed = 0.0
+    for raw, expected in BENCH_ITEMS:
+        request = parse_item(raw)
+        start = time.perf_counter()
+        result = extractor.extract(request)
+        elapsed += time.perf_counter() - start
+
+        ok = found(c.resource for c in result.candidates) == expected
+        correct += ok
+        if result.is_confident():
+            confident += 1
+            confident_correct += ok
+        if not ok:
+            print(f"[MISS] {raw.splitlines()[0]}: got {found(c.resource for c in result.candidates)}")
+
+    n = len(BENCH_ITEMS)
+    print(f"heuristic accuracy:        {correct}/{n}")
+    print(f"confident (skips LLM):     {confident}/{n}")
+    print(f"accuracy when confident:   {confident_correct}/{confident or 1}")
+    print(f"avg latency:               {elapsed / n * 1e6:.1f}us")
+
+
+def bench_llm() -> None:
+    from johnllm import LLMModel
+    from cnc.services.enrichment import ExtractResources
+
+    llm = LLMModel()
+    correct = 0
+    elapsed = 0.0
+    for raw, expected in BENCH_ITEMS:
+        start = time.perf_counter()
+        resources = ExtractResources().invoke(
+            model=llm, model_name="gpt-4.1", prompt_args={"request": raw}
+        )
+        elapsed += time.perf_counter() - start
+        correct += found(resources.resources or []) == expected
+
+    n = len(BENCH_ITEMS)
+    print(f"llm accuracy:              {correct}/{n}")
+    print(f"avg latency:               {elapsed / n * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark heuristic vs LLM resource extraction")
+    parser.add_argument("--llm", action="store_true", help="Also time the LLM extractor")
+    args = parser.parse_args()
+
+    bench_heuristic()
+    if args.llm:
+        bench_llm()
@@ -5,6 +5,8 @@ from eval.challenges import DiscoveryChallenge, DiscoveryChallengeURL
 from common.agent import BrowserActions
 
 from httplib import HTTPMessage
+from src.agent.discovery import PLAN_MAINTENANCE_CONCURRENT
+from src.agent.prefetch import PIPELINE_STEPS
 from start_agent import start_agent
 
 from logging import getLogger
@@ -56,6 +58,28 @@ part1 -> part2 -> EXIT
 """.format(url=VULN_APP_URL, creds=str(USERS[0]))
 
 
+def _mean(values: List[float]):
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def step_timings(agent_state) -> Dict:
+    """Mean wall-clock seconds per agent step and per plan maintenance."""
+    steps = [
+        h.metadata.step_end_time - h.metadata.step_start_time
+        for h in agent_state.history.history
+        if h.metadata
+    ]
+    return {
+        "plan_maintenance_concurrent": PLAN_MAINTENANCE_CONCURRENT,
+        "steps": len(steps),
+        "avg_step_seconds": _mean(steps),
+        "avg_plan_maintenance_seconds": _mean(agent_state.plan_maintenance_times),
+        "pipeline_steps": PIPELINE_STEPS,
+        "prefetch_used": agent_state.prefetch_used,
+        "prefetch_discarded": agent_state.prefetch_discarded,
+    }
+
+
 class DiscoveryEvalClient(EvalClient[DiscoveryChallengeURL]):
     async def check_completion(
         self, 
@@ -83,6 +107,7 @@ class DiscoveryEvalClient(EvalClient[DiscoveryChallengeURL]):
         unique_subpages = list(set(page[2] for page in self._agent_state.subpages))
         logger.info(f"[EVAL]: Unique pages visited: {len(unique_pages)} -> {unique_pages}")
         logger.info(f"[EVAL]: Unique subpages visited: {len(unique_subpages)} -> {unique_subpages}")
+        logger.info(f"[EVAL]: Step timings: {step_timings(self._agent_state)}")
 
     def get_agent_results(self) -> Dict:
         unique_pages = list(set(self._agent_state.pages))
@@ -98,6 +123,7 @@ class DiscoveryEvalClient(EvalClient[DiscoveryChallengeURL]):
             "unique_subpages": unique_subpages,
             "total_plans": total_plans,
             "completed_plans": completed_plans,
+            "timings": step_timings(self._agent_state),
         }
 
 # if __name__ == "__main__":
@@ -136,3 +162,5 @@ if __name__ == "__main__":
             page_max_steps=page_max_steps
         )
     )
+    # compare against a run with PLAN_MAINTENANCE_CONCURRENT=0 for the sequential baseline
+    print(f"Step timings: {results['timings']}")
@@ -0,0 +1,92 @@
+"""
+Micro-benchmark for TestPlanner on a synthetic access graph.
+
+Builds a graph with --resources ids spread over --types resource types,
+--actions templates and --users users, then times planning for the three
+ingest shapes: a known user hitting a new action, a known user touching a
+new resource, and a brand-new user.
+
+    python -m scripts.bench_authz_planner --resources 10000
+"""
+import argparse
+import logging
+import random
+import time
+
+from httplib import HTTPRequestData, ResourceLocator
+from src.llm import RequestPart
+from cnc.workers.attackers.authnz.intruder import AccessGraph, RequestTemplate, TemplateRegistry, TestPlanner
+
+
+def build(n_resources: int, n_types: int, n_actions: int, n_users: int, seed: int = 0):
+    rng = random.Random(seed)
+    graph, templates = AccessGraph(), TemplateRegistry()
+    for a in range(n_actions):
+        type_name = f"type{a % n_types}"
+        templates.add(
+            f"GET /{type_name}/{{id}}/action{a}",
+            RequestTemplate(
+                HTTPRequestData(method="GET", url=f"http://bench/{type_name}/0/action{a}", headers={}),
+                [ResourceLocator(id="0", request_part=RequestPart.URL, type_name=type_name)],
+            ),
+        )
+    for i in range(n_resources):
+        u = rng.randrange(n_users)
+        graph.record(
+            user=f"user{u}:role{u % 3}",
+            role=f"role{u % 3}",
+            type_name=f"type{i % n_types}",
+            resource_id=str(i),
+        )
+    return graph, templates
+
+
+def timed(planner: TestPlanner, **kwargs):
+    start = time.perf_counter()
+    n = sum(1 for _ in planner.schedule_from_ingest(**kwargs))
+    return n, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resources", type=int, default=10_000)
+    parser.add_argument("--types", type=int, default=50)
+    parser.add_argument("--actions", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    start = time.perf_counter()
+    graph, templates = build(args.resources, args.types, args.actions, args.users)
+    print(
+        f"graph: {args.resources} resources, {args.types} types, {args.actions} actions, "
+        f"{args.users} users (built in {time.perf_counter() - start:.2f}s)"
+    )
+    planner = TestPlanner(graph, templates)
+
+    cases = [
+        ("new action", dict(
+            new_username="user0", new_role="role0", new_resources=[("", "")],
+            new_action="GET /fresh", is_new_user=False,
+        )),
+        ("new resource", dict(
+            new_username="user1", new_role="role1", new_resources=[("type3", "new-id")],
+            new_action="GET /type3/{id}/action3", is_new_user=False,
+        )),
+        ("new user", dict(
+            new_username="newbie", new_role="role2", new_resources=[("", "")],
+            new_action="GET /type0/{id}/action0", is_new_user=True,
+        )),
+        ("new user (replay)", dict(
+            new_username="newbie", new_role="role2", new_resources=[("", "")],
+            new_action="GET /type0/{id}/action0", is_new_user=True,
+        )),
+    ]
+    for name, kwargs in cases:
+        n, elapsed = timed(planner, **kwargs)
+        per = f"{elapsed / n * 1e6:.1f}us/attack" if n else "-"
+        print(f"{name:<18} attacks={n:<6} {elapsed * 1e3:8.2f}ms  {per}")
+
+
+if __name__ == "__main__":
+    main()
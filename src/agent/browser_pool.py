@@ -0,0 +1,221 @@
+"""
+Warm Chromium processes shared by agent harnesses.
+
+Browsers are launched concurrently, once per launch configuration, and stay
+up between runs. Each agent gets its own BrowserContext on one of them, so
+cookies, storage and permissions stay isolated while the process cold start
+is paid once. A context acquired under an explicit per-principal key is
+kept idle when released and handed back to the next acquire with the same
+key, i.e. the same principal gets its storage back and no other agent ever
+sees it. Contexts acquired without a key, or with a storage_state to start
+from, are never reused.
+"""
+import asyncio
+import json
+import os
+import signal
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# warm browser processes per launch configuration
+BROWSER_POOL_SIZE = int(os.environ.get("BROWSER_POOL_SIZE", "2"))
+# released contexts kept for recycling, across all keys
+BROWSER_POOL_IDLE_CONTEXTS = int(os.environ.get("BROWSER_POOL_IDLE_CONTEXTS", "16"))
+
+Launcher = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+def launch_kwargs(profile: Any) -> Dict[str, Any]:
+    return profile.kwargs_for_launch().model_dump()
+
+
+def context_kwargs(profile: Any) -> Dict[str, Any]:
+    return profile.kwargs_for_new_context().model_dump()
+
+
+def _config_key(kwargs: Dict[str, Any]) -> str:
+    return json.dumps(kwargs, sort_keys=True, default=str)
+
+
+def _driver_pid(manager: Any) -> Optional[int]:
+    """Pid of the playwright driver process, to stop it once its event loop is gone."""
+    transport = getattr(getattr(manager, "_connection", None), "_transport", None)
+    return getattr(getattr(transport, "_proc", None), "pid", None)
+
+
+@dataclass
+class PooledContext:
+    key: Optional[str]
+    config: str
+    browser: Any
+    context: Any
+    uses: int = 1
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        max_idle: int = BROWSER_POOL_IDLE_CONTEXTS,
+        launcher: Optional[Launcher] = None,
+    ):
+        self.size = max(size, 1)
+        self.max_idle = max_idle
+        self._launcher = launcher
+        self._playwright = None
+        self._browsers: Dict[str, List[Any]] = {}
+        self._in_use: Counter = Counter()
+        self._idle: "OrderedDict[Tuple[str, str], PooledContext]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._driver_pid: Optional[int] = None
+        self.launched = 0
+        self.recycled = 0
+
+    def _bind_loop(self) -> None:
+        # playwright objects only work on the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._loop is not None:
+                logger.info("Event loop changed, closing browsers launched on the previous one")
+                self._close_detached(self._loop)
+            self._playwright, self._driver_pid = None, None
+            self._browsers, self._in_use, self._idle = {}, Counter(), OrderedDict()
+            self._lock = asyncio.Lock()
+            self._loop = loop
+
+    async def _launch(self, kwargs: Dict[str, Any]) -> Any:
+        if self._launcher is not None:
+            return await self._launcher(kwargs)
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            manager = async_playwright()
+            self._playwright = await manager.start()
+            self._driver_pid = _driver_pid(manager)
+        return await self._playwright.chromium.launch(**kwargs)
+
+    async def start(self, profile: Any) -> List[Any]:
+        """Warm browsers for `profile`'s launch configuration, launching the missing ones concurrently."""
+        self._bind_loop()
+        kwargs = launch_kwargs(profile)
+        config = _config_key(kwargs)
+        async with self._lock:
+            alive = [b for b in self._browsers.get(config, []) if b.is_connected()]
+            missing = self.size - len(alive)
+            if missing > 0:
+                logger.info("Launching %d browsers", missing)
+                alive += await asyncio.gather(*(self._launch(kwargs) for _ in range(missing)))
+                self.launched += missing
+            self._browsers[config] = alive
+            return alive
+
+    async def acquire(
+        self, profile: Any, key: Optional[str] = None, storage_state: Optional[Any] = None
+    ) -> PooledContext:
+        """
+        A context for principal `key`: its idle one from an earlier run, else
+        a fresh one on the least busy browser. A given `storage_state` always
+        gets a fresh context.
+        """
+        self._bind_loop()
+        config = _config_key(launch_kwargs(profile))
+        lease = self._idle.pop((config, key), None) if key is not None else None
+        if lease is not None and storage_state is not None:
+            await self._close_context(lease)
+            lease = None
+        if lease is not None and lease.browser.is_connected():
+            lease.uses += 1
+            self._in_use[lease.browser] += 1
+            self.recycled += 1
+            return lease
+
+        browsers = await self.start(profile)
+        browser = min(browsers, key=lambda b: self._in_use[b])
+        self._in_use[browser] += 1
+        kwargs = context_kwargs(profile)
+        if storage_state is not None:
+            kwargs["storage_state"] = storage_state
+        try:
+            context = await browser.new_context(**kwargs)
+        except Exception:
+            self._in_use[browser] -= 1
+            raise
+        return PooledContext(key=key, config=config, browser=browser, context=context)
+
+    async def release(self, lease: PooledContext, recycle: bool = True) -> None:
+        self._in_use[lease.browser] -= 1
+        if not recycle or lease.key is None or not lease.browser.is_connected():
+            await self._close_context(lease)
+            return
+        for page in list(lease.context.pages):
+            await page.close()
+        stale = self._idle.pop((lease.config, lease.key), None)
+        if stale is not None:
+            await self._close_context(stale)
+        self._idle[(lease.config, lease.key)] = lease
+        while len(self._idle) > self.max_idle:
+            _, evicted = self._idle.popitem(last=False)
+            await self._close_context(evicted)
+
+    async def _close_context(self, lease: PooledContext) -> None:
+        try:
+            await lease.context.close()
+        except Exception as e:
+            logger.debug("Closing browser context failed: %s", e)
+
+    async def _shutdown(self, idle: List[PooledContext], browsers: List[Any], playwright: Any) -> None:
+        await asyncio.gather(*(self._close_context(lease) for lease in idle))
+        await asyncio.gather(*(b.close() for b in browsers), return_exceptions=True)
+        if playwright is not None:
+            await playwright.stop()
+
+    def _detach(self) -> Tuple[List[PooledContext], List[Any], Any]:
+        idle, self._idle = list(self._idle.values()), OrderedDict()
+        browsers = [b for bs in self._browsers.values() for b in bs]
+        playwright, self._browsers, self._playwright = self._playwright, {}, None
+        return idle, browsers, playwright
+
+    def _close_detached(self, old_loop: asyncio.AbstractEventLoop) -> None:
+        """Close what was launched on `old_loop`, which may already be gone."""
+        driver_pid = self._driver_pid
+        idle, browsers, playwright = self._detach()
+        if old_loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(idle, browsers, playwright), old_loop)
+        elif driver_pid is not None:
+            # nothing can be awaited on a closed loop; the driver closes its browsers on SIGTERM
+            try:
+                os.kill(driver_pid, signal.SIGTERM)
+            except OSError as e:
+                logger.debug("Stopping the playwright driver failed: %s", e)
+        elif browsers:
+            logger.warning("%d browsers were launched on a closed event loop and can't be closed", len(browsers))
+
+    async def close(self) -> None:
+        """Close every idle context and browser; contexts still leased die with their browser."""
+        self._driver_pid = None
+        await self._shutdown(*self._detach())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "browsers": sum(len(bs) for bs in self._browsers.values()),
+            "launched": self.launched,
+            "in_use": sum(self._in_use.values()),
+            "idle": len(self._idle),
+            "recycled": self.recycled,
+        }
+
+
+_shared: Optional[BrowserPool] = None
+
+
+def shared_browser_pool() -> BrowserPool:
+    """Process-wide pool, so consecutive harness runs reuse warm browsers."""
+    global _shared
+    if _shared is None:
+        _shared = BrowserPool()
+    return _shared
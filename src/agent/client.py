@@ -141,4 +141,23 @@ class AgentClient:
         Raises:
             httpx.HTTPStatusError: If the server returns an error response
         """
-        asyncio.create_task(self.push_messages(app_id, agent_id, messages, browser_actions))
\ No newline at end of file
+        asyncio.create_task(self.push_messages(app_id, agent_id, messages, browser_actions))
+    async def frontier_request(self, app_id: UUID, op: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Call one of the exploration frontier operations of an application
+        (pages, claim, renew, visit, complete, release, reset).
+        
+        Raises:
+            httpx.HTTPStatusError: If the server returns an error response
+        """
+        path = f"/application/{app_id}/frontier/{op}"
+        response = await self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_frontier_stats(self, app_id: UUID) -> Dict[str, Any]:
+        """Exploration coverage of an application, overall and per agent-hour."""
+        path = f"/application/{app_id}/frontier/stats"
+        response = await self.client.get(path)
+        response.raise_for_status()
+        return response.json()
@@ -66,15 +66,19 @@ from pentest_bot.agent.logger import setup_agent_logger
 from common.agent import BrowserActions
 from .custom_views import CustomAgentOutput
 from .custom_message_manager import CustomMessageManager, CustomMessageManagerSettings
+from .token_budget import HistoryOverBudget
 from .custom_views import CustomAgentStepInfo, CustomAgentState
 from .http_handler import HTTPHistory, HTTPHandler
 from .logger import AgentLogger
+from .page_index import PageIndex
+from .page_state import PageRenderer
+from .prefetch import PIPELINE_STEPS, Prefetch, dom_mutations, wait_dom_stable, watch_dom
+from .plan_cache import PlanCache, app_scope, apply_additions, page_fingerprint, shared_plan_cache
+from .frontier import claim_next
 from .discovery import (
     update_plan, 
     generate_plan, 
-    determine_new_page,
-    check_plan_completion,
-    deduplicate_plan,
+    maintain_plan,
     DEDUP_AFTER_STEPS,
     NewPageStatus, 
     NavigationPage,
@@ -206,6 +210,9 @@ class CustomAgent(Agent):
         eval_client: Optional[EvalClient] = None,
         app_id: Optional[str] = None,
         close_browser: bool = False,
+        plan_cache: Optional[PlanCache] = None,
+        pipeline_steps: bool = PIPELINE_STEPS,
+        frontier: Optional[Any] = None,
     ):
         if not http_handler:
             raise Exception("Must initialize CustomAgent with HTTPHandler")
@@ -248,6 +255,18 @@ class CustomAgent(Agent):
         
         self.homepage_url = ""
         self.homepage_contents = ""
+        # similarity index over self.state.subpages, synced on every lookup
+        self.page_index = PageIndex()
+        self.page_renderer = PageRenderer(self.settings.include_attributes)
+        self.plan_cache = plan_cache or shared_plan_cache()
+        # capture the next state and plan while the HTTP flush settles
+        self.pipeline_steps = pipeline_steps
+        self._prefetch: Optional[Prefetch] = None
+        # exploration frontier shared with the other agents on this app, see src/agent/frontier.py
+        self.frontier = frontier
+        self._lease_url: Optional[str] = None
+        self._lease_renewed = 0.0
+        self._shared_pages: Set[str] = set()
 
         self.http_handler = http_handler
         self.model_name = model_name
@@ -466,8 +485,14 @@ class CustomAgent(Agent):
             return self.state.task, None
 
         # this should execute *only* after we transition from NAVIGATION -> TASK_EXECUTION
+        scope = app_scope(cur_url, self.app_id)
         if not curr_plan and curr_page_contents:
-            curr_plan = generate_plan(self.llm, curr_page_contents)
+            curr_plan = await asyncio.to_thread(self.plan_cache.get_plan, scope, curr_page_contents)
+            if curr_plan:
+                self.agent_log(f"[PLAN] Reusing cached plan for {cur_url}")
+            else:
+                curr_plan = await asyncio.to_thread(generate_plan, self.llm, curr_page_contents)
+                await asyncio.to_thread(self.plan_cache.put_plan, scope, curr_page_contents, curr_plan)
             self.state.plan = curr_plan
             new_task = PLANNING_TASK_TEMPLATE.format(plan=curr_plan)
 
@@ -481,30 +506,23 @@ class CustomAgent(Agent):
         
         self.agent_log(f"[SUBPAGES]: {[page[2] for page in self.state.subpages]}")
 
-        # TODO: parallelize these two
-        curr_plan = check_plan_completion(
-            self.llm, 
-            curr_plan, 
-            prev_page_contents, 
-            curr_page_contents, 
-            prev_goal
+        maintenance_start = time.perf_counter()
+        curr_plan, nav_page = await maintain_plan(
+            self.llm,
+            curr_plan,
+            curr_page_contents=curr_page_contents,
+            prev_page_contents=prev_page_contents,
+            curr_url=cur_url,
+            prev_url=prev_url,
+            prev_goal=prev_goal,
+            subpages=self.state.subpages,
+            homepage_url=self.homepage_url,
+            homepage_contents=self.homepage_contents,
+            dedup=step_number > 1 and step_number % DEDUP_AFTER_STEPS == 0,
+            page_index=self.page_index,
         )
-
-        if step_number > 1 and step_number % DEDUP_AFTER_STEPS == 0:
-            curr_plan = deduplicate_plan(self.llm, curr_plan)
-
         self.state.plan = curr_plan
-        nav_page = determine_new_page(
-            self.llm, 
-            curr_page_contents, 
-            prev_page_contents, 
-            cur_url, 
-            prev_url, 
-            prev_goal, 
-            self.state.subpages,
-            self.homepage_contents,
-            self.homepage_url
-        )
+        self.state.plan_maintenance_times.append(time.perf_counter() - maintenance_start)
 
         # TODO: we need to be careful to check that the last plan is not a back navigation task
         if nav_page.page_type == NewPageStatus.NEW_PAGE:
@@ -524,9 +542,24 @@ class CustomAgent(Agent):
             # TODO: compare to naive results
             # TODO: explicitly tell it to use nested subplan structure
             # TODO: tell it to not to refer to interactive elements by their index
-            curr_plan = update_plan(
-                self.llm, curr_page_contents, prev_page_contents, curr_plan, eval_prev_goal
+            additions = await asyncio.to_thread(
+                self.plan_cache.get_additions, scope, prev_page_contents, curr_page_contents
             )
+            if additions is not None:
+                curr_plan = apply_additions(curr_plan, additions)
+                self.agent_log(f"[PLAN] Reusing {len(additions)} cached plan additions for {cur_url}")
+            else:
+                known = {item.id for item in curr_plan.plan_items}
+                curr_plan = await asyncio.to_thread(
+                    update_plan, self.llm, curr_page_contents, prev_page_contents, curr_plan, eval_prev_goal
+                )
+                await asyncio.to_thread(
+                    self.plan_cache.put_additions,
+                    scope,
+                    prev_page_contents,
+                    curr_page_contents,
+                    [item.plan for item in curr_plan.plan_items if item.id not in known],
+                )
             self.state.plan = curr_plan
             new_task = PLANNING_TASK_TEMPLATE.format(plan=curr_plan)
             self.state.subpages.append((cur_url, curr_page_contents, nav_page.name))
@@ -538,20 +571,27 @@ class CustomAgent(Agent):
             # return the old task
             return self.state.task, None
 
-    def handle_nav_mode_start(self):
+    async def handle_nav_mode_start(self):
         """Handles when agent first navigates to a page"""
         if not self.mode == AgentMode.NAVIGATION:
             return
 
-        if not self.state.pages:
-            raise EarlyShutdown(f"No pages left to navigate to")
-
-        next_page = self.state.pages.pop()
+        if self.frontier is not None:
+            await self._sync_frontier()
+            next_page = await claim_next(self.frontier, self.state.agent_id)
+            if not next_page:
+                raise EarlyShutdown(f"No pages left to navigate to")
+            self._lease_url = next_page
+            self._lease_renewed = time.time()
+        else:
+            if not self.state.pages:
+                raise EarlyShutdown(f"No pages left to navigate to")
+            next_page = self.state.pages.pop()
         self.agent_log(f"Navigating to new page: {next_page}")
         self.homepage_url = next_page
         self.state.task = NAVIGATE_TO_PAGE_PROMPT.format(url=self.homepage_url)
     
-    def handle_nav_mode_end(self, curr_url: str, step_info: CustomAgentStepInfo):
+    async def handle_nav_mode_end(self, curr_url: str, step_info: CustomAgentStepInfo):
         """Handles when agent finishes navigating to a page"""
         if not self.mode == AgentMode.NAVIGATION:
             return
@@ -570,12 +610,122 @@ class CustomAgent(Agent):
         # if curr_url != self.homepage_url:
         #     raise NavigationException(f"Failed to navigate to {self.homepage_url}")
 
+        if self._lease_url and not await self.frontier.visit(
+            self.state.agent_id, self._lease_url, page_fingerprint(page_contents)
+        ):
+            self.agent_log(f"Page at {curr_url} was already explored by another agent, skipping")
+            await self._finish_lease()
+            return
+
         self.mode = AgentMode.TASK_EXECUTION
         self.homepage_url = curr_url
         self.homepage_contents = page_contents
         self.state.pages.append(curr_url)
         self.state.plan = None
 
+    # ── shared frontier ──────────────────────────────────────────────────
+    async def _sync_frontier(self) -> None:
+        """Share newly discovered pages and keep the lease on the current one alive"""
+        if self.frontier is None:
+            return
+        new_pages = [url for url in self.state.pages if url not in self._shared_pages]
+        if new_pages:
+            self._shared_pages.update(new_pages)
+            await self.frontier.add(self.state.agent_id, new_pages)
+        if self._lease_url and time.time() - self._lease_renewed > self.frontier.lease_seconds / 3:
+            if not await self.frontier.renew(self.state.agent_id, self._lease_url):
+                self.agent_log(f"Lost the lease on {self._lease_url}")
+            self._lease_renewed = time.time()
+
+    async def _finish_lease(self, explored: bool = True) -> None:
+        """Mark the leased page explored, or hand it back to the frontier"""
+        url, self._lease_url = self._lease_url, None
+        if url is None:
+            return
+        if explored:
+            await self.frontier.complete(self.state.agent_id, url)
+        else:
+            await self.frontier.release(self.state.agent_id, url)
+
+    # ── pipelined steps ──────────────────────────────────────────────────
+    def _should_prefetch(
+        self, result: List[ActionResult], replace_task: Optional[str], step_info: CustomAgentStepInfo
+    ) -> bool:
+        """Speculate only when nothing left in this step can change how the next one plans"""
+        return (
+            self.pipeline_steps
+            and self.mode == AgentMode.TASK_EXECUTION
+            and not replace_task
+            and step_info.page_steps <= self.page_max_steps
+            and not (result and result[-1].is_done)
+        )
+
+    def _start_prefetch(self, step_number: int) -> None:
+        snapshot = {
+            "plan": self.state.plan.model_copy(deep=True) if self.state.plan else None,
+            "pages": list(self.state.pages),
+            "subpages": list(self.state.subpages),
+            "plan_maintenance_times": len(self.state.plan_maintenance_times),
+            "homepage_url": self.homepage_url,
+            "homepage_contents": self.homepage_contents,
+        }
+        prefetch = Prefetch(step_number=step_number, task=None, snapshot=snapshot)
+        prefetch.task = asyncio.create_task(self._run_prefetch(prefetch))
+        self._prefetch = prefetch
+
+    async def _run_prefetch(self, prefetch: Prefetch):
+        page = await self.browser_session.get_current_page()
+        if not await watch_dom(page) or not await wait_dom_stable(page):
+            return None
+        state = await self.browser_session.get_state_summary(cache_clickable_elements_hashes=False)
+        prefetch.page, prefetch.url = page, page.url
+        # highlighting during capture mutates the DOM too, so count from here
+        prefetch.mutations = await dom_mutations(page)
+        page_contents = self.page_renderer.render(state.element_tree)
+        plan_update = await self.create_or_update_plan(page_contents, page.url, prefetch.step_number)
+        return state, page_contents, page.url, plan_update
+
+    def _discard_prefetch(self) -> None:
+        prefetch, self._prefetch = self._prefetch, None
+        if prefetch is None:
+            return
+        if prefetch.task.done() and not prefetch.task.cancelled():
+            prefetch.task.exception()
+        prefetch.task.cancel()
+        snapshot = prefetch.snapshot
+        self.state.plan = snapshot["plan"]
+        self.state.pages = snapshot["pages"]
+        self.state.subpages = snapshot["subpages"]
+        del self.state.plan_maintenance_times[snapshot["plan_maintenance_times"]:]
+        self.homepage_url = snapshot["homepage_url"]
+        self.homepage_contents = snapshot["homepage_contents"]
+        self.state.prefetch_discarded += 1
+
+    async def _take_prefetch(self, step_number: int):
+        """The speculative (state, page_contents, url, plan update) for this step, if the page is unchanged"""
+        prefetch = self._prefetch
+        if prefetch is None:
+            return None
+        page = await self.browser_session.get_current_page()
+        # state already captured and the page changed since: don't wait for the plan calls
+        if prefetch.step_number != step_number or (
+            prefetch.mutations >= 0 and not await prefetch.still_valid(page)
+        ):
+            self.agent_log("[PREFETCH] Page changed after capture, discarding the speculative step")
+            self._discard_prefetch()
+            return None
+        try:
+            prefetched = await prefetch.task
+        except Exception as e:
+            self.agent_log(f"[PREFETCH] Speculative step failed, redoing it: {e}")
+            prefetched = None
+        if prefetched is None or not await prefetch.still_valid(page):
+            self._discard_prefetch()
+            return None
+        self._prefetch = None
+        self.state.prefetch_used += 1
+        return prefetched
+
     @time_execution_async("--step")
     async def step(self, step_info: Optional[CustomAgentStepInfo] = None) -> bool:
         """Execute one step of the task"""
@@ -591,20 +741,25 @@ class CustomAgent(Agent):
         try:
             # NOTE: this is state of the playwright browser, not to be confused with self.state
             # which represents state of the agent
-            state = await self.browser_session.get_state_summary(cache_clickable_elements_hashes=False)
-            page_contents = state.element_tree.clickable_elements_to_string(include_attributes=self.settings.include_attributes)
-            curr_url = (await self.browser_session.get_current_page()).url
+            prefetched = await self._take_prefetch(step_info.step_number)
+            if prefetched:
+                state, page_contents, curr_url, (new_task, replace_task) = prefetched
+            else:
+                state = await self.browser_session.get_state_summary(cache_clickable_elements_hashes=False)
+                page_contents = self.page_renderer.render(state.element_tree)
+                curr_url = (await self.browser_session.get_current_page()).url
             browser_actions = BrowserActions()
 
             await self._raise_if_stopped_or_paused()
 
-            self.handle_nav_mode_start()
+            if not prefetched:
+                await self.handle_nav_mode_start()
 
-            new_task, replace_task = await self.create_or_update_plan(
-                page_contents,
-                curr_url,
-                step_info.step_number
-            )
+                new_task, replace_task = await self.create_or_update_plan(
+                    page_contents,
+                    curr_url,
+                    step_info.step_number
+                )
             self.state.task = new_task
             self.agent_log(f"[PLAN] New task: {self.state.plan}")
 
@@ -616,7 +771,13 @@ class CustomAgent(Agent):
                 self.state.task,
                 step_info=step_info,
                 use_vision=self.settings.use_vision,
+                elements_text=page_contents,
             )
+            try:
+                self._message_manager.fit_to_budget()
+            except ValueError:
+                self._message_manager._remove_last_state_message()
+                raise
             input_messages = self._message_manager.get_messages()
             tokens = self._message_manager.state.history.current_tokens
             try:
@@ -642,6 +803,19 @@ class CustomAgent(Agent):
 
             new_url = (await self.browser_session.get_current_page()).url
             result: list[ActionResult] = await self.multi_act(model_output.action)
+            update_args = (
+                result,
+                model_output,
+                step_info,
+                page_contents,
+                new_url,
+                model_output.current_state.next_goal,
+            )
+            prefetching = self._should_prefetch(result, replace_task, step_info)
+            if prefetching:
+                # the next plan depends on this step's outcome, not on its traffic
+                self._update_state(*update_args)
+                self._start_prefetch(step_info.step_number)
             http_msgs = await self.http_handler.flush()
             self.step_http_msgs = self.http_history.filter_http_messages(http_msgs)
             browser_actions = BrowserActions(
@@ -652,14 +826,8 @@ class CustomAgent(Agent):
             if self.agent_client:
                 await self._update_server(self.step_http_msgs, browser_actions)
                 
-            self._update_state(
-                result, 
-                model_output, 
-                step_info, 
-                page_contents, 
-                new_url, 
-                model_output.current_state.next_goal
-            )
+            if not prefetching:
+                self._update_state(*update_args)
             self._log_response(
                 self.step_http_msgs,
                 current_msg=input_messages[-1],
@@ -667,7 +835,7 @@ class CustomAgent(Agent):
                 curr_goal=self.state.prev_goal,
                 curr_url=new_url,
             )
-            self.handle_nav_mode_end(new_url, step_info)
+            await self.handle_nav_mode_end(new_url, step_info)
 
             # Match reference pattern for completion logging
             if len(result) > 0 and result[-1].is_done:
@@ -690,8 +858,11 @@ class CustomAgent(Agent):
 
             if step_info.page_steps > self.page_max_steps:
                 self.mode = AgentMode.NAVIGATION
+                await self._finish_lease()
+            await self._sync_frontier()
 
         except (InterruptedError, EarlyShutdown):
+            self._discard_prefetch()
             self.agent_log("Shutdown called by agent")
             self.state.last_result = [
                 ActionResult(
@@ -703,8 +874,12 @@ class CustomAgent(Agent):
             return early_shutdown
         
         except NavigationException as e:
+            self._discard_prefetch()
             self.agent_log(f"Navigation failed: {e}")
-            self.state.pages.insert(0, self.homepage_url)
+            if self._lease_url:
+                await self._finish_lease(explored=False)
+            else:
+                self.state.pages.insert(0, self.homepage_url)
             self.state.task = None
 
             self.homepage_url = ""
@@ -713,6 +888,7 @@ class CustomAgent(Agent):
             self.state.last_result = result
 
         except Exception as e:
+            self._discard_prefetch()
             # Match reference pattern - handle step errors
             logger.error(f"Error in step {self.state.n_steps}: {e}")
             logger.error(traceback.format_exc())
@@ -750,15 +926,18 @@ class CustomAgent(Agent):
 
         if isinstance(error, (ValidationError, ValueError, NavigationException)):
             self.full_log(f"{prefix}{error_msg}")
-            if "Max token limit reached" in error_msg:
-                # cut tokens from history
+            if isinstance(error, HistoryOverBudget):
+                # refused locally before sending: a smaller budget can't make it fit
+                self.full_log("History does not fit the token budget even after trimming")
+            elif "Max token limit reached" in error_msg:
+                # the provider counts differently than our tokenizer: tighten the
+                # budget, the next step trims the history to it
                 self._message_manager.settings.max_input_tokens = (
-                    self.settings.max_input_tokens - 500
+                    self._message_manager.settings.max_input_tokens - 500
                 )
                 self.full_log(
-                    f"Cutting tokens from history - new max input tokens: {self._message_manager.settings.max_input_tokens}"
+                    f"Tightened the token budget - new max input tokens: {self._message_manager.settings.max_input_tokens}"
                 )
-                self._message_manager.cut_messages()
             elif "Could not parse response" in error_msg:
                 # give model a hint how output should look like
                 error_msg += "\n\nReturn a valid JSON object with the required fields."
@@ -849,6 +1028,11 @@ class CustomAgent(Agent):
             return
 
         self.agent_log(f"Initiating premature shutdown: {reason}")
+        self._discard_prefetch()
+        try:
+            await self._finish_lease(explored=False)
+        except Exception as e:
+            self.agent_log(f"Failed to hand back the leased page: {e}")
         # Ensure state has 'stopped' attribute before setting
         if hasattr(self.state, "stopped"):
             self.state.stopped = True
@@ -9,6 +9,7 @@ from browser_use.browser.views import BrowserStateSummary
 from browser_use.agent.message_manager.service import MessageManagerSettings
 from browser_use.agent.views import ActionResult, MessageManagerState
 from langchain_core.messages import (
+    BaseMessage,
     HumanMessage,
     SystemMessage
 )
@@ -17,12 +18,15 @@ from httplib import HTTPMessage
 from .custom_prompts import CustomAgentMessagePrompt
 from .custom_views import CustomAgentStepInfo
 from .custom_prompts import CustomAgentMessagePrompt
+from .token_budget import TOKEN_ENCODING, TOKEN_OUTPUT_RESERVE, FitResult, TokenCounter, fit_history
 
 logger = logging.getLogger(__name__)
 
 
 class CustomMessageManagerSettings(MessageManagerSettings):
     agent_prompt_class: Type[CustomAgentMessagePrompt] = CustomAgentMessagePrompt
+    token_encoding: str = TOKEN_ENCODING
+    output_reserve_tokens: int = TOKEN_OUTPUT_RESERVE
 
 class CustomMessageManager(MessageManager):
     def __init__(
@@ -32,6 +36,12 @@ class CustomMessageManager(MessageManager):
             settings: CustomMessageManagerSettings = CustomMessageManagerSettings(),
             state: MessageManagerState = MessageManagerState(),
     ):
+        # needed by _init_messages, which runs inside super().__init__
+        self.token_counter = TokenCounter(
+            settings.token_encoding,
+            chars_per_token=settings.estimated_characters_per_token,
+            image_tokens=settings.image_tokens,
+        )
         super().__init__(
             task=task,
             system_message=system_message,
@@ -61,14 +71,27 @@ class CustomMessageManager(MessageManager):
             context_message = HumanMessage(content=self.context_content)
             self._add_message_with_tokens(context_message)
 
+    def _count_tokens(self, message: BaseMessage) -> int:
+        return self.token_counter.count_message(message)
+
+    @property
+    def input_token_limit(self) -> int:
+        return max(self.settings.max_input_tokens - self.settings.output_reserve_tokens, 0)
+
+    def fit_to_budget(self) -> FitResult:
+        """Trim the history to the input budget; raises if it cannot fit"""
+        min_message_len = 2 if self.context_content else 1
+        result = fit_history(self.state.history, self.input_token_limit, min_message_len, self.token_counter)
+        if result.changed:
+            logger.info(
+                f"Trimmed history to {self.state.history.current_tokens}/{self.input_token_limit} tokens: "
+                f"{result.dropped} messages summarized, {result.truncated} tokens cut from the state message"
+            )
+        return result
+
     def cut_messages(self):
         """Get current message list, potentially trimmed to max tokens"""
-        diff = self.state.history.current_tokens - self.settings.max_input_tokens
-        min_message_len = 2 if self.context_content is not None else 1
-
-        while diff > 0 and len(self.state.history.messages) > min_message_len:
-            self.state.history.remove_message(min_message_len)  # always remove the oldest message
-            diff = self.state.history.current_tokens - self.settings.max_input_tokens
+        self.fit_to_budget()
 
     def add_state_message(
             self,
@@ -79,6 +102,7 @@ class CustomMessageManager(MessageManager):
             task: str,
             step_info: Optional[CustomAgentStepInfo] = None,
             use_vision=True,
+            elements_text: Optional[str] = None,
     ) -> None:
         """Add browser state as human message"""
         # otherwise add state message and result to next message (which will not stay in memory)
@@ -90,6 +114,7 @@ class CustomMessageManager(MessageManager):
             http_msgs,
             task,
             step_info,
+            elements_text=elements_text,
         ).get_user_message(use_vision)
         self._add_message_with_tokens(state_message)
 
@@ -35,6 +35,7 @@ class CustomAgentMessagePrompt(AgentMessagePrompt):
             http_msgs: List[HTTPMessage],
             task: str,
             step_info: Optional[CustomAgentStepInfo],
+            elements_text: Optional[str] = None,
     ):
         super(CustomAgentMessagePrompt, self).__init__(browser_state_summary=browser_state_summary,
                                                        result=result,
@@ -43,6 +44,8 @@ class CustomAgentMessagePrompt(AgentMessagePrompt):
         self.actions = actions
         self.http_msgs = http_msgs
         self.task = task
+        # already rendered by the agent this step
+        self.elements_text = elements_text
 
     def get_user_message(self, use_vision: bool = True) -> HumanMessage:
         if self.step_info:
@@ -53,7 +56,9 @@ class CustomAgentMessagePrompt(AgentMessagePrompt):
         time_str = datetime.now().strftime("%Y-%m-%d %H:%M")
         step_info_description += f"Current date and time: {time_str}"
 
-        elements_text = self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
+        elements_text = self.elements_text
+        if elements_text is None:
+            elements_text = self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
 
         has_content_above = (self.state.pixels_above or 0) > 0
         has_content_below = (self.state.pixels_below or 0) > 0
@@ -70,6 +70,11 @@ class CustomAgentState(BaseModel):
     # navigation
     pages: List[str] = Field(default_factory=list)
     subpages: List[str] = Field(default_factory=list)
+    # wall-clock seconds spent in plan maintenance, one entry per step
+    plan_maintenance_times: List[float] = Field(default_factory=list)
+    # pipelined steps whose speculative state and plan were used / thrown away
+    prefetch_used: int = 0
+    prefetch_discarded: int = 0
 
     agent_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     n_steps: int = 1
@@ -1,7 +1,9 @@
 import enum
 import json
-import difflib
+import os
 import uuid
+import asyncio
+import functools
 from typing import List, Dict, ClassVar, Optional, Tuple
 from abc import ABC, abstractmethod
 
@@ -12,6 +14,8 @@ from browser_use.controller.registry.views import ActionModel
 from browser_use.agent.views import ActionResult
 
 from src.utils import dump_llm_messages_pretty, retry_sync, EarlyShutdown
+from src.agent.page_index import PAGE_NEW_THRESHOLD, PAGE_SAME_THRESHOLD, PageIndex
+from src.agent.page_state import describe_current_page
 
 from pentest_bot.agent.logger import AgentLogLevels
 from logging import getLogger
@@ -19,6 +23,9 @@ from logging import getLogger
 full_logger = getLogger(AgentLogLevels.FULL_REQUESTS)
 agent_logger = getLogger(AgentLogLevels.AGENT)
 
+# set to 0 to run the plan maintenance calls one after another, e.g. to time the difference
+PLAN_MAINTENANCE_CONCURRENT = os.environ.get("PLAN_MAINTENANCE_CONCURRENT", "1").lower() in ("1", "true", "yes")
+
 UNDO_NAVIGATION_TASK_TEMPLATE = """
 You have successfully visited the new page
 
@@ -265,8 +272,7 @@ Here are some requirements for updating plans:
 Here is the previous page:
 {prev_page_contents}
 
-Here is the current page:
-{curr_page_contents}
+{describe_current_page(prev_page_contents, curr_page_contents)}
 
 Here are the actions to affect this change:
 {eval_prev_goal}
@@ -331,26 +337,45 @@ def determine_new_page(
 	subpages: List[Tuple[str, str, str]],
 	homepage_url: str,
 	homepage_contents: str,
+	page_index: Optional[PageIndex] = None,
 ) -> NavigationPage:
+	"""
+	Classify the current page against the previous one. Near-certain cases
+	are decided from element-set similarity; only the rest go to the LLM.
+	Pass a long-lived `page_index` to avoid re-sketching `subpages` each call.
+	"""
 	if curr_page_contents == prev_page_contents:
 		return NavigationPage(page_type=NewPageStatus.SAME_PAGE, name="")
 
 	# Check previously seen subpages
-	highest_match = 0.0
-	matched_subpage = None
-	for url, page_contents, name in subpages:
-		if curr_url != url:
-			continue
-		matcher = difflib.SequenceMatcher(None, curr_page_contents, page_contents)
-		ratio = matcher.ratio()
-		if ratio > highest_match:
-			highest_match = ratio
-			matched_subpage = name
-
-	if highest_match > 0.9:
-		full_logger.info(f"Found match for {curr_url} in existing subpage {matched_subpage}")
+	index = page_index if page_index is not None else PageIndex()
+	index.sync(subpages)
+	match = index.query(curr_url, curr_page_contents)
+	if match:
+		matched_subpage, score = match
+		full_logger.info(f"Found match for {curr_url} in existing subpage {matched_subpage} ({score:.2f})")
 		return NavigationPage(page_type=NewPageStatus.UPDATED_PAGE, name=matched_subpage)
 
+	# nothing new on the same url, e.g. elements scrolled away; a popup adds
+	# elements however small it is, so that is left to the LLM
+	if (
+		curr_url == prev_url
+		and not index.added(curr_page_contents, prev_page_contents)
+		and index.similarity(curr_page_contents, prev_page_contents) >= PAGE_SAME_THRESHOLD
+	):
+		return NavigationPage(page_type=NewPageStatus.SAME_PAGE, name="")
+
+	if (
+		curr_url not in (prev_url, homepage_url)
+		and index.similarity(curr_page_contents, prev_page_contents) < PAGE_NEW_THRESHOLD
+		and index.similarity(curr_page_contents, homepage_contents or "") < PAGE_NEW_THRESHOLD
+	):
+		full_logger.info(f"{curr_url} shares no elements with the previous page or homepage")
+		return NavigationPage(page_type=NewPageStatus.NEW_PAGE, name="")
+
+	# the homepage is often the page we just came from; don't send it twice
+	if homepage_contents == prev_page_contents:
+		homepage_contents = "(same elements as the PREV_PAGE)"
 	NEW_PAGE_PROMPT = f"""
 You are presented with the following views from a browser
 Here is the CURR_PAGE:
@@ -406,15 +431,22 @@ class CompletePlan(BaseModel):
 		},
 	}
 
+	def apply(self, plan: "Plan") -> "Plan":
+		for idx in self.completed:
+			if 0 <= idx < len(plan.plan_items):
+				plan.plan_items[idx].completed = True
+		return plan
+
 
 @retry_sync(max_retries=3, exceptions=(Exception), exc_class=EarlyShutdown)
-def check_plan_completion(
+def get_plan_completions(
 	llm: BaseChatModel,
 	plan: Plan,
 	prev_page_contents: str,
 	curr_page_contents: str,
 	prev_goal: str,
-) -> Plan:
+) -> CompletePlan:
+	"""Ask which plan items the previous action completed, without touching the plan."""
 	CHECK_PLAN = """
 You are a web agent that is tasked with accomplishing some browser navigation goals
 
@@ -424,8 +456,7 @@ Here is the plan you are following:
 Here is the previous page:
 {prev_page_contents}
 
-Here is the current page:
-{curr_page_contents}
+{curr_page}
 
 Here is the action that you previously executed:
 {prev_goal}
@@ -434,7 +465,7 @@ Give your output as a list of completed plan item indices
 """.format(
 		plan=plan,
 		prev_page_contents=prev_page_contents,
-		curr_page_contents=curr_page_contents,
+		curr_page=describe_current_page(prev_page_contents, curr_page_contents),
 		prev_goal=prev_goal,
 	)
 
@@ -443,13 +474,18 @@ Give your output as a list of completed plan item indices
 	full_logger.info(f"[PROMPT CHECK PLAN]: \n{dump_llm_messages_pretty(LLM_MSGS)}")
 
 	res = llm.invoke(LLM_MSGS, response_format=CompletePlan.model_schema)
-	completed = CompletePlan(**json.loads(res.content))
+	return CompletePlan(**json.loads(res.content))
 
-	for idx in completed.completed:
-		if 0 <= idx < len(plan.plan_items):
-			plan.plan_items[idx].completed = True
 
-	return plan
+def check_plan_completion(
+	llm: BaseChatModel,
+	plan: Plan,
+	prev_page_contents: str,
+	curr_page_contents: str,
+	prev_goal: str,
+) -> Plan:
+	completed = get_plan_completions(llm, plan, prev_page_contents, curr_page_contents, prev_goal)
+	return completed.apply(plan)
 
 
 DEDUP_AFTER_STEPS = 5
@@ -465,7 +501,8 @@ def deduplicate_plan_with_messages(
 
 
 @retry_sync(max_retries=3, exceptions=(Exception, ValueError), exc_class=EarlyShutdown)
-def deduplicate_plan(llm: BaseChatModel, plan: Plan) -> Plan:
+def get_plan_duplicates(llm: BaseChatModel, plan: Plan) -> DeletePlanItemList:
+	"""Ask which plan items duplicate others, without touching the plan."""
 	PROMPT = f"""
 Here is a plan generated by a web agent:
 {plan}
@@ -477,18 +514,95 @@ Each delete operation should specify the index of the plan item to remove.
 """
 	messages = [{"role": "user", "content": PROMPT}]
 
-	agent_logger.info(f"Plan before: {len(plan.plan_items)}")
 	full_logger.info(f"[PROMPT DEDUPLICATE PLAN]: \n{dump_llm_messages_pretty(messages)}")
 
 	plan_ops = llm.invoke(messages, response_format=DeletePlanItemList.model_schema)
-	plan_ops = DeletePlanItemList(**json.loads(plan_ops.content))
+	return DeletePlanItemList(**json.loads(plan_ops.content))
+
 
+def apply_plan_duplicates(plan: Plan, plan_ops: DeletePlanItemList) -> Plan:
+	agent_logger.info(f"Plan before: {len(plan.plan_items)}")
 	agent_logger.info(f"[PLAN DEDUPLICATE] Removing {len(plan_ops.operations)} plan items")
 	for op in plan_ops.operations:
-		agent_logger.info(
-			f"[PLAN DEDUPLICATE] DeletePlanItem: {plan.plan_items[op.index].plan}"
-		)
+		if 0 <= op.index < len(plan.plan_items):
+			agent_logger.info(
+				f"[PLAN DEDUPLICATE] DeletePlanItem: {plan.plan_items[op.index].plan}"
+			)
 
 	plan_ops.apply(plan)
 	agent_logger.info(f"Plan after: {len(plan.plan_items)}")
 	return plan
+
+
+def deduplicate_plan(llm: BaseChatModel, plan: Plan) -> Plan:
+	return apply_plan_duplicates(plan, get_plan_duplicates(llm, plan))
+
+
+async def maintain_plan(
+	llm: BaseChatModel,
+	plan: Plan,
+	*,
+	curr_page_contents: str,
+	prev_page_contents: str,
+	curr_url: str,
+	prev_url: str,
+	prev_goal: str,
+	subpages: List[Tuple[str, str, str]],
+	homepage_url: str,
+	homepage_contents: str,
+	dedup: bool,
+	page_index: Optional[PageIndex] = None,
+) -> Tuple[Plan, NavigationPage]:
+	"""
+	Plan maintenance for one step: which items were completed, which are
+	duplicates (if `dedup`) and what kind of page we are on. The three LLM
+	calls only read the plan, so they run concurrently in worker threads and
+	their edits are applied afterwards; completions go first since both edits
+	refer to item indices of the unmodified plan.
+
+	A failed plan edit is logged and skipped, it does not cancel the other
+	calls. A failed page classification is raised once all calls finished.
+	"""
+	calls = [
+		functools.partial(
+			determine_new_page,
+			llm,
+			curr_page_contents,
+			prev_page_contents,
+			curr_url,
+			prev_url,
+			prev_goal,
+			subpages,
+			homepage_url,
+			homepage_contents,
+			page_index,
+		),
+		functools.partial(get_plan_completions, llm, plan, prev_page_contents, curr_page_contents, prev_goal),
+	]
+	if dedup:
+		calls.append(functools.partial(get_plan_duplicates, llm, plan))
+
+	if PLAN_MAINTENANCE_CONCURRENT:
+		results = await asyncio.gather(*(asyncio.to_thread(call) for call in calls), return_exceptions=True)
+	else:
+		results = []
+		for call in calls:
+			try:
+				results.append(call())
+			except Exception as e:
+				results.append(e)
+
+	nav_page, completed, *duplicates = results
+	if isinstance(completed, Exception):
+		agent_logger.warning(f"[PLAN] Completion check failed, plan left unchanged: {completed}")
+	else:
+		completed.apply(plan)
+	for plan_ops in duplicates:
+		if isinstance(plan_ops, Exception):
+			agent_logger.warning(f"[PLAN DEDUPLICATE] Failed, plan left unchanged: {plan_ops}")
+		else:
+			apply_plan_duplicates(plan, plan_ops)
+
+	if isinstance(nav_page, BaseException):
+		raise nav_page
+	return plan, nav_page
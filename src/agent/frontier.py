@@ -0,0 +1,101 @@
+"""
+Agent-side access to the exploration frontier of common/frontier.py.
+
+`LocalFrontier` shares one in-process `Frontier` between the agents of a
+harness; `RemoteFrontier` goes through the CNC hub, so agents in different
+processes or on different machines divide the same application. Both have
+the same async interface.
+"""
+import asyncio
+import os
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from common.frontier import FRONTIER_LEASE_SECONDS, Frontier
+from src.agent.client import AgentClient
+
+# how long an agent waits before asking again while others may still find pages
+FRONTIER_POLL = float(os.environ.get("FRONTIER_POLL", "5"))
+
+
+class LocalFrontier:
+    def __init__(self, frontier: Optional[Frontier] = None):
+        self.frontier = frontier if frontier is not None else Frontier()
+
+    async def reset(self) -> None:
+        self.frontier = Frontier(lease_seconds=self.frontier.lease_seconds, max_attempts=self.frontier.max_attempts)
+
+    @property
+    def lease_seconds(self) -> float:
+        return self.frontier.lease_seconds
+
+    async def add(self, agent_id: str, urls: Iterable[str]) -> int:
+        return self.frontier.add(agent_id, urls)
+
+    async def claim(self, agent_id: str) -> Tuple[Optional[str], bool]:
+        """The leased url, or None and whether the frontier is exhausted."""
+        url = self.frontier.claim(agent_id)
+        return url, url is None and self.frontier.exhausted()
+
+    async def renew(self, agent_id: str, url: str) -> bool:
+        return self.frontier.renew(agent_id, url)
+
+    async def visit(self, agent_id: str, url: str, fingerprint: str) -> bool:
+        return self.frontier.visit(agent_id, url, fingerprint)
+
+    async def complete(self, agent_id: str, url: str) -> None:
+        self.frontier.complete(agent_id, url)
+
+    async def release(self, agent_id: str, url: str) -> None:
+        self.frontier.release(agent_id, url)
+
+    async def stats(self) -> Dict[str, Any]:
+        return self.frontier.stats()
+
+
+class RemoteFrontier:
+    def __init__(self, agent_client: AgentClient, app_id: str, lease_seconds: float = FRONTIER_LEASE_SECONDS):
+        self.agent_client = agent_client
+        self.app_id = app_id
+        # only used to pace renewals; the hub's own setting decides expiry
+        self.lease_seconds = lease_seconds
+
+    async def _call(self, op: str, **payload: Any) -> Dict[str, Any]:
+        return await self.agent_client.frontier_request(self.app_id, op, payload)
+
+    async def reset(self) -> None:
+        """Start a new run on the hub; agents still exploring the old one lose their leases."""
+        await self._call("reset")
+
+    async def add(self, agent_id: str, urls: Iterable[str]) -> int:
+        return (await self._call("pages", agent_id=agent_id, urls=list(urls)))["added"]
+
+    async def claim(self, agent_id: str) -> Tuple[Optional[str], bool]:
+        res = await self._call("claim", agent_id=agent_id)
+        return res["url"], res["exhausted"]
+
+    async def renew(self, agent_id: str, url: str) -> bool:
+        return (await self._call("renew", agent_id=agent_id, url=url))["ok"]
+
+    async def visit(self, agent_id: str, url: str, fingerprint: str) -> bool:
+        return (await self._call("visit", agent_id=agent_id, url=url, fingerprint=fingerprint))["ok"]
+
+    async def complete(self, agent_id: str, url: str) -> None:
+        await self._call("complete", agent_id=agent_id, url=url)
+
+    async def release(self, agent_id: str, url: str) -> None:
+        await self._call("release", agent_id=agent_id, url=url)
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self.agent_client.get_frontier_stats(self.app_id)
+
+
+async def claim_next(frontier: Any, agent_id: str, poll: float = FRONTIER_POLL) -> Optional[str]:
+    """
+    Lease the next page to explore, waiting while other agents hold leases
+    that may still add pages. None once the frontier is exhausted.
+    """
+    while True:
+        url, exhausted = await frontier.claim(agent_id)
+        if url is not None or exhausted:
+            return url
+        await asyncio.sleep(poll)
@@ -8,6 +8,8 @@ from browser_use.browser.session import BrowserSession
 from src.agent.custom_agent import CustomAgent   # or wherever your agent lives
 
 from .http_handler import HTTPHandler, BAN_LIST
+from .browser_pool import BrowserPool, PooledContext, shared_browser_pool
+from .frontier import LocalFrontier, RemoteFrontier
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -28,6 +30,12 @@ class AgentLogin(BaseModel):
 class AgentHarness:
     """
     Spawns and supervises multiple CustomAgent instances, each with its own BrowserSession.
+    Sessions run on isolated contexts leased from a pool of warm browsers.
+    With `shared_frontier` the agents divide the pages to explore through one
+    frontier, kept by the CNC hub when they report to one and in-process
+    otherwise, and reset at the start of every run. Without it each agent
+    keeps its own page stack, as agents exploring the same pages as
+    different users need to.
     """     
 
     def __init__(
@@ -36,6 +44,8 @@ class AgentHarness:
         agents_config: Sequence[Dict[str, Any]],
         agent_cls: Type[CustomAgent] = CustomAgent,
         common_kwargs: Optional[Dict[str, Any]] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        shared_frontier: bool = False,
     ):
         self.browser_profile_template = browser_profile_template
         self.agent_cls = agent_cls
@@ -45,11 +55,23 @@ class AgentHarness:
         self._agents: List[CustomAgent] = []
         self._tasks: List[asyncio.Task] = []
         self.browser_sessions: List[BrowserSession] = []
+        self.browser_pool = browser_pool or shared_browser_pool()
+        self._leases: List[PooledContext] = []
         self._history: List[Dict] = []
 
         # Determine if browsers should be closed when the harness is done.
         self.close_browser_on_cleanup = self.common_kwargs.pop("close_browser", True)
 
+        # a frontier we create ourselves only lives for one run
+        self._owns_frontier = shared_frontier and "frontier" not in self.common_kwargs
+        if self._owns_frontier:
+            agent_client = self.common_kwargs.get("agent_client")
+            app_id = self.common_kwargs.get("app_id")
+            self.common_kwargs["frontier"] = (
+                RemoteFrontier(agent_client, app_id) if agent_client and app_id else LocalFrontier()
+            )
+        self.frontier = self.common_kwargs.get("frontier")
+
     # ---------- public API -------------------------------------------------
 
     async def start_all(self, max_steps: int = 100):
@@ -60,28 +82,24 @@ class AgentHarness:
         logger.info("Spawning %d agents …", len(self.agents_cfg))
         self._agents = []
         self.browser_sessions = []
+        self._leases = []
         self._tasks = []
         self._history = [] # Reset history for this run
-        
-        for raw_cfg_item in self.agents_cfg:
-            http_handler = HTTPHandler(banlist=BAN_LIST)
-
-            # Prepare BrowserProfile for this specific agent's session
-            current_agent_profile = self.browser_profile_template.model_copy()
-            # The keep_alive on the profile tells the session whether to close the browser
-            # when that specific session.stop() is called.
-            # If close_browser_on_cleanup is True for the harness, we want the browser to die with the session.
-            current_agent_profile.keep_alive = not self.close_browser_on_cleanup
-
-            # Create and start a new BrowserSession for this agent
-            session = BrowserSession(browser_profile=current_agent_profile)
-            session.http_request_handler = http_handler.handle_request
-            session.http_response_handler = http_handler.handle_response
-
-            await session.start()
+        if self._owns_frontier:
+            await self.frontier.reset()
 
-            self.browser_sessions.append(session)
+        # launch (or reuse) the browsers once, then start every session concurrently
+        await self.browser_pool.start(self.browser_profile_template)
+        started = await asyncio.gather(
+            *(self._start_session(i, cfg) for i, cfg in enumerate(self.agents_cfg)),
+            return_exceptions=True,
+        )
+        for result in started:
+            if isinstance(result, BaseException):
+                await self.kill_all(f"Browser session failed to start: {result}")
+                raise result
 
+        for raw_cfg_item, (session, http_handler) in zip(self.agents_cfg, started):
             # Prepare agent configuration
             # Start with common_kwargs, then override with agent-specific raw_cfg_item
             agent_constructor_kwargs = {**self.common_kwargs, **raw_cfg_item}
@@ -96,6 +114,8 @@ class AgentHarness:
             agent_constructor_kwargs.pop('browser_profile', None)
             agent_constructor_kwargs.pop('context_cfg', None) 
             agent_constructor_kwargs.pop('browser', None) # Ensure no old browser object is passed
+            agent_constructor_kwargs.pop('storage_state', None)
+            agent_constructor_kwargs.pop('context_key', None)
             # Add any other keys that CustomAgent should not receive when a session is provided.
 
             # Instantiate and launch the agent
@@ -109,6 +129,37 @@ class AgentHarness:
 
         return self._tasks
 
+    async def _start_session(self, idx: int, raw_cfg_item: Dict[str, Any]):
+        """
+        Start a BrowserSession on a pooled context. Only an explicit
+        per-principal `context_key` lets a later run get the context back.
+        """
+        cfg = {**self.common_kwargs, **raw_cfg_item}
+        http_handler = HTTPHandler(banlist=BAN_LIST)
+
+        # Prepare BrowserProfile for this specific agent's session
+        current_agent_profile = cfg.get('browser_profile') or self.browser_profile_template
+        current_agent_profile = current_agent_profile.model_copy()
+        # The pool owns the browser and the context: session.stop() must not close them
+        current_agent_profile.keep_alive = True
+
+        lease = await self.browser_pool.acquire(
+            current_agent_profile, cfg.get('context_key'), cfg.get('storage_state')
+        )
+        self._leases.append(lease)
+
+        session = BrowserSession(
+            browser_profile=current_agent_profile,
+            browser=lease.browser,
+            browser_context=lease.context,
+        )
+        session.http_request_handler = http_handler.handle_request
+        session.http_response_handler = http_handler.handle_response
+
+        await session.start()
+        self.browser_sessions.append(session)
+        return session, http_handler
+
     async def wait(self):
         done, _ = await asyncio.wait(self._tasks, return_when=asyncio.ALL_COMPLETED)
         for t in done:
@@ -121,6 +172,7 @@ class AgentHarness:
         created by the harness.
         """
         logger.warning("Kill‑switch activated: %s", reason)
+        had_agents = bool(self._agents)
 
         # Ask agents to shut down gracefully
         # If agent.shutdown is not async or doesn't exist, this needs adjustment.
@@ -147,11 +199,30 @@ class AgentHarness:
                     await session.stop() # session.stop() respects profile.keep_alive
             except Exception as e:
                 logger.debug("BrowserSession close failed: %s", e)
+
+        # Hand the contexts back: kept for the next run unless the browsers should close with us
+        for lease in self._leases:
+            try:
+                await self.browser_pool.release(lease, recycle=not self.close_browser_on_cleanup)
+            except Exception as e:
+                logger.debug("Releasing browser context failed: %s", e)
+        if self.close_browser_on_cleanup:
+            try:
+                await self.browser_pool.close()
+            except Exception as e:
+                logger.debug("Closing pooled browsers failed: %s", e)
         
+        if had_agents and self.frontier is not None:
+            try:
+                logger.info("Exploration coverage: %s", await self.get_frontier_stats())
+            except Exception as e:
+                logger.debug("Reading frontier stats failed: %s", e)
+
         # Clear lists
         self._agents = []
         self._tasks = []
         self.browser_sessions = []
+        self._leases = []
         # self._history is typically kept until a new run, or cleared by start_all
 
     # ---------- helpers ----------------------------------------------------
@@ -178,5 +249,11 @@ class AgentHarness:
             
         return remove_screenshots(self._history)
 
+    async def get_frontier_stats(self) -> Dict[str, Any]:
+        """Pages explored by the agents, overall and per agent-hour; empty without a frontier."""
+        if self.frontier is None:
+            return {}
+        return await self.frontier.stats()
+
     def get_agents(self) -> List[CustomAgent]:
         return self._agents
\ No newline at end of file
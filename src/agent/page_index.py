@@ -0,0 +1,155 @@
+"""
+Near-duplicate detection for browser page views.
+
+A page is the string of its clickable elements, one per line. Each page is
+reduced to the set of its element lines, with the per-step highlight index
+stripped, then to a MinHash signature. Banded LSH over the signatures makes
+lookups touch only the pages sharing a band with the query, and candidates
+are verified with the exact Jaccard similarity of their element sets.
+"""
+import hashlib
+import os
+import random
+import re
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# element-set Jaccard at which a stored subpage counts as the current page
+PAGE_MATCH_THRESHOLD = float(os.environ.get("PAGE_MATCH_THRESHOLD", "0.9"))
+# ... at which the current page, with no elements added, is the previous one minus a few
+PAGE_SAME_THRESHOLD = float(os.environ.get("PAGE_SAME_THRESHOLD", "0.97"))
+# ... below which a page on a new url shares nothing with the previous page or homepage
+PAGE_NEW_THRESHOLD = float(os.environ.get("PAGE_NEW_THRESHOLD", "0.1"))
+
+NUM_PERM = 64
+# chance that a page exactly at the threshold becomes a candidate
+LSH_RECALL = 0.99
+
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 32) - 1
+_rng = random.Random(0x5EED)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# "[12]<button>" / "*[12]<button>": indices are renumbered on every step
+_INDEX_RE = re.compile(r"^\s*\*?\[\d+\]")
+
+
+def element_lines(page_contents: str) -> Iterator[str]:
+    """Element lines of a page view without their highlight indices."""
+    for line in page_contents.splitlines():
+        line = _INDEX_RE.sub("", line).strip()
+        if line:
+            yield line
+
+
+def shingles(page_contents: str) -> FrozenSet[int]:
+    """Hashed element lines of a page view."""
+    return frozenset(
+        int.from_bytes(hashlib.blake2b(line.encode(), digest_size=8).digest(), "little")
+        for line in element_lines(page_contents)
+    )
+
+
+def minhash(hashes: Iterable[int], num_perm: int = NUM_PERM) -> Tuple[int, ...]:
+    hashes = list(hashes)
+    if not hashes:
+        return (_MASK,) * num_perm
+    return tuple(min(((a * h + b) % _PRIME) & _MASK for h in hashes) for a, b in _PERMS[:num_perm])
+
+
+def jaccard(a: FrozenSet[int], b: FrozenSet[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_bands(threshold: float, num_perm: int = NUM_PERM, recall: float = LSH_RECALL) -> Tuple[int, int]:
+    """
+    (bands, rows) with the most rows per band, i.e. the fewest spurious
+    candidates, that still surfaces a page at `threshold` with `recall`.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if 1 - (1 - threshold ** rows) ** bands >= recall:
+            best = (bands, rows)
+    return best
+
+
+class PageSketch:
+    __slots__ = ("shingles", "signature")
+
+    def __init__(self, page_contents: str, num_perm: int = NUM_PERM):
+        self.shingles = shingles(page_contents)
+        self.signature = minhash(self.shingles, num_perm)
+
+
+class PageIndex:
+    """
+    LSH index of subpages, keyed by url. `query` returns the most similar
+    stored subpage on the same url whose Jaccard similarity reaches
+    `threshold`.
+    """
+
+    def __init__(self, threshold: float = PAGE_MATCH_THRESHOLD, num_perm: int = NUM_PERM, cache_size: int = 64):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], List[int]] = {}
+        self._pages: List[Tuple[str, str, PageSketch]] = []
+        self._sketches: "OrderedDict[str, PageSketch]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def sketch(self, page_contents: str) -> PageSketch:
+        """Sketch of a page, memoised for the last few distinct pages."""
+        sketch = self._sketches.get(page_contents)
+        if sketch is None:
+            sketch = self._sketches[page_contents] = PageSketch(page_contents, self.num_perm)
+            if len(self._sketches) > self._cache_size:
+                self._sketches.popitem(last=False)
+        else:
+            self._sketches.move_to_end(page_contents)
+        return sketch
+
+    def _band_keys(self, url: str, signature: Sequence[int]) -> Iterable[Tuple[str, int, Tuple[int, ...]]]:
+        r = self.rows
+        for band in range(self.bands):
+            yield url, band, tuple(signature[band * r:(band + 1) * r])
+
+    def add(self, url: str, page_contents: str, name: str) -> None:
+        sketch = self.sketch(page_contents)
+        idx = len(self._pages)
+        self._pages.append((url, name, sketch))
+        for key in self._band_keys(url, sketch.signature):
+            self._buckets.setdefault(key, []).append(idx)
+
+    def sync(self, subpages: Sequence[Tuple[str, str, str]]) -> None:
+        """Index the (url, contents, name) subpages appended since the last call."""
+        for url, page_contents, name in subpages[len(self._pages):]:
+            self.add(url, page_contents, name)
+
+    def query(self, url: str, page_contents: str) -> Optional[Tuple[str, float]]:
+        """(name, similarity) of the best matching subpage on `url`, if any reaches the threshold."""
+        sketch = self.sketch(page_contents)
+        candidates = set()
+        for key in self._band_keys(url, sketch.signature):
+            candidates.update(self._buckets.get(key, ()))
+        best: Optional[Tuple[str, float]] = None
+        for idx in candidates:
+            _, name, stored = self._pages[idx]
+            score = jaccard(sketch.shingles, stored.shingles)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (name, score)
+        return best
+
+    def similarity(self, a: str, b: str) -> float:
+        return jaccard(self.sketch(a).shingles, self.sketch(b).shingles)
+
+    def added(self, a: str, b: str) -> int:
+        """How many element lines of page `a` page `b` does not have."""
+        return len(self.sketch(a).shingles - self.sketch(b).shingles)
@@ -0,0 +1,80 @@
+"""
+Rendered page state shared by the agent and the discovery prompts.
+
+`PageRenderer` turns a step's element tree into text once; the agent prompt
+and the plan-maintenance prompts all reuse that string. `page_update`
+compares two renderings element by element (highlight indices stripped)
+and, when only part of the page changed, describes the current page as the
+elements removed from and added to the previous one, so prompts that
+already carry the previous page don't pay for the unchanged part twice.
+"""
+import os
+from collections import Counter
+from functools import lru_cache
+from typing import Any, List, Optional
+
+from src.agent.page_index import element_lines
+
+# a diff is sent instead of the full page only if at most this share of the elements changed
+PAGE_DIFF_MAX_CHANGE = float(os.environ.get("PAGE_DIFF_MAX_CHANGE", "0.5"))
+
+
+class PageRenderer:
+    """Renders an element tree once and hands out the cached text until the tree changes."""
+
+    def __init__(self, include_attributes: Optional[List[str]] = None):
+        self.include_attributes = include_attributes
+        self._tree: Any = None
+        self._text = ""
+        self.renders = 0
+
+    def render(self, element_tree: Any) -> str:
+        if element_tree is not self._tree:
+            self._text = element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)
+            self._tree = element_tree
+            self.renders += 1
+        return self._text
+
+
+@lru_cache(maxsize=16)
+def page_update(prev_page_contents: str, curr_page_contents: str) -> Optional[str]:
+    """
+    The current page as a structural diff against the previous one, or None
+    when too much changed for a diff to be smaller than the page itself.
+    """
+    if not prev_page_contents or not curr_page_contents:
+        return None
+    prev = Counter(element_lines(prev_page_contents))
+    curr_lines = [(line, next(element_lines(line), "")) for line in curr_page_contents.splitlines()]
+    curr = Counter(key for _, key in curr_lines if key)
+    removed = prev - curr
+    added = curr - prev
+    changed = sum(removed.values()) + sum(added.values())
+    unchanged = sum((prev & curr).values())
+    if changed > PAGE_DIFF_MAX_CHANGE * max(sum(curr.values()), 1):
+        return None
+
+    out = [f"{unchanged} elements are the same as on the previous page and are omitted"]
+    if removed:
+        out.append("Removed elements:")
+        for line in element_lines(prev_page_contents):
+            if removed[line]:
+                removed[line] -= 1
+                out.append(line)
+    if added:
+        out.append("Added elements:")
+        for line, key in curr_lines:
+            if added[key]:
+                added[key] -= 1
+                out.append(line.strip())
+    if not changed:
+        out.append("No elements were added or removed")
+    return "\n".join(out)
+
+
+def describe_current_page(prev_page_contents: str, curr_page_contents: str) -> str:
+    """Prompt section for the current page, following one that shows the previous page."""
+    update = page_update(prev_page_contents, curr_page_contents)
+    if update is None:
+        return f"Here is the current page:\n{curr_page_contents}"
+    return f"Here is the current page, as changes to the previous page:\n{update}"
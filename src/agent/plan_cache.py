@@ -0,0 +1,184 @@
+"""
+Plans shared across agents and runs, keyed by page structure.
+
+A page's fingerprint hashes its element lines with highlight indices
+stripped and numbers and email addresses normalised, so the same view seen
+by another user or on another day maps to the same key. Entries are
+scoped per application and kept in an in-memory LRU. When a directory is
+configured, each application is also backed by a JSON file that is merged
+and rewritten atomically on every store, so concurrent agents don't lose
+each other's entries.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from src.agent.discovery import Plan, PlanItem
+from src.agent.page_index import element_lines
+
+log = logging.getLogger(__name__)
+
+# empty disables the on-disk layer
+PLAN_CACHE_DIR = os.environ.get("PLAN_CACHE_DIR", ".plan_cache")
+PLAN_CACHE_MAX_ENTRIES = int(os.environ.get("PLAN_CACHE_MAX_ENTRIES", "500"))
+PLAN_CACHE_TTL = float(os.environ.get("PLAN_CACHE_TTL", str(7 * 24 * 3600)))
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def page_fingerprint(page_contents: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for line in element_lines(page_contents):
+        line = _DIGITS_RE.sub("0", _EMAIL_RE.sub("<email>", line.lower()))
+        h.update(line.encode())
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def app_scope(url: str, app_id: Optional[str] = None) -> str:
+    """The application a page belongs to: its app id, else its origin."""
+    if app_id:
+        return str(app_id)
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class PlanCache:
+    def __init__(
+        self,
+        directory: Optional[str] = PLAN_CACHE_DIR,
+        max_entries: int = PLAN_CACHE_MAX_ENTRIES,
+        ttl: float = PLAN_CACHE_TTL,
+    ):
+        self.directory = directory or None
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # scope -> key -> {"items", "stored_at", "used_at"}, least recently used first
+        self._scopes: Dict[str, "OrderedDict[str, Dict]"] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ── storage ───────────────────────────────────────────────────────────
+    def _path(self, scope: str) -> str:
+        name = re.sub(r"[^A-Za-z0-9]+", "_", scope).strip("_")[:80]
+        digest = hashlib.blake2b(scope.encode(), digest_size=4).hexdigest()
+        return os.path.join(self.directory, f"{name}-{digest}.json")
+
+    def _read(self, scope: str) -> Dict[str, Dict]:
+        if not self.directory:
+            return {}
+        try:
+            with open(self._path(scope), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            log.warning("Ignoring unreadable plan cache for %s: %s", scope, e)
+            return {}
+
+    def _entries(self, scope: str) -> "OrderedDict[str, Dict]":
+        entries = self._scopes.get(scope)
+        if entries is None:
+            loaded = sorted(self._read(scope).items(), key=lambda kv: kv[1]["used_at"])
+            entries = self._scopes[scope] = OrderedDict(loaded)
+        return entries
+
+    def _evict(self, entries: "OrderedDict[str, Dict]") -> None:
+        cutoff = time.time() - self.ttl
+        for key in [k for k, e in entries.items() if e["stored_at"] < cutoff]:
+            del entries[key]
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def _persist(self, scope: str, entries: "OrderedDict[str, Dict]") -> None:
+        if not self.directory:
+            return
+        # merge what other agents stored since we loaded
+        for key, entry in self._read(scope).items():
+            mine = entries.get(key)
+            if mine is None or entry["stored_at"] > mine["stored_at"]:
+                entries[key] = entry
+        ordered = OrderedDict(sorted(entries.items(), key=lambda kv: kv[1]["used_at"]))
+        self._evict(ordered)
+        entries.clear()
+        entries.update(ordered)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(scope)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning("Could not write plan cache for %s: %s", scope, e)
+
+    def _get(self, scope: str, key: str) -> Optional[List[str]]:
+        with self._lock:
+            entries = self._entries(scope)
+            entry = entries.get(key)
+            if entry is not None and entry["stored_at"] < time.time() - self.ttl:
+                del entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry["used_at"] = time.time()
+            entries.move_to_end(key)
+            self.hits += 1
+            return list(entry["items"])
+
+    def _put(self, scope: str, key: str, items: List[str]) -> None:
+        with self._lock:
+            entries = self._entries(scope)
+            now = time.time()
+            entries[key] = {"items": list(items), "stored_at": now, "used_at": now}
+            entries.move_to_end(key)
+            self._evict(entries)
+            self._persist(scope, entries)
+
+    # ── plans ─────────────────────────────────────────────────────────────
+    def get_plan(self, scope: str, page_contents: str) -> Optional[Plan]:
+        """A fresh copy of the plan made for this page structure, all items open."""
+        items = self._get(scope, "plan:" + page_fingerprint(page_contents))
+        if items is None:
+            return None
+        return Plan(plan_items=[PlanItem(plan=item) for item in items])
+
+    def put_plan(self, scope: str, page_contents: str, plan: Plan) -> None:
+        self._put(scope, "plan:" + page_fingerprint(page_contents), [p.plan for p in plan.plan_items])
+
+    def get_additions(self, scope: str, prev_page_contents: str, page_contents: str) -> Optional[List[str]]:
+        """Plan items added when the view changed from `prev_page_contents` to `page_contents`."""
+        key = f"update:{page_fingerprint(prev_page_contents)}:{page_fingerprint(page_contents)}"
+        return self._get(scope, key)
+
+    def put_additions(self, scope: str, prev_page_contents: str, page_contents: str, items: List[str]) -> None:
+        key = f"update:{page_fingerprint(prev_page_contents)}:{page_fingerprint(page_contents)}"
+        self._put(scope, key, items)
+
+
+def apply_additions(plan: Plan, items: List[str]) -> Plan:
+    """Append cached additions that the plan does not have yet."""
+    known = {p.plan for p in plan.plan_items}
+    plan.plan_items.extend(PlanItem(plan=item) for item in items if item not in known)
+    return plan
+
+
+_shared: Optional[PlanCache] = None
+
+
+def shared_plan_cache() -> PlanCache:
+    """Process-wide cache, so agents in one harness reuse each other's plans."""
+    global _shared
+    if _shared is None:
+        _shared = PlanCache()
+    return _shared
@@ -0,0 +1,82 @@
+"""
+Speculative capture of the next step's browser state.
+
+After the actions of a step ran, the agent waits for the HTTP traffic they
+caused to settle. With pipelining on, the next step's state is captured and
+its plan maintained during that wait, as soon as the DOM has stopped
+changing. A MutationObserver counts DOM mutations from then on; the next
+step only uses the speculative result if the count is unchanged, i.e. the
+page it would have captured is the one that was captured.
+"""
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+PIPELINE_STEPS = os.environ.get("PIPELINE_STEPS", "0").lower() in ("1", "true", "yes")
+# the DOM counts as stable after this long without a mutation
+DOM_STABLE_QUIET = float(os.environ.get("DOM_STABLE_QUIET", "0.3"))
+# give up speculating if the DOM keeps changing this long
+DOM_STABLE_TIMEOUT = float(os.environ.get("DOM_STABLE_TIMEOUT", "2.0"))
+
+_WATCH_JS = """() => {
+    if (window.__agentDomObserver) window.__agentDomObserver.disconnect();
+    window.__agentDomMutations = 0;
+    window.__agentDomObserver = new MutationObserver(m => { window.__agentDomMutations += m.length; });
+    window.__agentDomObserver.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+}"""
+_COUNT_JS = "() => typeof window.__agentDomMutations === 'number' ? window.__agentDomMutations : -1"
+
+
+async def watch_dom(page: Any) -> bool:
+    try:
+        await page.evaluate(_WATCH_JS)
+        return True
+    except Exception as e:
+        logger.debug("Could not watch DOM mutations: %s", e)
+        return False
+
+
+async def dom_mutations(page: Any) -> int:
+    """Mutations since watch_dom; -1 if the page navigated away or can't be read."""
+    try:
+        return int(await page.evaluate(_COUNT_JS))
+    except Exception:
+        return -1
+
+
+async def wait_dom_stable(page: Any, quiet: float = DOM_STABLE_QUIET, timeout: float = DOM_STABLE_TIMEOUT) -> bool:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    count = await dom_mutations(page)
+    while count >= 0 and loop.time() < deadline:
+        await asyncio.sleep(quiet)
+        now = await dom_mutations(page)
+        if now == count:
+            return True
+        count = now
+    return False
+
+
+@dataclass
+class Prefetch:
+    step_number: int
+    task: "asyncio.Task"
+    # agent state the speculative plan maintenance may change
+    snapshot: Dict[str, Any]
+    page: Any = None
+    url: Optional[str] = None
+    # DOM mutation count right after the state was captured
+    mutations: int = -1
+
+    async def still_valid(self, page: Any) -> bool:
+        return (
+            self.mutations >= 0
+            and page is self.page
+            and page.url == self.url
+            and await dom_mutations(page) == self.mutations
+        )
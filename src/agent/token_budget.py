@@ -0,0 +1,195 @@
+"""
+Token accounting for the agent's message history.
+
+Every message is counted once, when it enters the history, with a cached
+tiktoken encoder (or a characters-per-token estimate if tiktoken is not
+available), so the running total is always current. Before each LLM call
+`fit_history` brings the history under the input budget: the oldest turns
+are folded into one summary message, and if the current state message
+alone is still too large it is truncated. A history that cannot be made to
+fit raises before the request is sent.
+"""
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, List, Optional
+
+from browser_use.agent.message_manager.views import ManagedMessage, MessageHistory, MessageMetadata
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+logger = logging.getLogger(__name__)
+
+TOKEN_ENCODING = os.environ.get("TOKEN_ENCODING", "cl100k_base")
+# room left for the completion out of max_input_tokens
+TOKEN_OUTPUT_RESERVE = int(os.environ.get("TOKEN_OUTPUT_RESERVE", "2000"))
+# upper bound on the summary of trimmed turns
+SUMMARY_MAX_TOKENS = int(os.environ.get("SUMMARY_MAX_TOKENS", "600"))
+
+SUMMARY_PREFIX = "Summary of earlier steps (older messages were trimmed):"
+
+
+@lru_cache(maxsize=None)
+def get_encoder(encoding: str) -> Optional[Any]:
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(encoding)
+    except Exception as e:
+        logger.warning("No tokenizer for %s (%s), estimating tokens from length", encoding, e)
+        return None
+
+
+class TokenCounter:
+    """Token counts of message texts, memoised for recently seen texts."""
+
+    def __init__(
+        self,
+        encoding: str = TOKEN_ENCODING,
+        chars_per_token: int = 3,
+        image_tokens: int = 800,
+        cache_size: int = 256,
+    ):
+        self._encoder = get_encoder(encoding)
+        self.chars_per_token = chars_per_token
+        self.image_tokens = image_tokens
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._cache_size = cache_size
+
+    def count_text(self, text: str) -> int:
+        if not text:
+            return 0
+        tokens = self._cache.get(text)
+        if tokens is not None:
+            self._cache.move_to_end(text)
+            return tokens
+        if self._encoder is not None:
+            tokens = len(self._encoder.encode(text, disallowed_special=()))
+        else:
+            tokens = len(text) // self.chars_per_token
+        self._cache[text] = tokens
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return tokens
+
+    def count_message(self, message: BaseMessage) -> int:
+        if isinstance(message.content, list):
+            tokens = 0
+            for item in message.content:
+                if isinstance(item, dict) and "image_url" in item:
+                    tokens += self.image_tokens
+                elif isinstance(item, dict) and "text" in item:
+                    tokens += self.count_text(item["text"])
+            return tokens
+        text = message.content
+        if getattr(message, "tool_calls", None):
+            text += str(message.tool_calls)
+        return self.count_text(text)
+
+
+class HistoryOverBudget(ValueError):
+    """The history can't be trimmed to the budget; raised before anything is sent."""
+
+
+@dataclass
+class FitResult:
+    dropped: int = 0
+    truncated: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.dropped or self.truncated)
+
+
+def _turn_summary(message: BaseMessage) -> Optional[str]:
+    """One line for a trimmed message: the goal of an agent turn, or the text of a note."""
+    if isinstance(message, ToolMessage):
+        return None
+    text = message.content if isinstance(message.content, str) else ""
+    if isinstance(message, AIMessage):
+        try:
+            brain = json.loads(text.replace("```json", "").replace("```", "")).get("current_state", {})
+        except (ValueError, AttributeError):
+            brain = {}
+        goal = brain.get("next_goal") if isinstance(brain, dict) else None
+        return f"- {goal}" if goal else None
+    if text.startswith(SUMMARY_PREFIX):
+        return text[len(SUMMARY_PREFIX):].strip("\n") or None
+    return f"- {text.splitlines()[0][:200]}" if text.strip() else None
+
+
+def _summary_message(lines: List[str], counter: TokenCounter) -> Optional[HumanMessage]:
+    if not lines:
+        return None
+    # keep the most recent lines that fit
+    kept: List[str] = []
+    used = counter.count_text(SUMMARY_PREFIX)
+    for line in reversed(lines):
+        cost = counter.count_text(line) + 1
+        if used + cost > SUMMARY_MAX_TOKENS:
+            break
+        kept.append(line)
+        used += cost
+    if not kept:
+        return None
+    return HumanMessage(content="\n".join([SUMMARY_PREFIX, *reversed(kept)]))
+
+
+def _replace_last(history: MessageHistory, message: BaseMessage, tokens: int) -> None:
+    history.current_tokens += tokens - history.messages[-1].metadata.tokens
+    history.messages[-1] = ManagedMessage(message=message, metadata=MessageMetadata(tokens=tokens))
+
+
+def _truncate_last(history: MessageHistory, limit: int, counter: TokenCounter) -> int:
+    """Shrink the last message until the history fits; returns the tokens removed."""
+    last = history.messages[-1]
+    content = last.message.content
+    if isinstance(content, list):
+        content = "".join(i["text"] for i in content if isinstance(i, dict) and "text" in i)
+    before = last.metadata.tokens
+    while True:
+        tokens = counter.count_text(content)
+        over = history.current_tokens - last.metadata.tokens + tokens - limit
+        if over <= 0 or not content:
+            break
+        keep = int(len(content) * (1 - over / max(tokens, 1))) - 16
+        content = content[:max(keep, 0)]
+    _replace_last(history, HumanMessage(content=content), counter.count_text(content))
+    return before - history.messages[-1].metadata.tokens
+
+
+def fit_history(history: MessageHistory, limit: int, keep_head: int, counter: TokenCounter) -> FitResult:
+    """
+    Bring `history` to at most `limit` tokens. The first `keep_head` messages
+    (system prompt, context) and the last one (current state) are kept; the
+    turns between them are folded into a summary oldest first.
+    """
+    result = FitResult()
+    if history.current_tokens <= limit:
+        return result
+
+    messages = history.messages
+    lines: List[str] = []
+    summary: Optional[HumanMessage] = None
+    summary_tokens = 0
+    while history.current_tokens + summary_tokens > limit and len(messages) > keep_head + 1:
+        removed = messages.pop(keep_head)
+        history.current_tokens -= removed.metadata.tokens
+        result.dropped += 1
+        line = _turn_summary(removed.message)
+        if line:
+            lines.append(line)
+            summary = _summary_message(lines, counter)
+            summary_tokens = counter.count_message(summary) if summary else 0
+    if summary is not None and history.current_tokens + summary_tokens <= limit:
+        history.add_message(summary, MessageMetadata(tokens=summary_tokens), keep_head)
+
+    if history.current_tokens > limit and len(messages) > keep_head:
+        result.truncated = _truncate_last(history, limit, counter)
+    if history.current_tokens > limit:
+        raise HistoryOverBudget(
+            f"History over token budget - {history.current_tokens} tokens left after trimming, "
+            f"limit is {limit}; reduce the system prompt or task"
+        )
+    return result
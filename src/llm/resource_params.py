@@ -233,3 +233,19 @@ When returning the identified resource_ids, please identify where in the request
 If you did not identify any resources, make sure to return [] and not null for the resources field
 Now give your response
 """
+
+class IndexedRequestResources(RequestResources):
+    index: int
+
+class BatchRequestResources(BaseModel):
+    results: List[IndexedRequestResources] = Field(default_factory=list)
+
+EXTRACT_REQUESTS_BATCH_PROMPT = """
+You are given a numbered list of HTTP requests:
+{% for request in requests %}
+[{{ loop.index0 }}]
+{{ request }}
+{% endfor %}
+Treat each request independently and apply the instructions below to every one of them.
+Return exactly one entry in "results" per request, with "index" set to the request's number.
+""" + EXTRACT_REQUESTS_PROMPT.split("{{request}}", 1)[1]
@@ -0,0 +1,132 @@
+import asyncio
+import subprocess
+import sys
+
+from src.agent.browser_pool import BrowserPool
+
+
+class _Args:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def model_dump(self):
+        return dict(self.kwargs)
+
+
+class _Profile:
+    def __init__(self, headless=True):
+        self.headless = headless
+
+    def kwargs_for_launch(self):
+        return _Args(headless=self.headless)
+
+    def kwargs_for_new_context(self):
+        return _Args(viewport=None)
+
+
+class _Context:
+    def __init__(self, kwargs):
+        self.kwargs = kwargs
+        self.pages = []
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class _Browser:
+    def __init__(self):
+        self.contexts = []
+
+    def is_connected(self):
+        return True
+
+    async def new_context(self, **kwargs):
+        self.contexts.append(_Context(kwargs))
+        return self.contexts[-1]
+
+    async def close(self):
+        pass
+
+
+def _launcher(delay=0.05):
+    launched = []
+
+    async def launch(kwargs):
+        await asyncio.sleep(delay)
+        launched.append(kwargs)
+        return _Browser()
+
+    return launch, launched
+
+
+def test_browsers_launch_concurrently_once():
+    launch, launched = _launcher(delay=0.2)
+    pool = BrowserPool(size=3, launcher=launch)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await asyncio.gather(*(pool.acquire(_Profile(), f"agent-{i}") for i in range(6)))
+        return loop.time() - start
+
+    assert asyncio.run(run()) < 0.4
+    assert len(launched) == 3
+    assert pool.stats()["in_use"] == 6
+    # contexts spread over the browsers
+    assert sorted(len(b.contexts) for b in pool._browsers.popitem()[1]) == [2, 2, 2]
+
+
+def test_released_context_goes_back_to_same_key_only():
+    launch, _ = _launcher()
+    pool = BrowserPool(size=1, launcher=launch)
+
+    async def run():
+        alice = await pool.acquire(_Profile(), "alice", storage_state={"cookies": []})
+        assert alice.context.kwargs["storage_state"] == {"cookies": []}
+        await pool.release(alice)
+        bob = await pool.acquire(_Profile(), "bob")
+        again = await pool.acquire(_Profile(), "alice")
+        assert bob.context is not alice.context
+        assert again.context is alice.context and again.uses == 2
+        await pool.release(again)
+        # a storage_state to start from never gets a used context
+        fresh = await pool.acquire(_Profile(), "alice", storage_state={"cookies": []})
+        assert fresh.context is not alice.context and alice.context.closed
+        await pool.release(fresh, recycle=False)
+        assert fresh.context.closed
+
+        anonymous = await pool.acquire(_Profile())
+        await pool.release(anonymous)
+        assert anonymous.context.closed and not pool._idle
+
+    asyncio.run(run())
+    assert pool.stats()["recycled"] == 1
+
+
+def test_idle_contexts_are_bounded():
+    launch, _ = _launcher(delay=0)
+    pool = BrowserPool(size=1, max_idle=2, launcher=launch)
+
+    async def run():
+        leases = [await pool.acquire(_Profile(), f"agent-{i}") for i in range(3)]
+        for lease in leases:
+            await pool.release(lease)
+        return leases
+
+    leases = asyncio.run(run())
+    assert [lease.context.closed for lease in leases] == [True, False, False]
+
+
+def test_browsers_of_a_finished_event_loop_are_stopped():
+    launch, _ = _launcher(delay=0)
+    pool = BrowserPool(size=1, launcher=launch)
+    driver = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+
+    async def run():
+        await pool.acquire(_Profile(), "alice")
+        pool._driver_pid = driver.pid
+
+    asyncio.run(run())
+    asyncio.run(run())
+    assert driver.wait(timeout=10) != 0
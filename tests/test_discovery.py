@@ -97,6 +97,29 @@ def test_determine_new_page_same_page():
     assert nav.page_type == NewPageStatus.SAME_PAGE
 
 
+def test_determine_new_page_small_popup_goes_to_llm():
+    class PopupLLM:
+        def invoke(self, msgs, response_format=None):
+            return type("Res", (), {"content": json.dumps({"page_type": "updated_page", "name": "cookie-popup"})})()
+
+    prev = "\n".join(f"[{i}]<a>link {i}</a>" for i in range(100))
+    popup = prev + "\n[100]<button>Accept cookies</button>\n[101]<button>Reject</button>"
+    args = dict(
+        prev_goal="scroll",
+        subpages=[],
+        curr_url="http://example.com",
+        prev_url="http://example.com",
+        homepage_url="http://example.com",
+        homepage_contents=prev,
+    )
+
+    nav = determine_new_page(llm=PopupLLM(), curr_page_contents=popup, prev_page_contents=prev, **args)
+    assert nav.page_type == NewPageStatus.UPDATED_PAGE
+    # elements only went away: decided without the LLM
+    nav = determine_new_page(llm=None, curr_page_contents=prev, prev_page_contents=popup, **args)
+    assert nav.page_type == NewPageStatus.SAME_PAGE
+
+
 # ---------------------------------------------------------------------------
 # determine_new_page – UPDATED_PAGE via history (no LLM)
 # ---------------------------------------------------------------------------
@@ -175,3 +198,67 @@ def test_deduplicate_plan_removes_duplicates(llm_mock):
     deduped = deduplicate_plan(llm_mock, plan)
     # The fixture should instruct deletion of duplicates, leaving 2 or fewer items
     assert len(deduped.plan_items) < 3
+
+
+# ---------------------------------------------------------------------------
+# maintain_plan – concurrent branches (stub LLM)
+# ---------------------------------------------------------------------------
+
+class _StubLLM:
+    """Answers each plan-maintenance prompt with a canned response, or raises."""
+
+    def __init__(self, completed=None, deleted=None, fail_completion=False):
+        self.completed = completed or []
+        self.deleted = deleted or []
+        self.fail_completion = fail_completion
+
+    def invoke(self, messages, response_format=None):
+        from types import SimpleNamespace
+
+        prompt = messages[-1]["content"]
+        if "completed plan item indices" in prompt:
+            if self.fail_completion:
+                raise RuntimeError("completion check down")
+            body = {"completed": self.completed}
+        elif "deduplicate the plan" in prompt:
+            body = {"operations": [{"index": i} for i in self.deleted]}
+        else:
+            body = {"page_type": "new_page", "name": ""}
+        return SimpleNamespace(content=json.dumps(body))
+
+
+def _maintain(llm, plan, dedup=True):
+    import asyncio
+    from src.agent.discovery import maintain_plan
+
+    return asyncio.run(maintain_plan(
+        llm,
+        plan,
+        curr_page_contents="<html>curr</html>",
+        prev_page_contents="<html>prev</html>",
+        curr_url="http://example.com/a",
+        prev_url="http://example.com",
+        prev_goal="click",
+        subpages=[],
+        homepage_url="http://example.com",
+        homepage_contents="<html>prev</html>",
+        dedup=dedup,
+    ))
+
+
+def test_maintain_plan_applies_completions_before_deletes():
+    plan = _make_simple_plan(3)
+    plan, nav = _maintain(_StubLLM(completed=[2], deleted=[0]), plan)
+    assert nav.page_type == NewPageStatus.NEW_PAGE
+    assert [(p.plan, p.completed) for p in plan.plan_items] == [("Step 1", False), ("Step 2", True)]
+
+
+def test_maintain_plan_failed_branch_does_not_cancel_others(monkeypatch):
+    import src.utils.utils as utils
+    monkeypatch.setattr(utils.time, "sleep", lambda _: None)
+
+    plan = _make_simple_plan(3)
+    plan, nav = _maintain(_StubLLM(deleted=[1], fail_completion=True), plan)
+    assert nav.page_type == NewPageStatus.NEW_PAGE
+    assert [p.plan for p in plan.plan_items] == ["Step 0", "Step 2"]
+    assert not any(p.completed for p in plan.plan_items)
@@ -0,0 +1,89 @@
+import asyncio
+
+from common.frontier import Frontier
+from src.agent.frontier import LocalFrontier, claim_next
+
+
+def test_agents_divide_pages_shallow_first():
+    frontier = Frontier()
+    frontier.add("a", ["http://app/a/b/c", "http://app/", "http://app/#/users"])
+    frontier.add("b", ["http://app/", "http://app/settings"])
+
+    claimed = [frontier.claim("a"), frontier.claim("b"), frontier.claim("a"), frontier.claim("b")]
+    assert claimed == ["http://app/", "http://app/#/users", "http://app/settings", "http://app/a/b/c"]
+    assert frontier.claim("a") is None
+    assert not frontier.exhausted()
+
+
+def test_same_page_under_another_url_is_skipped():
+    frontier = Frontier()
+    frontier.add("a", ["http://app/home", "http://app/index"])
+    url_a, url_b = frontier.claim("a"), frontier.claim("b")
+
+    assert frontier.visit("a", url_a, "fp-home")
+    # b landed on the page a is exploring
+    assert not frontier.visit("b", url_b, "fp-home")
+    frontier.complete("b", url_b)
+    frontier.complete("a", url_a)
+    assert frontier.exhausted()
+
+    frontier.add("b", ["http://app/home?tab=1"])
+    url = frontier.claim("b")
+    assert not frontier.visit("b", url, "fp-home")
+
+    stats = frontier.stats()
+    assert stats["explored_pages"] == 1
+    assert stats["explored_by_agent"] == {"a": 1, "b": 0}
+
+
+def test_expired_and_released_leases_are_requeued():
+    frontier = Frontier(lease_seconds=0, max_attempts=2)
+    frontier.add("a", ["http://app/"])
+    assert frontier.claim("a") == "http://app/"
+    # a's lease ran out, b picks the page up and a can't renew it anymore
+    assert frontier.claim("b") == "http://app/"
+    assert not frontier.renew("a", "http://app/")
+
+    frontier.lease_seconds = 60
+    assert frontier.claim("c") == "http://app/"
+    frontier.release("c", "http://app/")
+    assert frontier.claim("c") == "http://app/"
+    frontier.release("c", "http://app/")
+    # failed max_attempts times: dropped
+    assert frontier.claim("c") is None
+    assert frontier.exhausted()
+
+
+def test_claim_next_waits_for_pages_found_by_others():
+    async def run():
+        frontier = LocalFrontier(Frontier())
+        await frontier.add("a", ["http://app/"])
+        assert await claim_next(frontier, "a", poll=0.01) == "http://app/"
+
+        waiting = asyncio.create_task(claim_next(frontier, "b", poll=0.01))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        await frontier.add("a", ["http://app/profile"])
+        assert await waiting == "http://app/profile"
+
+        await frontier.complete("a", "http://app/")
+        await frontier.complete("b", "http://app/profile")
+        assert await claim_next(frontier, "b", poll=0.01) is None
+
+    asyncio.run(run())
+
+
+def test_local_reset_forgets_explored_pages():
+    async def run():
+        frontier = LocalFrontier(Frontier(lease_seconds=30))
+        await frontier.add("a", ["http://app/"])
+        url, _ = await frontier.claim("a")
+        await frontier.complete("a", url)
+        assert await frontier.add("a", ["http://app/"]) == 0
+
+        await frontier.reset()
+        assert frontier.lease_seconds == 30
+        assert (await frontier.stats())["agents"] == 0
+        assert await frontier.add("b", ["http://app/"]) == 1
+
+    asyncio.run(run())
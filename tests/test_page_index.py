@@ -0,0 +1,30 @@
+from src.agent.page_index import PageIndex, lsh_bands, shingles
+
+
+def _page(*elements: str, start: int = 0) -> str:
+    return "\n".join(f"[{start + i}]<button>{e}</button>" for i, e in enumerate(elements))
+
+
+def test_shingles_ignore_highlight_indices():
+    assert shingles(_page("Login", "Basket")) == shingles("*" + _page("Login", "Basket", start=40))
+
+
+def test_query_finds_near_duplicate_on_same_url_only():
+    base = [f"item {i}" for i in range(60)]
+    index = PageIndex(threshold=0.9)
+    index.sync([
+        ("http://shop/#/", _page(*base, "Open menu"), "menu-open"),
+        ("http://shop/#/search", _page(*base, "Open menu"), "search-menu"),
+        ("http://shop/#/", _page(*(f"other {i}" for i in range(60))), "other"),
+    ])
+
+    name, score = index.query("http://shop/#/", _page(*base, "Open menu", "Close", start=7))
+    assert name == "menu-open" and score >= 0.9
+    assert index.query("http://shop/#/", _page(*base[:30])) is None
+    assert index.query("http://shop/#/about", _page(*base, "Open menu")) is None
+
+
+def test_bands_keep_recall_at_threshold():
+    bands, rows = lsh_bands(0.9, 64)
+    assert bands * rows == 64
+    assert 1 - (1 - 0.9 ** rows) ** bands >= 0.99
@@ -0,0 +1,45 @@
+from src.agent.page_state import PageRenderer, describe_current_page, page_update
+
+
+def _page(*elements: str, start: int = 0) -> str:
+    return "\n".join(f"[{start + i}]<button>{e}</button>" for i, e in enumerate(elements))
+
+
+class _Tree:
+    def __init__(self, text: str):
+        self.text = text
+
+    def clickable_elements_to_string(self, include_attributes=None) -> str:
+        return self.text
+
+
+def test_renderer_renders_each_tree_once():
+    renderer = PageRenderer()
+    tree = _Tree(_page("Login"))
+    assert renderer.render(tree) == renderer.render(tree) == _page("Login")
+    renderer.render(_Tree(_page("Logout")))
+    assert renderer.renders == 2
+
+
+def test_update_lists_only_changed_elements():
+    base = [f"item {i}" for i in range(20)]
+    prev = _page(*base, "Open menu")
+    curr = _page(*base, "Close menu", "Settings", start=3)
+
+    update = page_update(prev, curr)
+    assert update.splitlines() == [
+        "20 elements are the same as on the previous page and are omitted",
+        "Removed elements:",
+        "<button>Open menu</button>",
+        "Added elements:",
+        "[23]<button>Close menu</button>",
+        "[24]<button>Settings</button>",
+    ]
+    assert len(describe_current_page(prev, curr)) < len(curr)
+
+
+def test_mostly_new_page_is_sent_in_full():
+    prev = _page(*(f"item {i}" for i in range(10)))
+    curr = _page(*(f"other {i}" for i in range(10)))
+    assert page_update(prev, curr) is None
+    assert describe_current_page(prev, curr).endswith(curr)
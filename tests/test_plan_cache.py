@@ -0,0 +1,72 @@
+import time
+
+from src.agent.discovery import Plan, PlanItem
+from src.agent.plan_cache import PlanCache, app_scope, apply_additions, page_fingerprint
+
+
+def _page(*elements: str, start: int = 0) -> str:
+    return "\n".join(f"[{start + i}]<button>{e}</button>" for i, e in enumerate(elements))
+
+
+def _plan(*items: str) -> Plan:
+    return Plan(plan_items=[PlanItem(plan=item) for item in items])
+
+
+def test_fingerprint_ignores_indices_numbers_and_emails():
+    a = _page("Basket (3)", "alice@shop.test", "Order #1021")
+    b = _page("Basket (12)", "bob@mail.example.org", "Order #77", start=30)
+    assert page_fingerprint(a) == page_fingerprint(b)
+    assert page_fingerprint(a) != page_fingerprint(_page("Basket (3)", "Logout"))
+
+
+def test_app_scope_prefers_app_id():
+    assert app_scope("http://shop:3000/#/basket") == "http://shop:3000"
+    assert app_scope("http://shop:3000/#/basket", "app-1") == "app-1"
+
+
+def test_hit_returns_fresh_open_plan(tmp_path):
+    cache = PlanCache(str(tmp_path))
+    plan = _plan("Open basket", "Checkout")
+    plan.plan_items[0].completed = True
+    cache.put_plan("app", _page("Basket", "Checkout"), plan)
+
+    hit = cache.get_plan("app", _page("Basket", "Checkout", start=5))
+    assert [p.plan for p in hit.plan_items] == ["Open basket", "Checkout"]
+    assert not any(p.completed for p in hit.plan_items)
+    assert cache.get_plan("other-app", _page("Basket", "Checkout")) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_survive_across_instances(tmp_path):
+    prev, curr = _page("Menu"), _page("Menu", "Settings")
+    PlanCache(str(tmp_path)).put_additions("app", prev, curr, ["Open settings"])
+
+    additions = PlanCache(str(tmp_path)).get_additions("app", prev, curr)
+    assert additions == ["Open settings"]
+    plan = apply_additions(_plan("Open menu", "Open settings"), additions + ["Log out"])
+    assert [p.plan for p in plan.plan_items] == ["Open menu", "Open settings", "Log out"]
+
+
+def test_concurrent_writers_merge(tmp_path):
+    a, b = PlanCache(str(tmp_path)), PlanCache(str(tmp_path))
+    a.get_plan("app", _page("x"))
+    b.get_plan("app", _page("y"))
+    a.put_plan("app", _page("x"), _plan("from a"))
+    b.put_plan("app", _page("y"), _plan("from b"))
+
+    fresh = PlanCache(str(tmp_path))
+    assert fresh.get_plan("app", _page("x")).plan_items[0].plan == "from a"
+    assert fresh.get_plan("app", _page("y")).plan_items[0].plan == "from b"
+
+
+def test_lru_and_ttl_eviction():
+    cache = PlanCache(None, max_entries=2, ttl=60)
+    cache.put_plan("app", _page("a"), _plan("a"))
+    cache.put_plan("app", _page("b"), _plan("b"))
+    cache.get_plan("app", _page("a"))
+    cache.put_plan("app", _page("c"), _plan("c"))
+    assert cache.get_plan("app", _page("b")) is None
+    assert cache.get_plan("app", _page("a")) is not None
+
+    cache._scopes["app"][next(iter(cache._scopes["app"]))]["stored_at"] = time.time() - 120
+    assert len([p for p in ("a", "c") if cache.get_plan("app", _page(p)) is not None]) == 1
@@ -0,0 +1,56 @@
+import asyncio
+
+from src.agent.prefetch import Prefetch, dom_mutations, wait_dom_stable, watch_dom
+
+
+class _Page:
+    """Counts as many mutations per read as `bursts` says, then goes quiet."""
+
+    def __init__(self, bursts=(), url="http://shop/#/"):
+        self.url = url
+        self.count = None
+        self.bursts = list(bursts)
+
+    async def evaluate(self, script):
+        if "MutationObserver" in script:
+            self.count = 0
+            return None
+        if self.count is None:
+            return -1
+        if self.bursts:
+            self.count += self.bursts.pop(0)
+        return self.count
+
+
+def test_waits_for_dom_to_settle():
+    page = _Page(bursts=[3, 2, 0])
+
+    async def run():
+        assert await watch_dom(page)
+        return await wait_dom_stable(page, quiet=0.01, timeout=1)
+
+    assert asyncio.run(run())
+    assert page.count == 5
+
+
+def test_busy_or_unwatched_dom_is_never_stable():
+    assert not asyncio.run(wait_dom_stable(_Page(), quiet=0.01, timeout=1))
+
+    busy = _Page(bursts=[1] * 1000)
+    asyncio.run(watch_dom(busy))
+    assert not asyncio.run(wait_dom_stable(busy, quiet=0.01, timeout=0.1))
+
+
+def test_prefetch_is_valid_only_for_unchanged_page():
+    page = _Page()
+
+    async def run():
+        await watch_dom(page)
+        prefetch = Prefetch(step_number=2, task=None, snapshot={}, page=page, url=page.url)
+        prefetch.mutations = await dom_mutations(page)
+        assert await prefetch.still_valid(page)
+        assert not await prefetch.still_valid(_Page())
+        page.count += 1
+        assert not await prefetch.still_valid(page)
+
+    asyncio.run(run())
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+from browser_use.agent.message_manager.views import MessageHistory, MessageMetadata
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from src.agent.token_budget import SUMMARY_PREFIX, HistoryOverBudget, TokenCounter, fit_history
+
+
+def _history(counter, *messages):
+    history = MessageHistory()
+    for message in messages:
+        history.add_message(message, MessageMetadata(tokens=counter.count_message(message)))
+    return history
+
+
+def _turn(goal: str) -> AIMessage:
+    return AIMessage(content=json.dumps({"current_state": {"next_goal": goal, "thought": "x " * 200}}))
+
+
+def test_counter_memoises_and_counts_images():
+    counter = TokenCounter()
+    assert counter.count_text("hello world") == counter.count_text("hello world") > 0
+    image = HumanMessage(content=[{"type": "image_url", "image_url": {"url": "data:"}}, {"type": "text", "text": "hi"}])
+    assert counter.count_message(image) == counter.image_tokens + counter.count_text("hi")
+
+
+def test_fit_summarizes_oldest_turns():
+    counter = TokenCounter()
+    history = _history(
+        counter,
+        SystemMessage(content="system"),
+        *(_turn(f"goal {i}") for i in range(10)),
+        HumanMessage(content="current page " * 50),
+    )
+    limit = history.current_tokens - 1000
+    result = fit_history(history, limit, keep_head=1, counter=counter)
+
+    assert history.current_tokens <= limit
+    assert history.current_tokens == sum(m.metadata.tokens for m in history.messages)
+    assert result.dropped and not result.truncated
+    summary = history.messages[1].message.content
+    assert summary.startswith(SUMMARY_PREFIX) and "goal 0" in summary
+    assert history.messages[-1].message.content.startswith("current page")
+
+
+def test_fit_truncates_state_message_then_refuses():
+    counter = TokenCounter()
+    history = _history(counter, SystemMessage(content="system prompt " * 20), HumanMessage(content="page " * 2000))
+    result = fit_history(history, 500, keep_head=1, counter=counter)
+    assert result.truncated and history.current_tokens <= 500
+
+    with pytest.raises(HistoryOverBudget):
+        fit_history(history, 10, keep_head=1, counter=counter)